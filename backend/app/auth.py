@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from app import config
 
 # Configuration (Settings)
 SECRET_KEY = "12345678"  # Replace with your actual secret key
@@ -26,3 +27,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(
             status_code=401, detail="Invalid authentication credentials"
         )
+
+def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """
+    Require the current user to be listed in ADMIN_USER_IDS.
+    """
+    if current_user["user_id"] not in config.ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -0,0 +1,306 @@
+import fnmatch
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app import config
+
+# Default time-to-live for cached per-user results (seconds)
+DEFAULT_TTL = 60
+
+# Namespaces that hold per-user data and must be dropped when the user's trades change
+_user_namespaces = set()
+
+# Users who wrote recently and must read from the primary database
+PRIMARY_PIN_NAMESPACE = "primary_pin"
+
+# Per-user counters bumped on every write
+DATA_VERSION_NAMESPACE = "data_version"
+
+
+class CacheBackend:
+    """
+    Key/value store with per-entry expiry. Values must be JSON-serialisable
+    so that every backend, including the ones shared between worker
+    processes, stores the same thing.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """
+        Atomically add one to a counter that never expires, returning the new value.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """
+    Thread-safe in-process cache. Each worker process has its own copy.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        super().__init__(ttl)
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._data.get(key)
+            value = (entry[1] if entry else 0) + 1
+            self._data[key] = (float("inf"), value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a local SQLite file, shared by every worker on the host.
+    Connections are opened per thread and re-opened after a fork.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        row = self._connection().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, '1', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1, expires_at = excluded.expires_at "
+            "RETURNING value",
+            (key, float("inf")),
+        ).fetchone()
+        return int(row[0])
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the subset of the redis-py client used by
+    `RedisCache`, for running the Redis code path without a server.
+    """
+
+    def __init__(self):
+        self._store = MemoryCache()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._store.get(key)
+
+    def set(self, key: str, value, ex: Optional[float] = None):
+        if isinstance(value, str):
+            value = value.encode()
+        self._store.set(key, value, ttl=ex if ex is not None else float("inf"))
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._store.delete(key)
+
+    def incr(self, key: str) -> int:
+        with self._store._lock:
+            entry = self._store._data.get(key)
+            value = int(entry[1]) + 1 if entry else 1
+            self._store._data[key] = (float("inf"), str(value).encode())
+            return value
+
+    def scan_iter(self, match: str = "*", count: int = None):
+        with self._store._lock:
+            keys = list(self._store._data)
+        return (key for key in keys if fnmatch.fnmatchcase(key, match))
+
+    def close(self):
+        pass
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache backed by Redis, shared by every worker and host. Takes any client
+    with the redis-py `get`/`set`/`delete`/`incr`/`scan_iter` interface.
+    Every key is stored under `prefix`, so the Redis database can be shared.
+    """
+
+    def __init__(self, client, ttl: float = DEFAULT_TTL, prefix: str = "trade-tracker:"):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        """
+        Delete only this cache's keys, in batches.
+        """
+        batch = []
+        for key in self.client.scan_iter(match=self.prefix + "*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def close(self):
+        self.client.close()
+
+
+def create_cache(backend: str = None, url: str = None) -> CacheBackend:
+    """
+    Build the cache selected by CACHE_BACKEND ("memory", "sqlite" or "redis").
+    For Redis, CACHE_URL="fake://" uses the in-memory `FakeRedis`.
+    """
+    backend = backend or config.CACHE_BACKEND
+    url = config.CACHE_URL if url is None else url
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "sqlite":
+        return SQLiteCache(url or "trade_tracker_cache.db")
+    if backend == "redis":
+        if url.startswith("fake://"):
+            return RedisCache(FakeRedis())
+        import redis
+
+        return RedisCache(redis.Redis.from_url(url or "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+cache = create_cache()
+
+
+def user_namespace(namespace: str) -> str:
+    """
+    Register a namespace of per-user values so that `invalidate_user` drops it.
+    """
+    _user_namespaces.add(namespace)
+    return namespace
+
+
+def user_key(namespace: str, user_id: int) -> str:
+    """
+    Build the cache key for a per-user value.
+    """
+    return f"{namespace}:{user_id}"
+
+
+def invalidate_user(user_id: int) -> int:
+    """
+    Drop every cached per-user value, pin the user's reads to the primary
+    database and bump the user's data version. Call after any write to the
+    user's trades. Returns the new version.
+    """
+    for namespace in list(_user_namespaces):
+        cache.delete(user_key(namespace, user_id))
+    pin_primary(user_id)
+    return cache.incr(user_key(DATA_VERSION_NAMESPACE, user_id))
+
+
+def data_version(user_id: int) -> int:
+    """
+    Number of writes to the user's trades seen by the shared cache. Workers
+    holding a copy of the user's data compare it to tell whether the copy is current.
+    """
+    return cache.get(user_key(DATA_VERSION_NAMESPACE, user_id)) or 0
+
+
+def pin_primary(user_id: int):
+    """
+    Send the user's reads to the primary for PRIMARY_PIN_SECONDS. Stored in
+    the shared cache so every worker honours it.
+    """
+    if config.DATABASE_REPLICA_URLS and config.PRIMARY_PIN_SECONDS > 0:
+        cache.set(user_key(PRIMARY_PIN_NAMESPACE, user_id), 1, ttl=config.PRIMARY_PIN_SECONDS)
+
+
+def pinned_to_primary(user_id: int) -> bool:
+    return cache.get(user_key(PRIMARY_PIN_NAMESPACE, user_id)) is not None
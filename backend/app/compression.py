@@ -0,0 +1,153 @@
+"""
+Response compression middleware.
+
+Compresses responses with Brotli when the client accepts it and the optional
+`brotli` package is installed, otherwise with gzip. Bodies smaller than the
+threshold, already-encoded responses and non-text content types are sent
+as they are. Streaming responses are compressed chunk by chunk and flushed
+after each chunk, so nothing is buffered.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    "br" or "gzip" from an Accept-Encoding header, preferring Brotli when
+    available. Codings listed with q=0 are refused.
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type or "+xml" in content_type
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.process(data) + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing HTTP responses of at least `minimum_size`
+    bytes. A streaming response is always compressed, since its size is
+    not known when it starts.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressedResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressedResponder:
+    """
+    Wraps `send` for one response. The start message is held back until the
+    first body chunk shows whether the response is worth compressing.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _compressor(self):
+        if self.encoding == "br":
+            return BrotliCompressor(self.middleware.brotli_quality)
+        return GzipCompressor(self.middleware.gzip_level)
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                "content-encoding" in headers
+                or not compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            ):
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self.compressor = self._compressor()
+            data = self.compressor.chunk(body, final=not more_body)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(data))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        data = self.compressor.chunk(body, final=not more_body)
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
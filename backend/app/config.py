@@ -0,0 +1,106 @@
+import os
+
+# Settings are read from the environment so deployments and benchmarks can
+# switch behaviour without code changes.
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:@localhost/trade_tracker")
+# Comma-separated read replica URLs for GET, report and analytics routes
+# (empty sends every read to DATABASE_URL)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds a user's reads stay on the primary after they write, so they
+# read their own writes while replicas catch up
+PRIMARY_PIN_SECONDS = float(os.getenv("PRIMARY_PIN_SECONDS", "5"))
+
+# Market data: "yfinance", "replay" or "synthetic"
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yfinance")
+
+# Replay provider: CSV or Parquet file with timestamp, ticker and price columns
+MARKET_DATA_REPLAY_PATH = os.getenv("MARKET_DATA_REPLAY_PATH", "")
+# Historical seconds replayed per wall-clock second (0 serves the final tick)
+MARKET_DATA_REPLAY_SPEED = float(os.getenv("MARKET_DATA_REPLAY_SPEED", "0"))
+
+# Synthetic random-walk provider
+MARKET_DATA_SEED = int(os.getenv("MARKET_DATA_SEED", "42"))
+MARKET_DATA_VOLATILITY = float(os.getenv("MARKET_DATA_VOLATILITY", "0.02"))
+
+# Cache shared by worker processes: "memory" (per process), "sqlite" or "redis"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+# SQLite file path or Redis URL ("fake://" for the in-memory Redis stand-in)
+CACHE_URL = os.getenv("CACHE_URL", "")
+
+# Serving
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+# Seconds between background price refreshes of every open book (0 disables)
+PRICE_REFRESH_INTERVAL = float(os.getenv("PRICE_REFRESH_INTERVAL", "0"))
+# Leader election for periodic jobs: "file", "database" (MySQL GET_LOCK) or "none"
+LEADER_LOCK = os.getenv("LEADER_LOCK", "file")
+LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", "trade_tracker_leader.lock")
+
+# Startup
+# Run app.migrate in the lifespan startup hook (in the master only under
+# app.serve); disable when it is run separately with `python -m app.migrate`
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+# Cold-start budget checked by `python -m app.startup_profile`
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Per-user token buckets for expensive routes: "route=requests/seconds,..."
+RATE_LIMITS = os.getenv("RATE_LIMITS", "update_prices=6/60,create_trade=60/60")
+
+# Event log: seconds between snapshot passes run by the leader (0 disables),
+# and the number of new events that makes a user's book due for a snapshot
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "3600"))
+SNAPSHOT_MIN_EVENTS = int(os.getenv("SNAPSHOT_MIN_EVENTS", "1000"))
+
+# Currencies: valuations are reported in BASE_CURRENCY
+BASE_CURRENCY = os.getenv("BASE_CURRENCY", "USD")
+# FX rates: "yfinance" (live) or "fixture" (local JSON file of rates)
+FX_PROVIDER = os.getenv("FX_PROVIDER", "yfinance")
+FX_FIXTURE_PATH = os.getenv(
+    "FX_FIXTURE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "fx_rates.json"),
+)
+# Seconds an FX rate stays cached
+FX_TTL = float(os.getenv("FX_TTL", "300"))
+
+# Ticker reference data: CSV (symbol, exchange, currency, name) seeded by app.migrate
+TICKER_SEED_PATH = os.getenv(
+    "TICKER_SEED_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "tickers.csv"),
+)
+
+# Idempotency keys: seconds a stored response is replayed for, and how long a
+# duplicate waits for the original request to finish before giving up
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+
+# Daily position snapshots: seconds between re-snapshots of today by the
+# leader worker (0 disables; run `python -m app.daily_snapshots run` from cron
+# instead), and processes used by backfills (0 uses every CPU)
+DAILY_SNAPSHOT_INTERVAL = float(os.getenv("DAILY_SNAPSHOT_INTERVAL", "0"))
+DAILY_SNAPSHOT_WORKERS = int(os.getenv("DAILY_SNAPSHOT_WORKERS", "0"))
+
+# Hot tier of in-memory order books for active users (see app/order_book.py);
+# needs a shared CACHE_BACKEND when running several workers
+ORDER_BOOK = os.getenv("ORDER_BOOK", "0") == "1"
+ORDER_BOOK_MAX_USERS = int(os.getenv("ORDER_BOOK_MAX_USERS", "1000"))
+ORDER_BOOK_IDLE_SECONDS = float(os.getenv("ORDER_BOOK_IDLE_SECONDS", "900"))
+
+# Response compression (Brotli when the brotli package is installed, else
+# gzip) for bodies of at least COMPRESSION_MIN_SIZE bytes
+COMPRESSION = os.getenv("COMPRESSION", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# SQL diagnostics (see app/query_stats.py), off unless QUERY_STATS=1:
+# statements at or over QUERY_SLOW_MS get their plan captured;
+# QUERY_STATS_SAMPLES recent timings per statement feed the percentiles.
+# With QUERY_STATS_DUMP_PATH set ("{pid}" is replaced by the worker's
+# process id) each worker writes its statistics there on shutdown.
+QUERY_STATS = os.getenv("QUERY_STATS", "0") == "1"
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "100"))
+QUERY_STATS_SAMPLES = int(os.getenv("QUERY_STATS_SAMPLES", "1000"))
+QUERY_STATS_DUMP_PATH = os.getenv("QUERY_STATS_DUMP_PATH", "")
+
+# Comma-separated user ids allowed to use the /debug endpoints
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
@@ -0,0 +1,199 @@
+"""
+Corporate-action adjustments for stored lots.
+
+    python -m app.corporate_actions actions.csv [--as-of 2024-06-10]
+
+Loads splits, reverse splits and ticker changes from a local CSV or JSON
+file (ticker, action_type, ex_date, ratio, new_ticker), registers any that
+are new and applies every unapplied action whose ex-date has passed. Each
+action adjusts all affected lots across all users with one set-based
+UPDATE, is applied at most once and leaves an audit row.
+"""
+import argparse
+import csv
+import json
+import logging
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import distinct, update
+from sqlalchemy.orm import Session
+
+from app import events
+from app.cache import invalidate_user
+from app.database import SessionLocal
+from app.models import CorporateAction, CorporateActionAudit, Ticker, Trade
+from app.tickers import register_ticker
+
+logger = logging.getLogger("corporate_actions")
+
+ACTION_TYPES = ("split", "reverse_split", "ticker_change")
+
+
+def load_actions(path: str) -> List[dict]:
+    """
+    Read actions from a CSV file or a JSON list of objects.
+    """
+    if path.endswith(".json"):
+        with open(path) as handle:
+            rows = json.load(handle)
+    else:
+        with open(path, newline="") as handle:
+            rows = list(csv.DictReader(handle))
+
+    actions = []
+    for row in rows:
+        action_type = row["action_type"].strip()
+        if action_type not in ACTION_TYPES:
+            raise ValueError(f"Unknown corporate action type: {action_type}")
+        ratio = float(row["ratio"]) if row.get("ratio") not in (None, "") else None
+        if action_type != "ticker_change" and not (ratio and ratio > 0):
+            raise ValueError(f"{action_type} for {row['ticker']} needs a positive ratio")
+        if action_type == "ticker_change" and not row.get("new_ticker"):
+            raise ValueError(f"Ticker change for {row['ticker']} needs new_ticker")
+        actions.append({
+            "ticker": row["ticker"].strip(),
+            "action_type": action_type,
+            "ex_date": date.fromisoformat(str(row["ex_date"])[:10]),
+            "ratio": ratio,
+            "new_ticker": (row.get("new_ticker") or "").strip() or None,
+        })
+    return actions
+
+
+def register_actions(db: Session, actions: List[dict]) -> int:
+    """
+    Insert actions that are not stored yet. Returns the number added.
+    """
+    added = 0
+    for action in actions:
+        exists = (
+            db.query(CorporateAction.id)
+            .filter(
+                CorporateAction.ticker == action["ticker"],
+                CorporateAction.action_type == action["action_type"],
+                CorporateAction.ex_date == action["ex_date"],
+            )
+            .first()
+        )
+        if not exists:
+            db.add(CorporateAction(**action))
+            added += 1
+    db.commit()
+    return added
+
+
+def apply_action(db: Session, action: CorporateAction) -> int:
+    """
+    Adjust every lot affected by `action` in one transaction and return the
+    number of trades changed. An action that is already applied is skipped,
+    so re-running is safe even from concurrent processes.
+
+    Splits scale price by 1/factor and quantities by factor for lots opened
+    before the ex-date. current_price is treated as a post-split quote and
+    unrealised PnL is recomputed from it.
+    """
+    now = datetime.utcnow()
+    # Claim the action; a concurrent or repeated run matches no row and stops here
+    claimed = db.execute(
+        update(CorporateAction)
+        .where(CorporateAction.id == action.id, CorporateAction.applied_at.is_(None))
+        .values(applied_at=now)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return 0
+
+    if action.action_type == "ticker_change":
+        # Trades reference the tickers table, so the new symbol must exist
+        # first; it joins the search index once this transaction commits
+        if not db.query(Ticker.symbol).filter(Ticker.symbol == action.new_ticker).first():
+            old = db.query(Ticker).filter(Ticker.symbol == action.ticker).first()
+            register_ticker(
+                db,
+                action.new_ticker,
+                currency=old.currency if old else "USD",
+                exchange=old.exchange if old else None,
+                name=old.name if old else None,
+            )
+        affected = Trade.ticker == action.ticker
+        user_ids = [row[0] for row in db.query(distinct(Trade.user_id)).filter(affected)]
+        changed = db.execute(
+            update(Trade).where(affected).values(ticker=action.new_ticker)
+        ).rowcount
+        detail = f"{action.ticker} -> {action.new_ticker}"
+        payload = {"new_ticker": action.new_ticker}
+    else:
+        factor = action.ratio if action.action_type == "split" else 1 / action.ratio
+        affected = (Trade.ticker == action.ticker) & (Trade.date_of_trade < action.ex_date)
+        user_ids = [row[0] for row in db.query(distinct(Trade.user_id)).filter(affected)]
+        # MySQL evaluates SET left to right, so PnL is computed from the unadjusted columns first
+        changed = db.execute(
+            update(Trade)
+            .where(affected)
+            .ordered_values(
+                (Trade.unrealised_pnl, (Trade.current_price * factor - Trade.price) * Trade.open_qty),
+                (Trade.price, Trade.price / factor),
+                (Trade.units, Trade.units * factor),
+                (Trade.qty, Trade.qty * factor),
+                (Trade.open_qty, Trade.open_qty * factor),
+            )
+        ).rowcount
+        detail = f"{action.action_type} factor {factor:g}"
+        payload = {"factor": factor}
+
+    payload.update(
+        ticker=action.ticker,
+        action_type=action.action_type,
+        ex_date=action.ex_date.isoformat(),
+    )
+    for user_id in user_ids:
+        events.record(db, user_id, "corporate_action", payload)
+
+    db.add(CorporateActionAudit(
+        action_id=action.id,
+        applied_at=now,
+        trades_affected=changed,
+        users_affected=len(user_ids),
+        detail=detail,
+    ))
+    db.commit()
+
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    logger.info(f"Applied {action.action_type} {action.ticker} ({detail}) to {changed} trades")
+    return changed
+
+
+def apply_pending(db: Session, as_of: date = None) -> int:
+    """
+    Apply every unapplied action with an ex-date on or before `as_of`, oldest first.
+    """
+    as_of = as_of or date.today()
+    pending = (
+        db.query(CorporateAction)
+        .filter(CorporateAction.applied_at.is_(None), CorporateAction.ex_date <= as_of)
+        .order_by(CorporateAction.ex_date, CorporateAction.id)
+        .all()
+    )
+    return sum(apply_action(db, action) for action in pending)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load and apply corporate actions")
+    parser.add_argument("path", help="CSV or JSON file of actions")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        added = register_actions(db, load_actions(args.path))
+        changed = apply_pending(db, args.as_of)
+    finally:
+        db.close()
+    logger.info(f"Registered {added} new actions, adjusted {changed} trades")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+End-of-day position snapshots.
+
+Each run writes one row per user, position (ticker, strategy, time horizon
+and currency) and day into daily_snapshots: open quantity, close price,
+market value and realised/unrealised PnL. Books are rebuilt from the trade
+event log, seeded with baselines of trades older than the log, as they
+stood at the end of each day. Trades recorded after the day they are dated
+join the book on their trade date, as entered, so past days can be
+backfilled from trades entered later. Close prices come from the local
+daily_prices store, falling back to the last mark in the log. Users are
+spread over a process pool.
+
+    python -m app.daily_snapshots run [--date 2024-06-28]
+    python -m app.daily_snapshots backfill --start 2024-01-01 --end 2024-06-30 [--prices closes.csv] [--workers 8]
+
+Price files are CSV with date (or timestamp), ticker and close (or price)
+columns; the last price of each ticker per day is kept.
+"""
+import argparse
+import csv
+import logging
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from itertools import repeat
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app import config, events
+from app.database import SessionLocal, dispose_engines
+from app.market_data import get_provider
+from app.models import DailyPrice, DailySnapshot, Trade, TradeEvent
+
+logger = logging.getLogger("daily_snapshots")
+
+# Days before a range start searched for the latest close
+PRICE_LOOKBACK_DAYS = 10
+
+# Snapshot rows inserted per statement
+INSERT_BATCH = 5000
+
+
+def load_price_file(path: str) -> List[dict]:
+    """
+    Daily closes from a CSV file; intraday rows collapse to the day's last price.
+    """
+    closes = {}
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            day = date.fromisoformat((row.get("date") or row["timestamp"])[:10])
+            closes[(row["ticker"], day)] = float(row.get("close") or row["price"])
+    return [{"ticker": ticker, "price_date": day, "close": close} for (ticker, day), close in closes.items()]
+
+
+def store_prices(db: Session, prices: List[dict]) -> int:
+    """
+    Insert or replace closes in the local price store.
+    """
+    for price in prices:
+        db.merge(DailyPrice(**price))
+    db.commit()
+    return len(prices)
+
+
+def record_closes(db: Session, day: date = None) -> int:
+    """
+    Quote every ticker with an open lot and store the quotes as the day's closes.
+    """
+    day = day or date.today()
+    tickers = [ticker for ticker, in db.query(Trade.ticker).filter(Trade.open_qty != 0).distinct()]
+    quotes = get_provider().get_prices(tickers)
+    return store_prices(db, [
+        {"ticker": ticker, "price_date": day, "close": close}
+        for ticker, close in quotes.items()
+    ])
+
+
+class PriceStore:
+    """
+    Closes from daily_prices for a date range, loaded per ticker on first use.
+    """
+
+    def __init__(self, db: Session, start: date, end: date):
+        self.db = db
+        self.start = start - timedelta(days=PRICE_LOOKBACK_DAYS)
+        self.end = end
+        self._series: Dict[str, tuple] = {}
+
+    def close_on(self, ticker: str, day: date) -> Optional[float]:
+        """
+        Latest close of `ticker` on or before `day`.
+        """
+        series = self._series.get(ticker)
+        if series is None:
+            rows = (
+                self.db.query(DailyPrice.price_date, DailyPrice.close)
+                .filter(
+                    DailyPrice.ticker == ticker,
+                    DailyPrice.price_date >= self.start,
+                    DailyPrice.price_date <= self.end,
+                )
+                .order_by(DailyPrice.price_date)
+                .all()
+            )
+            series = self._series[ticker] = ([row[0] for row in rows], [row[1] for row in rows])
+        dates, closes = series
+        position = bisect_right(dates, day) - 1
+        return closes[position] if position >= 0 else None
+
+
+def positions(user_id: int, day: date, state: Dict[int, dict], prices: PriceStore) -> List[dict]:
+    """
+    Aggregate a replayed book into snapshot rows for `day`. Lots dated after
+    the day are left out; positions with no open quantity and no realised
+    PnL are skipped.
+    """
+    day_text = day.isoformat()
+    grouped = {}
+    for row in state.values():
+        if (row["date_of_trade"] or "") > day_text:
+            continue
+        key = (row["ticker"], row["strategy_id"], row["time_horizon"], row.get("currency") or "USD")
+        totals = grouped.setdefault(key, [0.0, 0.0, 0.0, None])  # qty, cost, realised, last mark
+        qty = row["open_qty"] or 0
+        totals[0] += qty
+        totals[1] += qty * (row["price"] or 0)
+        totals[2] += row["realised_pnl"] or 0
+        if row["current_price"] is not None:
+            totals[3] = row["current_price"]
+
+    rows = []
+    for (ticker, strategy_id, time_horizon, currency), (qty, cost, realised, mark) in grouped.items():
+        if qty == 0 and realised == 0:
+            continue
+        close = prices.close_on(ticker, day)
+        close = mark if close is None else close
+        market_value = qty * close if close is not None else None
+        rows.append({
+            "snapshot_date": day,
+            "user_id": user_id,
+            "ticker": ticker,
+            "strategy_id": strategy_id,
+            "time_horizon": time_horizon,
+            "currency": currency,
+            "qty": qty,
+            "close_price": close,
+            "market_value": market_value,
+            "realised_pnl": realised,
+            "unrealised_pnl": market_value - cost if market_value is not None else 0,
+        })
+    return rows
+
+
+def backdated_trades(db: Session, user_id: int, cutoffs: List[datetime]) -> List[tuple]:
+    """
+    Trades of the user recorded after the first cutoff but dated on or
+    before the last one, as (trade date, recorded at, trade id, columns as
+    entered) sorted by trade date.
+    """
+    query = select(TradeEvent.trade_id, TradeEvent.payload, TradeEvent.created_at).where(
+        TradeEvent.user_id == user_id,
+        TradeEvent.event_type == "trade_created",
+        TradeEvent.created_at > cutoffs[0],
+    )
+    last_day = cutoffs[-1].date().isoformat()
+    trades = []
+    for trade_id, payload, created_at in db.execute(query):
+        state = events.decode_payload(payload)
+        trade_day = (state["date_of_trade"] or "")[:10]
+        if trade_day <= last_day:
+            trades.append((trade_day, created_at, trade_id, state))
+    trades.sort(key=lambda trade: trade[0])
+    return trades
+
+
+def with_backdated(state: Dict[int, dict], backdated: List[tuple], cutoff: datetime) -> Dict[int, dict]:
+    """
+    The replayed book at `cutoff` plus the trades dated on or before its day
+    that were only recorded later.
+    """
+    day = cutoff.date().isoformat()
+    late = {}
+    for trade_day, created_at, trade_id, columns in backdated:
+        if trade_day > day:
+            break
+        if created_at > cutoff and trade_id not in state:
+            late[trade_id] = columns
+    return {**state, **late} if late else state
+
+
+def snapshot_user(user_id: int, start: date, end: date) -> int:
+    """
+    Replace the user's snapshots from `start` to `end` inclusive. Returns the
+    number of rows written. Opens its own sessions so it can run in a worker
+    process: one streams the event log while the other writes, since a
+    streaming cursor holds its connection until exhausted.
+
+    Positions are keyed on the trade date: a trade entered today for a past
+    day counts from that day on, with its columns as entered. Later events
+    (matches, marks, corporate actions) apply from when they were recorded.
+    """
+    writer = SessionLocal()
+    try:
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        cutoffs = [datetime.combine(day, time.max) for day in days]
+        prices = PriceStore(writer, start, end)
+
+        writer.query(DailySnapshot).filter(
+            DailySnapshot.user_id == user_id,
+            DailySnapshot.snapshot_date >= start,
+            DailySnapshot.snapshot_date <= end,
+        ).delete(synchronize_session=False)
+        written, batch = 0, []
+        reader = SessionLocal()
+        try:
+            backdated = backdated_trades(reader, user_id, cutoffs)
+            for cutoff, state in events.iter_books(reader, user_id, cutoffs):
+                book = with_backdated(state, backdated, cutoff)
+                batch.extend(positions(user_id, cutoff.date(), book, prices))
+                if len(batch) >= INSERT_BATCH:
+                    writer.execute(insert(DailySnapshot), batch)
+                    written += len(batch)
+                    batch = []
+        finally:
+            # Release the streaming read before the writer commits
+            reader.close()
+        if batch:
+            writer.execute(insert(DailySnapshot), batch)
+            written += len(batch)
+        writer.commit()
+        return written
+    finally:
+        writer.close()
+
+
+def snapshot_range(start: date, end: date, workers: int = None) -> int:
+    """
+    Snapshot every user with trades, or events up to `end`, for each day
+    from `start` to `end`. With more than one worker, users are spread
+    over a process pool. Returns the number of rows written.
+    """
+    db = SessionLocal()
+    try:
+        # Trades that predate the event log are replayed from the baselines
+        # app.migrate wrote
+        user_ids = sorted(
+            {user_id for user_id, in db.query(Trade.user_id).distinct()}
+            | {
+                user_id for user_id, in db.query(TradeEvent.user_id)
+                .filter(TradeEvent.created_at <= datetime.combine(end, time.max))
+                .distinct()
+            }
+        )
+    finally:
+        db.close()
+
+    workers = min(workers or config.DAILY_SNAPSHOT_WORKERS or os.cpu_count() or 1, len(user_ids))
+    if workers <= 1:
+        return sum(snapshot_user(user_id, start, end) for user_id in user_ids)
+    # Workers must not reuse connections pooled by this process
+    dispose_engines()
+    with ProcessPoolExecutor(max_workers=workers, initializer=dispose_engines) as pool:
+        return sum(pool.map(snapshot_user, user_ids, repeat(start), repeat(end)))
+
+
+def end_of_day(day: date = None, workers: int = None) -> int:
+    """
+    Snapshot one day (default today). For today, current quotes from the
+    market data provider are stored as the day's closes first; past days use
+    the closes already in the store.
+    """
+    day = day or date.today()
+    if day == date.today():
+        db = SessionLocal()
+        try:
+            record_closes(db, day)
+        finally:
+            db.close()
+    return snapshot_range(day, day, workers)
+
+
+def end_of_day_job() -> int:
+    """
+    Re-snapshot today in the leader worker. Runs in-process: a serving
+    worker should not fork a pool.
+    """
+    return end_of_day(workers=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily position snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="store closes and snapshot one day (default today)")
+    run_parser.add_argument("--date", type=date.fromisoformat, default=None)
+    run_parser.add_argument("--workers", type=int, default=None)
+    backfill_parser = commands.add_parser("backfill", help="snapshot a date range from stored closes")
+    backfill_parser.add_argument("--start", type=date.fromisoformat, required=True)
+    backfill_parser.add_argument("--end", type=date.fromisoformat, default=None)
+    backfill_parser.add_argument("--prices", help="CSV of closes to load into the price store first")
+    backfill_parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "run":
+        written = end_of_day(args.date, args.workers)
+    else:
+        if args.prices:
+            db = SessionLocal()
+            try:
+                logger.info(f"Stored {store_prices(db, load_price_file(args.prices))} closes")
+            finally:
+                db.close()
+        written = snapshot_range(args.start, args.end or date.today(), args.workers)
+    logger.info(f"Wrote {written} snapshot rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Append-only trade event log and snapshot replay.
+
+Every mutation of a trade records an event in the same session before the
+caller commits, so the log and the trades table never disagree. Periodic
+snapshots store a compressed copy of each user's book; the book at any
+point in time is rebuilt from the nearest earlier snapshot plus the
+events after it. Trades that predate the log are covered by a baseline
+snapshot per user, written by `write_baselines` (run by app.migrate).
+
+    python -m app.events snapshot [--min-events 1000]
+    python -m app.events replay USER_ID [--at 2024-06-30T23:59:59]
+"""
+import argparse
+import json
+import logging
+import time
+import zlib
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, func, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Trade, TradeEvent, TradeSnapshot
+
+try:
+    # Optional faster JSON decoding for replay
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger("events")
+
+# Columns captured in events and snapshots
+TRADE_FIELDS = [
+    "date_of_trade",
+    "ticker",
+    "strategy_id",
+    "time_horizon",
+    "price",
+    "units",
+    "qty",
+    "current_price",
+    "open_qty",
+    "matched_trade_ids",
+    "pnl",
+    "realised_pnl",
+    "unrealised_pnl",
+    "currency",
+]
+
+# Rows fetched per round trip while replaying
+REPLAY_BATCH = 10000
+
+# Creation time of baseline snapshots, so replays at any date start from them
+BASELINE_AT = datetime(1970, 1, 1)
+
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _dumps(payload) -> str:
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def decode_payload(payload) -> dict:
+    """
+    Decode the stored JSON payload of an event.
+    """
+    return _loads(payload)
+
+
+def trade_state(trade: Trade) -> dict:
+    """
+    JSON-ready copy of the tracked columns of a trade.
+    """
+    return {field: _jsonable(getattr(trade, field)) for field in TRADE_FIELDS}
+
+
+def record(db: Session, user_id: int, event_type: str, payload: dict, trade_id: int = None):
+    """
+    Add an event to the session; it is written when the caller commits.
+    """
+    db.add(TradeEvent(
+        user_id=user_id,
+        trade_id=trade_id,
+        event_type=event_type,
+        payload=_dumps(payload),
+        created_at=datetime.utcnow(),
+    ))
+
+
+def record_created(db: Session, trade: Trade):
+    """
+    Record a new trade. The trade must be flushed so that it has an id.
+    """
+    record(db, trade.user_id, "trade_created", trade_state(trade), trade_id=trade.id)
+
+
+def record_updated(db: Session, trade: Trade, fields: Iterable[str]):
+    changes = {field: _jsonable(getattr(trade, field)) for field in fields}
+    if changes:
+        record(db, trade.user_id, "trade_updated", changes, trade_id=trade.id)
+
+
+def record_deleted(db: Session, trade: Trade):
+    record(db, trade.user_id, "trade_deleted", {}, trade_id=trade.id)
+
+
+def record_matched(db: Session, lots_before: List[dict], trades: List[Trade], matched_qty: float):
+    """
+    Record a match between trades. `lots_before` holds each lot's id, date,
+    price and open quantity before matching, so disposals can be reported
+    without looking the trades up again.
+    """
+    payload = {
+        "matched_qty": matched_qty,
+        "lots": lots_before,
+        "changes": {str(trade.id): trade_state(trade) for trade in trades},
+    }
+    record(db, trades[0].user_id, "trades_matched", payload)
+
+
+def record_price_marks(db: Session, trades: List[Trade]):
+    """
+    Record one compact price_marked event per user: [trade_id, price, unrealised_pnl] rows.
+    """
+    marks = defaultdict(list)
+    for trade in trades:
+        marks[trade.user_id].append([trade.id, trade.current_price, trade.unrealised_pnl])
+    for user_id, rows in marks.items():
+        record(db, user_id, "price_marked", {"marks": rows})
+
+
+def lot_before(trade: Trade) -> dict:
+    return {
+        "id": trade.id,
+        "date_of_trade": _jsonable(trade.date_of_trade),
+        "price": trade.price,
+        "open_qty": trade.open_qty,
+    }
+
+
+def _apply_corporate_action(state: Dict[int, dict], payload: dict):
+    ticker = payload["ticker"]
+    if payload["action_type"] == "ticker_change":
+        for row in state.values():
+            if row["ticker"] == ticker:
+                row["ticker"] = payload["new_ticker"]
+        return
+    factor = payload["factor"]
+    for row in state.values():
+        if row["ticker"] == ticker and row["date_of_trade"] < payload["ex_date"]:
+            row["unrealised_pnl"] = ((row["current_price"] or 0) * factor - row["price"]) * (row["open_qty"] or 0)
+            row["price"] = row["price"] / factor
+            for field in ("units", "qty", "open_qty"):
+                row[field] = (row[field] or 0) * factor
+
+
+def apply_event(state: Dict[int, dict], event_type: str, trade_id: Optional[int], payload: dict):
+    """
+    Apply one event to a book held as {trade_id: columns}.
+    """
+    if event_type == "trade_created":
+        state[trade_id] = payload
+    elif event_type == "trade_updated":
+        row = state.get(trade_id)
+        if row is not None:
+            row.update(payload)
+    elif event_type == "trade_deleted":
+        state.pop(trade_id, None)
+    elif event_type == "trades_matched":
+        for changed_id, changes in payload["changes"].items():
+            row = state.get(int(changed_id))
+            if row is not None:
+                row.update(changes)
+    elif event_type == "price_marked":
+        for marked_id, price, unrealised_pnl in payload["marks"]:
+            row = state.get(marked_id)
+            if row is not None:
+                row["current_price"] = price
+                row["unrealised_pnl"] = unrealised_pnl
+    elif event_type == "corporate_action":
+        _apply_corporate_action(state, payload)
+
+
+def encode_state(state: Dict[int, dict]) -> bytes:
+    rows = [[trade_id] + [row.get(field) for field in TRADE_FIELDS] for trade_id, row in state.items()]
+    return zlib.compress(_dumps({"fields": TRADE_FIELDS, "rows": rows}).encode())
+
+
+def decode_state(blob: bytes) -> Dict[int, dict]:
+    data = json.loads(zlib.decompress(blob))
+    fields = data["fields"]
+    return {row[0]: dict(zip(fields, row[1:])) for row in data["rows"]}
+
+
+def take_snapshot(db: Session, user_id: int) -> Optional[TradeSnapshot]:
+    """
+    Snapshot the user's current book as of their latest event.
+
+    The latest event id and the trades are read in one statement, so both
+    come from the same committed state. Read separately, a write committed
+    in between (a split, say) would be both in the stored rows and after
+    last_event_id, and replay would apply it twice.
+    """
+    last = (
+        select(func.max(TradeEvent.id).label("last_event_id"))
+        .where(TradeEvent.user_id == user_id)
+        .subquery()
+    )
+    rows = (
+        db.query(last.c.last_event_id, Trade)
+        .select_from(last)
+        .outerjoin(Trade, Trade.user_id == user_id)
+        .all()
+    )
+    last_event_id = rows[0][0]
+    if last_event_id is None:
+        return None
+    snapshot = TradeSnapshot(
+        user_id=user_id,
+        last_event_id=last_event_id,
+        created_at=datetime.utcnow(),
+        state=encode_state({trade.id: trade_state(trade) for _, trade in rows if trade is not None}),
+    )
+    db.add(snapshot)
+    db.commit()
+    return snapshot
+
+
+def snapshot_due(db: Session = None, min_events: int = 1000) -> int:
+    """
+    Snapshot every user with at least `min_events` events since their last
+    snapshot. Returns the number of snapshots taken.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        last_snapshot = dict(
+            db.query(TradeSnapshot.user_id, func.max(TradeSnapshot.last_event_id))
+            .group_by(TradeSnapshot.user_id)
+            .all()
+        )
+        taken = 0
+        for user_id, in db.query(TradeEvent.user_id).distinct().all():
+            pending = (
+                db.query(func.count(TradeEvent.id))
+                .filter(TradeEvent.user_id == user_id, TradeEvent.id > last_snapshot.get(user_id, 0))
+                .scalar()
+            )
+            if pending >= min_events and take_snapshot(db, user_id):
+                taken += 1
+        return taken
+    finally:
+        if own_session:
+            db.close()
+
+
+def write_baselines(db: Session) -> int:
+    """
+    Write a baseline snapshot for every user with trades that predate the
+    event log (trades without a trade_created event) and no baseline yet.
+    It holds those trades as they stand in the trades table, with
+    last_event_id 0 so every event of the user is replayed on top of it.
+    That is only exact before the log records changes to those trades, so
+    only app.migrate calls it, on the first migrate after upgrading.
+    Returns the number of baselines written.
+    """
+    created = exists().where(
+        TradeEvent.user_id == Trade.user_id,
+        TradeEvent.trade_id == Trade.id,
+        TradeEvent.event_type == "trade_created",
+    )
+    has_baseline = exists().where(
+        and_(TradeSnapshot.user_id == Trade.user_id, TradeSnapshot.last_event_id == 0)
+    )
+    legacy = defaultdict(dict)
+    for trade in db.query(Trade).filter(~created, ~has_baseline).order_by(Trade.user_id, Trade.id):
+        legacy[trade.user_id][trade.id] = trade_state(trade)
+    for user_id, state in legacy.items():
+        db.add(TradeSnapshot(user_id=user_id, last_event_id=0, created_at=BASELINE_AT, state=encode_state(state)))
+    db.commit()
+    return len(legacy)
+
+
+def rebuild_book(db: Session, user_id: int, at: datetime = None) -> Dict[int, dict]:
+    """
+    State of the user's trades at `at` (UTC, default now): the nearest
+    snapshot taken at or before `at` (or the user's baseline), plus the
+    events after it.
+    """
+    at = at or datetime.utcnow()
+    snapshot = (
+        db.query(TradeSnapshot.last_event_id, TradeSnapshot.state)
+        .filter(TradeSnapshot.user_id == user_id, TradeSnapshot.created_at <= at)
+        .order_by(TradeSnapshot.created_at.desc(), TradeSnapshot.id.desc())
+        .first()
+    )
+    state = decode_state(snapshot.state) if snapshot else {}
+    after_id = snapshot.last_event_id if snapshot else 0
+
+    # Plain Core rows streamed in batches; ORM row handling dominates at this volume
+    query = (
+        select(TradeEvent.event_type, TradeEvent.trade_id, TradeEvent.payload)
+        .where(
+            TradeEvent.user_id == user_id,
+            TradeEvent.id > after_id,
+            TradeEvent.created_at <= at,
+        )
+        .order_by(TradeEvent.id)
+        .execution_options(yield_per=REPLAY_BATCH)
+    )
+    for event_type, trade_id, payload in db.connection().execute(query):
+        apply_event(state, event_type, trade_id, _loads(payload))
+    return state
+
+
+def iter_books(db: Session, user_id: int, cutoffs: List[datetime]) -> Iterator[Tuple[datetime, Dict[int, dict]]]:
+    """
+    The user's book at each of the ascending `cutoffs`, replaying the log
+    once rather than once per cutoff. The same dict is updated in place
+    between yields, so use or copy it before advancing.
+    """
+    if not cutoffs:
+        return
+    state = rebuild_book(db, user_id, cutoffs[0])
+    query = (
+        select(TradeEvent.event_type, TradeEvent.trade_id, TradeEvent.payload, TradeEvent.created_at)
+        .where(
+            TradeEvent.user_id == user_id,
+            TradeEvent.created_at > cutoffs[0],
+            TradeEvent.created_at <= cutoffs[-1],
+        )
+        .order_by(TradeEvent.id)
+        .execution_options(yield_per=REPLAY_BATCH)
+    )
+    position = 0
+    for event_type, trade_id, payload, created_at in db.connection().execute(query):
+        while created_at > cutoffs[position]:
+            yield cutoffs[position], state
+            position += 1
+        apply_event(state, event_type, trade_id, _loads(payload))
+    for cutoff in cutoffs[position:]:
+        yield cutoff, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trade event log maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser("snapshot", help="snapshot users with enough new events")
+    snapshot_parser.add_argument("--min-events", type=int, default=1000)
+    replay_parser = commands.add_parser("replay", help="rebuild a user's book and report timing")
+    replay_parser.add_argument("user_id", type=int)
+    replay_parser.add_argument("--at", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        if args.command == "snapshot":
+            logger.info(f"Took {snapshot_due(db, args.min_events)} snapshots")
+        else:
+            started = time.perf_counter()
+            state = rebuild_book(db, args.user_id, args.at)
+            logger.info(f"Rebuilt {len(state)} trades in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
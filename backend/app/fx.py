@@ -0,0 +1,132 @@
+import json
+import threading
+from typing import Dict, Iterable, Sequence
+
+from app import config
+from app.cache import cache
+
+# Minor-unit quote currencies: (major currency, multiplier to the major unit)
+SUBUNITS = {
+    "GBp": ("GBP", 0.01),
+    "GBX": ("GBP", 0.01),
+    "ILA": ("ILS", 0.01),
+    "ZAc": ("ZAR", 0.01),
+}
+
+
+class FxError(Exception):
+    """
+    Raised when no rate is available for a currency pair.
+    """
+
+
+def normalise(currency: str):
+    """
+    Split a quote currency into its major currency and unit multiplier.
+    """
+    currency = currency or config.BASE_CURRENCY
+    if currency in SUBUNITS:
+        return SUBUNITS[currency]
+    return currency.upper(), 1.0
+
+
+class FxProvider:
+    """
+    Source of exchange rates: units of `quote` per one unit of `base`.
+    """
+
+    def fetch_rate(self, base: str, quote: str) -> float:
+        raise NotImplementedError
+
+
+class YFinanceFxProvider(FxProvider):
+    """
+    Live rates from Yahoo Finance currency pairs (e.g. EURUSD=X).
+    """
+
+    def fetch_rate(self, base: str, quote: str) -> float:
+        import yfinance as yf
+
+        try:
+            history = yf.Ticker(f"{base}{quote}=X").history(period="5d")
+            return float(history["Close"].iloc[-1])
+        except Exception as e:
+            raise FxError(f"No FX rate for {base}/{quote}: {e}") from e
+
+
+class FixtureFxProvider(FxProvider):
+    """
+    Rates from a local JSON file: {"quote": "USD", "rates": {"EUR": 1.08, ...}},
+    each rate being the value of one unit of the currency in `quote`. Cross
+    rates go through the file's quote currency.
+    """
+
+    def __init__(self, path: str):
+        with open(path) as handle:
+            data = json.load(handle)
+        self.rates = {currency.upper(): float(rate) for currency, rate in data["rates"].items()}
+        self.rates[data["quote"].upper()] = 1.0
+
+    def fetch_rate(self, base: str, quote: str) -> float:
+        try:
+            return self.rates[base] / self.rates[quote]
+        except KeyError as e:
+            raise FxError(f"No FX rate for {base}/{quote} in fixture") from e
+
+
+_providers = {
+    "yfinance": YFinanceFxProvider,
+    "fixture": lambda: FixtureFxProvider(config.FX_FIXTURE_PATH),
+}
+_provider = None
+_lock = threading.Lock()
+
+
+def get_fx_provider() -> FxProvider:
+    global _provider
+    with _lock:
+        if _provider is None:
+            _provider = _providers[config.FX_PROVIDER]()
+        return _provider
+
+
+def get_rate(currency: str, base: str = None) -> float:
+    """
+    Multiplier converting an amount quoted in `currency` into `base`
+    (default BASE_CURRENCY). Major-currency rates are cached for FX_TTL seconds.
+    """
+    base = base or config.BASE_CURRENCY
+    major, unit = normalise(currency)
+    base_major, base_unit = normalise(base)
+    if major == base_major:
+        return unit / base_unit
+
+    key = f"fx:{major}:{base_major}"
+    rate = cache.get(key)
+    if rate is None:
+        rate = get_fx_provider().fetch_rate(major, base_major)
+        cache.set(key, rate, ttl=config.FX_TTL)
+    return rate * unit / base_unit
+
+
+def get_rates(currencies: Iterable[str], base: str = None) -> Dict[str, float]:
+    """
+    Conversion multipliers for each distinct currency, one lookup per currency.
+    """
+    return {currency: get_rate(currency, base) for currency in set(currencies)}
+
+
+def to_base(amounts, currencies: Sequence[str], base: str = None):
+    """
+    Convert an array of amounts, each in its own currency, into `base` in one
+    vectorised step: rates are looked up once per distinct currency and
+    broadcast over the lots.
+    """
+    import numpy as np
+
+    amounts = np.asarray(amounts, dtype=float)
+    if amounts.size == 0:
+        return amounts
+    keys, index = np.unique(np.asarray(currencies, dtype=str), return_inverse=True)
+    rates = get_rates(keys.tolist(), base)
+    return amounts * np.array([rates[key] for key in keys])[index]
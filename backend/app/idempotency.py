@@ -0,0 +1,176 @@
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+
+from app import config
+from app.database import SessionLocal
+from app.models import IdempotencyKey
+
+# Seconds between checks while another worker finishes the original request
+POLL_INTERVAL = 0.05
+
+_key_locks: Dict[tuple, list] = {}
+_key_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _serialized(identity: tuple):
+    """
+    Serialize callers with the same key inside this process. Across
+    processes the unique constraint on the stored key does the same job.
+    """
+    with _key_locks_guard:
+        entry = _key_locks.setdefault(identity, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _key_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _key_locks[identity]
+
+
+def _hash(payload: Any) -> str:
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _replay(record: IdempotencyKey) -> JSONResponse:
+    return JSONResponse(
+        content=json.loads(record.response),
+        status_code=record.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _claim(db, identity: tuple, request_hash: str) -> Optional[IdempotencyKey]:
+    """
+    Insert a pending record for the key. Returns None when we now own the
+    key, otherwise the existing record.
+    """
+    user_id, scope, key = identity
+    now = datetime.utcnow()
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        scope=scope,
+        key=key,
+        request_hash=request_hash,
+        status="pending",
+        created_at=now,
+        expires_at=now + timedelta(seconds=config.IDEMPOTENCY_TTL),
+    ))
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+    return (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.user_id == user_id, IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .first()
+    )
+
+
+def _wait_for(db, record: IdempotencyKey) -> IdempotencyKey:
+    """
+    Wait until another process finishes the request that owns the key.
+    """
+    deadline = time.monotonic() + config.IDEMPOTENCY_WAIT
+    while record is not None and record.status == "pending":
+        if time.monotonic() > deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress.",
+            )
+        time.sleep(POLL_INTERVAL)
+        db.expire_all()
+        record = db.query(IdempotencyKey).filter(IdempotencyKey.id == record.id).first()
+    return record
+
+
+def run_idempotent(key: Optional[str], user_id: Optional[int], scope: str, payload: Any, fn: Callable[[], Any]):
+    """
+    Run `fn` at most once per (user, scope, key) within IDEMPOTENCY_TTL.
+
+    A retry with the same key gets the stored response back, marked with an
+    Idempotent-Replayed header, without running `fn` again. Concurrent
+    duplicates wait for the first request to finish. Reusing a key with a
+    different payload is rejected with 422. If `fn` fails, the key is
+    released so the client can retry.
+    """
+    if not key:
+        return fn()
+
+    identity = (user_id or 0, scope, key[:255])
+    request_hash = _hash(payload)
+    db = SessionLocal()
+    try:
+        with _serialized(identity):
+            record = _claim(db, identity, request_hash)
+            if record is not None and record.expires_at < datetime.utcnow():
+                db.delete(record)
+                db.commit()
+                record = _claim(db, identity, request_hash)
+            if record is not None:
+                if record.request_hash != request_hash:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Idempotency-Key was already used with a different request.",
+                    )
+                record = _wait_for(db, record)
+                if record is not None:
+                    return _replay(record)
+                # The original request failed and released the key; take it over
+                if _claim(db, identity, request_hash) is not None:
+                    raise HTTPException(
+                        status_code=409,
+                        detail="A request with this Idempotency-Key is still in progress.",
+                    )
+
+            try:
+                result = fn()
+            except BaseException:
+                db.query(IdempotencyKey).filter(
+                    IdempotencyKey.user_id == identity[0],
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == identity[2],
+                ).delete()
+                db.commit()
+                raise
+
+            content = jsonable_encoder(result)
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == identity[0],
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == identity[2],
+            ).update({"status": "done", "status_code": 200, "response": json.dumps(content)})
+            db.commit()
+            return content
+    finally:
+        db.close()
+
+
+def purge_expired(db=None) -> int:
+    """
+    Delete stored keys past their TTL. Run periodically by the leader worker.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        deleted = db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < datetime.utcnow()).delete()
+        db.commit()
+        return deleted
+    finally:
+        if own_session:
+            db.close()
@@ -0,0 +1,121 @@
+import logging
+import os
+
+from sqlalchemy import text
+
+from app import config
+
+logger = logging.getLogger("leader")
+
+
+class LeaderLock:
+    """
+    Non-blocking, process-wide lock that decides which worker runs periodic
+    jobs. `acquire` may be called repeatedly: it returns True while this
+    process holds the lock, and lets a standby worker take over once the
+    holder exits.
+    """
+
+    def acquire(self) -> bool:
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+
+class NoLeaderLock(LeaderLock):
+    """
+    Every process is the leader. Only for single-worker deployments.
+    """
+
+    def acquire(self) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+
+class FileLeaderLock(LeaderLock):
+    """
+    Exclusive lock on a local file. Covers workers on a single host.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+
+    def acquire(self) -> bool:
+        if self._handle is not None:
+            return True
+        handle = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._handle = handle
+        logger.info(f"Process {os.getpid()} became leader via {self.path}")
+        return True
+
+    def release(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class DatabaseLeaderLock(LeaderLock):
+    """
+    MySQL advisory lock (GET_LOCK). Covers workers on every host sharing the
+    database. The lock lives as long as the dedicated connection holding it.
+    """
+
+    def __init__(self, engine, name: str = "trade_tracker_leader"):
+        self.engine = engine
+        self.name = name
+        self._conn = None
+
+    def acquire(self) -> bool:
+        if self._conn is not None:
+            try:
+                held = self._conn.execute(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.name}
+                ).scalar()
+                if held:
+                    return True
+            except Exception:
+                pass
+            self.release()
+        conn = self.engine.connect()
+        if conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.name}).scalar() == 1:
+            self._conn = conn
+            logger.info(f"Process {os.getpid()} became leader via GET_LOCK({self.name})")
+            return True
+        conn.close()
+        return False
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+            except Exception:
+                pass
+            self._conn.close()
+            self._conn = None
+
+
+def create_leader_lock(engine) -> LeaderLock:
+    """
+    Build the lock selected by LEADER_LOCK.
+    """
+    if config.LEADER_LOCK == "none":
+        return NoLeaderLock()
+    if config.LEADER_LOCK == "database":
+        return DatabaseLeaderLock(engine)
+    return FileLeaderLock(config.LEADER_LOCK_PATH)
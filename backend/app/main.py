@@ -1,11 +1,82 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import strategies, trades, auth
-from app.database import engine, Base
+from starlette.concurrency import run_in_threadpool
+from app import config
+from app.routes import strategies, trades, auth, portfolio, tickers, reports, debug
+from app.database import engine, SessionLocal, dispose_engines, replica_engines
+from app.auth import get_admin_user
+from app.cache import cache
+from app.leader import create_leader_lock
+from app.migrate import migrate
+from app.pricing import refresh_all_prices
+from app import events, throttle
+from app.idempotency import purge_expired
+from app.tickers import refresh_index
+from app.compression import CompressionMiddleware
+from app.query_stats import QueryStatsMiddleware, query_stats
+from app.daily_snapshots import end_of_day_job
 
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger("main")
 
-app = FastAPI()
+
+async def leader_loop(leader_lock, interval: float, job, name: str):
+    """
+    Run `job` every `interval` seconds. All workers run the loop but only
+    the current leader does the work, so periodic jobs run once per
+    interval however many workers are serving.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await run_in_threadpool(leader_lock.acquire):
+                result = await run_in_threadpool(job)
+                logger.info(f"Background {name} finished: {result}")
+        except Exception as e:
+            logger.error(f"Background {name} failed: {e}")
+
+
+def snapshot_job():
+    return events.snapshot_due(min_events=config.SNAPSHOT_MIN_EVENTS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.AUTO_MIGRATE:
+        migrate()
+    # Tickers are seeded by migrate; workers only load the index
+    db = SessionLocal()
+    try:
+        refresh_index(db)
+    finally:
+        db.close()
+    leader_lock = create_leader_lock(engine)
+    jobs = [
+        (config.PRICE_REFRESH_INTERVAL, refresh_all_prices, "price refresh"),
+        (config.SNAPSHOT_INTERVAL, snapshot_job, "event snapshot"),
+        (config.IDEMPOTENCY_PURGE_INTERVAL, purge_expired, "idempotency key purge"),
+        (config.DAILY_SNAPSHOT_INTERVAL, end_of_day_job, "daily snapshot"),
+    ]
+    tasks = [
+        asyncio.create_task(leader_loop(leader_lock, interval, job, name))
+        for interval, job, name in jobs
+        if interval > 0
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        leader_lock.release()
+        if config.QUERY_STATS and config.QUERY_STATS_DUMP_PATH:
+            query_stats.dump()
+        cache.close()
+        dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -16,12 +87,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses; streamed reports are compressed chunk by chunk
+if config.COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MIN_SIZE)
+
+# Record statement statistics, attributed to the route being served
+if config.QUERY_STATS:
+    query_stats.install(engine, *replica_engines)
+    app.add_middleware(QueryStatsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(strategies.router, prefix="/strategies", tags=["Strategies"])
 app.include_router(trades.router, prefix="/trades", tags=["Trades"])
+app.include_router(portfolio.router, prefix="/portfolio", tags=["Portfolio"])
+app.include_router(tickers.router, prefix="/tickers", tags=["Tickers"])
+app.include_router(reports.router, prefix="/reports", tags=["Reports"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
 
 # Test root endpoint
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Trade Tracker API"}
+
+
+@app.get("/metrics/throttle")
+def throttle_metrics(current_user: dict = Depends(get_admin_user)):
+    """
+    Allowed, rejected and coalesced call counts for rate-limited routes in this worker.
+    """
+    return throttle.snapshot()
@@ -0,0 +1,55 @@
+import threading
+from typing import Callable, Dict, Optional
+
+from app import config
+from app.market_data.base import MarketDataError, MarketDataProvider
+from app.market_data.replay import ReplayProvider
+from app.market_data.synthetic import SyntheticProvider
+from app.market_data.yahoo import YFinanceProvider
+
+# Provider factories by name; MARKET_DATA_PROVIDER picks one
+_factories: Dict[str, Callable[[], MarketDataProvider]] = {
+    "yfinance": YFinanceProvider,
+    "replay": lambda: ReplayProvider(
+        config.MARKET_DATA_REPLAY_PATH, speed=config.MARKET_DATA_REPLAY_SPEED
+    ),
+    "synthetic": lambda: SyntheticProvider(
+        seed=config.MARKET_DATA_SEED, volatility=config.MARKET_DATA_VOLATILITY
+    ),
+}
+_instances: Dict[str, MarketDataProvider] = {}
+_lock = threading.Lock()
+
+
+def register_provider(name: str, factory: Callable[[], MarketDataProvider]):
+    """
+    Make a provider available under `name`, replacing any existing one.
+    """
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """
+    Return the shared provider instance, by default the configured one.
+    """
+    name = name or config.MARKET_DATA_PROVIDER
+    with _lock:
+        provider = _instances.get(name)
+        if provider is None:
+            if name not in _factories:
+                raise MarketDataError(f"Unknown market data provider: {name}")
+            provider = _instances[name] = _factories[name]()
+        return provider
+
+
+__all__ = [
+    "MarketDataError",
+    "MarketDataProvider",
+    "ReplayProvider",
+    "SyntheticProvider",
+    "YFinanceProvider",
+    "get_provider",
+    "register_provider",
+]
@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, List
+
+# Listing currency by Yahoo exchange suffix; US listings have no suffix.
+# London quotes are in pence (GBp), as Yahoo reports them.
+SUFFIX_CURRENCIES = {
+    "L": "GBp",
+    "TO": "CAD",
+    "V": "CAD",
+    "DE": "EUR",
+    "F": "EUR",
+    "PA": "EUR",
+    "AS": "EUR",
+    "MI": "EUR",
+    "MC": "EUR",
+    "BR": "EUR",
+    "SW": "CHF",
+    "T": "JPY",
+    "HK": "HKD",
+    "AX": "AUD",
+    "SI": "SGD",
+    "NS": "INR",
+    "BO": "INR",
+}
+DEFAULT_CURRENCY = "USD"
+
+
+def currency_from_suffix(ticker: str) -> str:
+    """
+    Listing currency implied by the ticker's exchange suffix, e.g. VOD.L -> GBp.
+    """
+    _, dot, suffix = ticker.rpartition(".")
+    return SUFFIX_CURRENCIES.get(suffix.upper(), DEFAULT_CURRENCY) if dot else DEFAULT_CURRENCY
+
+
+class MarketDataError(Exception):
+    """
+    Raised when a provider cannot quote a ticker.
+    """
+
+
+class MarketDataProvider:
+    """
+    Source of latest prices, daily closing history and listing currency.
+    Subclasses implement `get_price` and `get_history`; the batch methods may
+    be overridden when the source supports batch lookups.
+    """
+
+    name = ""
+
+    def get_price(self, ticker: str) -> float:
+        raise NotImplementedError
+
+    def get_prices(self, tickers: Iterable[str]) -> Dict[str, float]:
+        """
+        Quote each distinct ticker once. Tickers that fail are left out of the result.
+        """
+        prices = {}
+        for ticker in set(tickers):
+            try:
+                prices[ticker] = self.get_price(ticker)
+            except MarketDataError:
+                continue
+        return prices
+
+    def get_currency(self, ticker: str) -> str:
+        """
+        Currency the ticker is quoted in. Defaults to the exchange suffix convention.
+        """
+        return currency_from_suffix(ticker)
+
+    def get_history(self, ticker: str, days: int) -> List[float]:
+        """
+        Up to `days` most recent daily closes, oldest first.
+        """
+        raise NotImplementedError
+
+    def get_histories(self, tickers: Iterable[str], days: int) -> Dict[str, List[float]]:
+        """
+        History for each distinct ticker. Tickers that fail are left out of the result.
+        """
+        histories = {}
+        for ticker in set(tickers):
+            try:
+                histories[ticker] = self.get_history(ticker, days)
+            except MarketDataError:
+                continue
+        return histories
@@ -0,0 +1,104 @@
+import csv
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from app.market_data.base import MarketDataError, MarketDataProvider, currency_from_suffix
+
+
+def _parse_timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def _read_rows(path: str) -> List[dict]:
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="") as handle:
+        return list(csv.DictReader(handle))
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves historical ticks from a local CSV or Parquet file.
+
+    The file needs `timestamp` (or `date`), `ticker` and `price` (or `close`)
+    columns, and may carry a `currency` column. The replay clock starts at
+    the first tick when the provider is created and advances `speed`
+    historical seconds per wall-clock second; with `speed=0` every ticker
+    is quoted at its final tick.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, speed: float = 0.0):
+        if not path:
+            raise MarketDataError("Replay provider needs MARKET_DATA_REPLAY_PATH")
+        self.speed = speed
+        self._series: Dict[str, Tuple[List[float], List[float]]] = {}
+        self._currencies: Dict[str, str] = {}
+        ticks: Dict[str, List[Tuple[float, float]]] = {}
+        for row in _read_rows(path):
+            timestamp = _parse_timestamp(row.get("timestamp", row.get("date")))
+            price = float(row.get("price", row.get("close")))
+            ticks.setdefault(row["ticker"], []).append((timestamp, price))
+            if row.get("currency"):
+                self._currencies[row["ticker"]] = row["currency"]
+        for ticker, series in ticks.items():
+            series.sort()
+            self._series[ticker] = ([t for t, _ in series], [p for _, p in series])
+        starts = [times[0] for times, _ in self._series.values()]
+        self._origin = min(starts) if starts else 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        """
+        Current position of the replay clock as a Unix timestamp.
+        """
+        if self.speed <= 0:
+            return float("inf")
+        return self._origin + (time.monotonic() - self._started) * self.speed
+
+    def rewind(self):
+        with self._lock:
+            self._started = time.monotonic()
+
+    def get_price(self, ticker: str) -> float:
+        series = self._series.get(ticker)
+        if series is None:
+            raise MarketDataError(f"No replay data for ticker {ticker}")
+        times, prices = series
+        index = bisect_right(times, self.now())
+        if index == 0:
+            raise MarketDataError(f"Replay for ticker {ticker} has not started yet")
+        return prices[index - 1]
+
+    def get_currency(self, ticker: str) -> str:
+        return self._currencies.get(ticker) or currency_from_suffix(ticker)
+
+    def get_history(self, ticker: str, days: int) -> List[float]:
+        """
+        Last tick of each calendar day up to the replay clock.
+        """
+        series = self._series.get(ticker)
+        if series is None:
+            raise MarketDataError(f"No replay data for ticker {ticker}")
+        times, prices = series
+        closes: Dict[str, float] = {}
+        for timestamp, price in zip(times[:bisect_right(times, self.now())], prices):
+            closes[datetime.fromtimestamp(timestamp).date().isoformat()] = price
+        if not closes:
+            raise MarketDataError(f"Replay for ticker {ticker} has not started yet")
+        return list(closes.values())[-days:]
@@ -0,0 +1,57 @@
+import math
+import random
+import threading
+import zlib
+from typing import Dict, List
+
+from app.market_data.base import MarketDataProvider
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic geometric random walk for load testing.
+
+    Each ticker gets its own generator seeded from `seed` and the ticker
+    symbol, so a run is reproducible regardless of request order. Every
+    quote advances that ticker's walk by one step.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, seed: int = 42, volatility: float = 0.02):
+        self.seed = seed
+        self.volatility = volatility
+        self._walks: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _ticker_seed(self, ticker: str) -> int:
+        return self.seed ^ zlib.crc32(ticker.encode())
+
+    def _walk(self, ticker: str) -> list:
+        walk = self._walks.get(ticker)
+        if walk is None:
+            rng = random.Random(self._ticker_seed(ticker))
+            walk = self._walks[ticker] = [rng, rng.uniform(10, 500)]
+        return walk
+
+    def get_price(self, ticker: str) -> float:
+        with self._lock:
+            walk = self._walk(ticker)
+            rng, price = walk
+            walk[1] = price * math.exp(rng.gauss(0, self.volatility))
+            return round(walk[1], 4)
+
+    def get_history(self, ticker: str, days: int) -> List[float]:
+        """
+        Daily closes leading up to the walk's starting price. Generated from
+        a separate stream, so it does not advance the live walk.
+        """
+        rng = random.Random(self._ticker_seed(ticker) + 1)
+        with self._lock:
+            price = self._walk(ticker)[1]
+        closes = [round(price, 4)]
+        for _ in range(days - 1):
+            price = price / math.exp(rng.gauss(0, self.volatility))
+            closes.append(round(price, 4))
+        closes.reverse()
+        return closes
@@ -0,0 +1,48 @@
+from typing import Dict, List
+
+from app.market_data.base import MarketDataError, MarketDataProvider, currency_from_suffix
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live quotes from Yahoo Finance. `yfinance` is imported on first use.
+    """
+
+    name = "yfinance"
+
+    def __init__(self):
+        self._currencies: Dict[str, str] = {}
+
+    def get_price(self, ticker: str) -> float:
+        import yfinance as yf
+
+        try:
+            history = yf.Ticker(ticker).history(period="1d")
+            return float(history["Close"].iloc[-1])
+        except Exception as e:
+            raise MarketDataError(f"No price for ticker {ticker}: {e}") from e
+
+    def get_history(self, ticker: str, days: int) -> List[float]:
+        import yfinance as yf
+
+        try:
+            # Calendar period long enough to cover `days` trading sessions
+            history = yf.Ticker(ticker).history(period=f"{int(days * 1.5) + 5}d")
+            closes = [float(close) for close in history["Close"].tolist()]
+        except Exception as e:
+            raise MarketDataError(f"No history for ticker {ticker}: {e}") from e
+        if not closes:
+            raise MarketDataError(f"No history for ticker {ticker}")
+        return closes[-days:]
+
+    def get_currency(self, ticker: str) -> str:
+        currency = self._currencies.get(ticker)
+        if currency is None:
+            import yfinance as yf
+
+            try:
+                currency = yf.Ticker(ticker).fast_info["currency"] or currency_from_suffix(ticker)
+            except Exception:
+                currency = currency_from_suffix(ticker)
+            self._currencies[ticker] = currency
+        return currency
@@ -0,0 +1,43 @@
+"""
+Explicit schema step.
+
+    python -m app.migrate
+
+Creates any missing tables, seeds the tickers table from TICKER_SEED_PATH
+and writes event-log baselines for trades that predate the log. Run it
+before starting the API when AUTO_MIGRATE=0, so workers start without
+issuing DDL.
+"""
+import logging
+
+from app.database import Base, SessionLocal, engine
+from app import models  # noqa: F401  (register tables on Base.metadata)
+from app.events import write_baselines
+from app.tickers import seed_tickers
+
+logger = logging.getLogger("migrate")
+
+
+def migrate():
+    """
+    Create missing tables, seed tickers and write baseline snapshots. Safe
+    to run repeatedly; serve.py runs it once in the master before workers
+    start.
+    """
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seeded = seed_tickers(db)
+        written = write_baselines(db)
+    finally:
+        db.close()
+    if seeded:
+        logger.info(f"Seeded {seeded} tickers")
+    if written:
+        logger.info(f"Wrote event-log baselines for {written} users")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    logger.info(f"Schema is up to date on {engine.url.render_as_string(hide_password=True)}")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Date, DateTime, UniqueConstraint, Index, Text, LargeBinary
+from datetime import datetime
 from app.database import Base
 
 class User(Base):
@@ -16,12 +17,26 @@ class Strategy(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
 
 
+class Ticker(Base):
+    """
+    Reference data for a tradable symbol, shared by every trade in it.
+    """
+    __tablename__ = "tickers"
+
+    symbol = Column(String(255), primary_key=True)
+    exchange = Column(String(64))
+    currency = Column(String(3), nullable=False, default="USD")
+    name = Column(String(255))
+    last_price = Column(Float)
+    last_quoted_at = Column(DateTime)
+
+
 class Trade(Base):
     __tablename__ = "trades"
     id = Column(Integer, primary_key=True, index=True)
     date = Column(String(255))  # Timestamp when the trade was created
     date_of_trade = Column(Date, nullable=False)  # Actual trade date
-    ticker = Column(String(255), nullable=False)  # Stock ticker
+    ticker = Column(String(255), ForeignKey("tickers.symbol"), nullable=False)  # Stock ticker
     strategy_id = Column(Integer, ForeignKey("strategies.id"))  # Foreign key to strategies
     time_horizon = Column(Enum("Short", "Mid", "Long"))  # Duration of the trade
     price = Column(Float, nullable=False)  # Price at which the trade was executed
@@ -33,6 +48,7 @@ class Trade(Base):
     pnl = Column(Float, default=0.0)
     realised_pnl = Column(Float, default=0.0)  # Profit/Loss for matched trades
     unrealised_pnl = Column(Float, default=0.0)  # Unrealised PnL for open trades
+    currency = Column(String(3), nullable=False, default="USD", server_default="USD")  # Quote currency of price/current_price
     user_id = Column(Integer, ForeignKey("users.id"))
 
     def calculate_unrealised_pnl(self):
@@ -92,3 +108,115 @@ class Trade(Base):
         # Recalculate unrealised PnL
         self.unrealised_pnl = self.calculate_unrealised_pnl()
         other_trade.unrealised_pnl = other_trade.calculate_unrealised_pnl()
+
+
+class CorporateAction(Base):
+    __tablename__ = "corporate_actions"
+    __table_args__ = (UniqueConstraint("ticker", "action_type", "ex_date"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String(255), nullable=False, index=True)
+    action_type = Column(Enum("split", "reverse_split", "ticker_change"), nullable=False)
+    ex_date = Column(Date, nullable=False)
+    ratio = Column(Float, nullable=True)  # Split: new shares per old share; reverse split: old shares per new share
+    new_ticker = Column(String(255), nullable=True)  # Ticker change only
+    applied_at = Column(DateTime, nullable=True)  # Set once the adjustment has run
+
+
+class CorporateActionAudit(Base):
+    __tablename__ = "corporate_action_audit"
+
+    id = Column(Integer, primary_key=True, index=True)
+    action_id = Column(Integer, ForeignKey("corporate_actions.id"), nullable=False)
+    applied_at = Column(DateTime, nullable=False)
+    trades_affected = Column(Integer, nullable=False)
+    users_affected = Column(Integer, nullable=False)
+    detail = Column(String(255))
+
+
+class TradeEvent(Base):
+    """
+    Append-only log of every change to a user's trades, written in the same
+    transaction as the change itself.
+    """
+    __tablename__ = "trade_events"
+    __table_args__ = (Index("ix_trade_events_user_id_id", "user_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    trade_id = Column(Integer, nullable=True)  # Empty for events covering several trades
+    event_type = Column(
+        Enum("trade_created", "trade_updated", "trade_deleted", "trades_matched",
+             "price_marked", "corporate_action"),
+        nullable=False,
+    )
+    payload = Column(Text(2**32 - 1), nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class TradeSnapshot(Base):
+    """
+    Compressed state of a user's book as of `last_event_id`, the starting
+    point for replaying later events.
+    """
+    __tablename__ = "trade_snapshots"
+    __table_args__ = (Index("ix_trade_snapshots_user_id_created_at", "user_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_event_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    state = Column(LargeBinary(2**32 - 1), nullable=False)  # zlib-compressed JSON
+
+
+class IdempotencyKey(Base):
+    """
+    Stored outcome of a request submitted with an Idempotency-Key header.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "scope", "key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)  # 0 for unauthenticated routes
+    scope = Column(String(64), nullable=False)  # Route the key was used on
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(Enum("pending", "done"), nullable=False, default="pending")
+    status_code = Column(Integer)
+    response = Column(Text(2**32 - 1))  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class DailyPrice(Base):
+    """
+    Local store of daily closing prices used by the daily snapshot job.
+    """
+    __tablename__ = "daily_prices"
+
+    ticker = Column(String(255), primary_key=True)
+    price_date = Column(Date, primary_key=True)
+    close = Column(Float, nullable=False)
+
+
+class DailySnapshot(Base):
+    """
+    End-of-day state of one position (ticker, strategy and time horizon) of a user.
+    """
+    __tablename__ = "daily_snapshots"
+    __table_args__ = (
+        Index("ix_daily_snapshots_user_id_snapshot_date", "user_id", "snapshot_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    snapshot_date = Column(Date, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    ticker = Column(String(255), nullable=False)
+    strategy_id = Column(Integer)
+    time_horizon = Column(Enum("Short", "Mid", "Long"))
+    currency = Column(String(3), nullable=False, default="USD")
+    qty = Column(Float, nullable=False, default=0)
+    close_price = Column(Float)
+    market_value = Column(Float)
+    realised_pnl = Column(Float, default=0)
+    unrealised_pnl = Column(Float, default=0)
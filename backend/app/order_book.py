@@ -0,0 +1,260 @@
+"""
+Hot tier of per-user order books.
+
+Active users' lots are held in memory as compact `Lot` objects, with open
+lots indexed by position (ticker, strategy_id, time_horizon), so listing,
+matching, price refreshes and risk read no trade rows. Changes are written
+through to the database inside `OrderBookCache.write`, which keeps the
+book only if no other write to the user happened in between; otherwise the
+book is dropped and reloaded on next use.
+
+Books are checked against the per-user data version in the shared cache, so
+with several workers CACHE_BACKEND must be shared ("sqlite" or "redis").
+Books are evicted least recently used first beyond ORDER_BOOK_MAX_USERS,
+and after ORDER_BOOK_IDLE_SECONDS without use.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app import config
+from app.cache import data_version, invalidate_user
+from app.database import SessionLocal
+from app.models import Trade
+
+# Trade columns held by a lot
+LOT_FIELDS = (
+    "id",
+    "user_id",
+    "date",
+    "date_of_trade",
+    "ticker",
+    "strategy_id",
+    "time_horizon",
+    "price",
+    "units",
+    "qty",
+    "current_price",
+    "open_qty",
+    "matched_trade_ids",
+    "pnl",
+    "realised_pnl",
+    "unrealised_pnl",
+    "currency",
+)
+
+PositionKey = Tuple[str, Optional[int], Optional[str]]
+
+
+class Lot:
+    """
+    One trade, with the same attribute names as `Trade` so matching and
+    pricing code works on either.
+    """
+    __slots__ = LOT_FIELDS
+
+    def __init__(self, **values):
+        for field in LOT_FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_trade(cls, trade: Trade) -> "Lot":
+        return cls(**{field: getattr(trade, field) for field in LOT_FIELDS})
+
+    @property
+    def position(self) -> PositionKey:
+        return (self.ticker, self.strategy_id, self.time_horizon)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in LOT_FIELDS}
+
+
+class Book:
+    """
+    All lots of one user by id, plus the open ones by position.
+    """
+    __slots__ = ("user_id", "version", "lots", "positions", "keys", "lock", "last_used")
+
+    def __init__(self, user_id: int, version: int, lots: Iterable[Lot]):
+        self.user_id = user_id
+        self.version = version
+        self.lots: Dict[int, Lot] = {}
+        self.positions: Dict[PositionKey, Dict[int, Lot]] = {}
+        self.keys: Dict[int, PositionKey] = {}  # lot id -> position it is indexed under
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+        for lot in lots:
+            self.add(lot)
+
+    def add(self, lot: Lot):
+        self.lots[lot.id] = lot
+        self.reindex(lot)
+
+    def reindex(self, lot: Lot):
+        """
+        Move a lot to its current position, or out of the index once closed.
+        """
+        key = self.keys.pop(lot.id, None)
+        if key is not None:
+            bucket = self.positions[key]
+            del bucket[lot.id]
+            if not bucket:
+                del self.positions[key]
+        if lot.open_qty:
+            self.positions.setdefault(lot.position, {})[lot.id] = lot
+            self.keys[lot.id] = lot.position
+
+    def position(self, ticker: str, strategy_id: int, time_horizon: str) -> List[Lot]:
+        return list(self.positions.get((ticker, strategy_id, time_horizon), {}).values())
+
+    def open_lots(self) -> List[Lot]:
+        return [lot for bucket in self.positions.values() for lot in bucket.values()]
+
+
+def load_lots(db: Session, user_id: int) -> List[Lot]:
+    columns = [getattr(Trade, field) for field in LOT_FIELDS]
+    rows = db.query(*columns).filter(Trade.user_id == user_id).order_by(Trade.id).all()
+    return [Lot(**row._asdict()) for row in rows]
+
+
+def write_lots(db: Session, lots: Iterable[Lot], fields: Iterable[str]):
+    """
+    Persist `fields` of each lot with one executemany UPDATE. The caller commits.
+    """
+    fields = list(fields)
+    rows = [{"lot_id": lot.id, **{field: getattr(lot, field) for field in fields}} for lot in lots]
+    if rows:
+        db.connection().execute(
+            update(Trade)
+            .where(Trade.id == bindparam("lot_id"))
+            .values({field: bindparam(field) for field in fields}),
+            rows,
+        )
+
+
+class OrderBookCache:
+    """
+    Per-worker LRU of user books.
+    """
+
+    def __init__(self, enabled: bool, max_users: int, idle_seconds: float):
+        self.enabled = enabled
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self._books: "OrderedDict[int, Book]" = OrderedDict()
+        self._owners: Dict[int, int] = {}  # trade id -> user id of loaded books
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._books)
+
+    def _evict_locked(self, user_id: int):
+        book = self._books.pop(user_id, None)
+        if book is not None:
+            for lot_id in book.lots:
+                self._owners.pop(lot_id, None)
+
+    def evict(self, user_id: int):
+        with self._lock:
+            self._evict_locked(user_id)
+
+    def _sweep_locked(self):
+        now = time.monotonic()
+        while self._books:
+            user_id, book = next(iter(self._books.items()))
+            if len(self._books) <= self.max_users and now - book.last_used < self.idle_seconds:
+                break
+            self._evict_locked(user_id)
+
+    def get(self, user_id: int) -> Book:
+        """
+        The user's book, loaded from the primary when missing or out of date.
+        """
+        version = data_version(user_id)
+        with self._lock:
+            book = self._books.get(user_id)
+            if book is not None and book.version == version:
+                book.last_used = time.monotonic()
+                self._books.move_to_end(user_id)
+                self._sweep_locked()
+                return book
+
+        db = SessionLocal()
+        try:
+            book = Book(user_id, version, load_lots(db, user_id))
+        finally:
+            db.close()
+        with self._lock:
+            self._evict_locked(user_id)
+            self._books[user_id] = book
+            self._owners.update((lot_id, user_id) for lot_id in book.lots)
+            self._sweep_locked()
+        return book
+
+    def owner(self, trade_id: int) -> Optional[int]:
+        """
+        User of a trade in a loaded book, if any.
+        """
+        return self._owners.get(trade_id)
+
+    @contextmanager
+    def write(self, user_id: int):
+        """
+        Lock the user's book for a change. Inside the block the caller
+        mutates lots and writes them to the database and commits. On exit
+        the user is invalidated; the book is kept if its version was current,
+        otherwise, or if the block raised, it is dropped.
+        """
+        book = self.get(user_id)
+        book.lock.acquire()
+        if book.version != data_version(user_id):
+            # Another worker wrote since the book was fetched
+            book.lock.release()
+            self.evict(user_id)
+            book = self.get(user_id)
+            book.lock.acquire()
+        try:
+            try:
+                yield book
+            except BaseException:
+                self.evict(user_id)
+                raise
+            version = invalidate_user(user_id)
+            if version == book.version + 1:
+                book.version = version
+                with self._lock:
+                    self._owners.update((lot_id, user_id) for lot_id in book.lots)
+            else:
+                self.evict(user_id)
+        finally:
+            book.lock.release()
+
+    def add_lot(self, user_id: int, version: int, lot: Lot):
+        """
+        Add a lot that was just inserted and committed elsewhere, given the
+        data version returned by that write's `invalidate_user`.
+        """
+        with self._lock:
+            book = self._books.get(user_id)
+        if book is None:
+            return
+        with book.lock:
+            if version == book.version + 1:
+                book.add(lot)
+                book.version = version
+                with self._lock:
+                    self._owners[lot.id] = user_id
+            else:
+                self.evict(user_id)
+
+
+order_books = OrderBookCache(
+    enabled=config.ORDER_BOOK,
+    max_users=config.ORDER_BOOK_MAX_USERS,
+    idle_seconds=config.ORDER_BOOK_IDLE_SECONDS,
+)
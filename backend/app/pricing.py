@@ -0,0 +1,69 @@
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app import events
+from app.cache import invalidate_user
+from app.database import SessionLocal
+from app.market_data import get_provider
+from app.models import Ticker, Trade
+
+logger = logging.getLogger("pricing")
+
+
+def apply_latest_prices(db: Session, trades: List[Trade], prices: Dict[str, float] = None) -> List[Trade]:
+    """
+    Mark trades to the latest provider price, quoting each distinct ticker once
+    unless `prices` are given, and record the marks in the event log.
+    Returns the trades that were updated; the caller commits.
+    """
+    if prices is None:
+        prices = get_provider().get_prices(trade.ticker for trade in trades)
+    if prices:
+        # Keep the reference table's last quote current, one executemany for all tickers
+        now = datetime.utcnow()
+        db.connection().execute(
+            update(Ticker)
+            .where(Ticker.symbol == bindparam("ticker_symbol"))
+            .values(last_price=bindparam("price"), last_quoted_at=bindparam("quoted_at")),
+            [{"ticker_symbol": ticker, "price": price, "quoted_at": now} for ticker, price in prices.items()],
+        )
+    updated_trades = []
+    for trade in trades:
+        current_price = prices.get(trade.ticker)
+        if current_price is None:
+            logger.warning(f"Failed to update trade for ticker {trade.ticker}: no price available")
+            continue
+
+        trade.current_price = current_price
+        trade.unrealised_pnl = (current_price - trade.price) * trade.open_qty
+        updated_trades.append(trade)
+    events.record_price_marks(db, updated_trades)
+    return updated_trades
+
+
+def refresh_all_prices(db: Session = None) -> int:
+    """
+    Mark every open lot in the database to market. The distinct tickers of
+    open lots are quoted first, so only lots with a fresh quote are loaded;
+    closed lots are never touched. Run by the leader worker's periodic
+    refresh loop.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        is_open = Trade.open_qty != 0
+        tickers = [ticker for ticker, in db.query(Trade.ticker).filter(is_open).distinct()]
+        prices = get_provider().get_prices(tickers)
+        trades = db.query(Trade).filter(is_open, Trade.ticker.in_(list(prices))).all() if prices else []
+        updated_trades = apply_latest_prices(db, trades, prices)
+        db.commit()
+        for user_id in {trade.user_id for trade in updated_trades}:
+            invalidate_user(user_id)
+        return len(updated_trades)
+    finally:
+        if own_session:
+            db.close()
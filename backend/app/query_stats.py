@@ -0,0 +1,259 @@
+"""
+SQL diagnostics hooked into SQLAlchemy cursor events.
+
+Every statement is reduced to a fingerprint (literals and placeholders
+replaced, IN lists collapsed) and counted with its latency, keeping a
+bounded window of recent timings per fingerprint for percentiles and the
+routes that issued it. The first time a fingerprint runs slower than
+QUERY_SLOW_MS the statement and its parameters are kept, and its plan is
+captured with EXPLAIN (EXPLAIN QUERY PLAN on SQLite) on a separate
+connection when the statistics are next read, so requests never wait on
+it. Statistics are per worker process; serve them from GET /debug/queries
+or write them to a file with `dump`.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app import config
+
+logger = logging.getLogger("query_stats")
+
+# Distinct statement strings whose fingerprints are memoised
+MAX_STATEMENTS = 5000
+
+# Characters of the first-seen statement kept for display
+STATEMENT_PREVIEW = 2000
+
+EXPLAINABLE = ("select", "update", "delete", "with")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"(values\s*\(\?[^)]*\))(?:\s*,\s*\(\?[^)]*\))+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+# ASGI scope of the request being served, for attributing statements to routes
+current_scope: ContextVar[Optional[dict]] = ContextVar("query_stats_scope", default=None)
+
+
+def normalise(statement: str) -> str:
+    text = _STRING.sub("?", statement)
+    text = _NUMBER.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _IN_LIST.sub("IN (?+)", text)
+    text = _VALUES_LIST.sub(r"\1, ...", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def route_name(scope: dict) -> str:
+    """
+    "GET /trades/{trade_id}" for a request to /trades/42, with path
+    parameter values put back as their names.
+    """
+    params = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    path = "/".join(
+        f"{{{params[segment]}}}" if segment in params else segment
+        for segment in scope.get("path", "").split("/")
+    )
+    return f"{scope.get('method')} {path}"
+
+
+class StatementStats:
+    __slots__ = (
+        "fingerprint", "statement", "count", "total_ms", "max_ms", "slow", "samples", "routes",
+        "plan", "plan_at", "slow_run",
+    )
+
+    def __init__(self, fingerprint: str, statement: str, samples: int):
+        self.fingerprint = fingerprint
+        self.statement = statement
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow = 0
+        self.samples = deque(maxlen=samples)
+        self.routes = Counter()
+        self.plan: Optional[List[list]] = None
+        self.plan_at: Optional[str] = None
+        self.slow_run: Optional[tuple] = None  # (engine, statement, parameters) awaiting EXPLAIN
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def percentile(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(percentile(0.50), 3),
+            "p95_ms": round(percentile(0.95), 3),
+            "p99_ms": round(percentile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "slow": self.slow,
+            "routes": dict(self.routes.most_common(10)),
+            "plan": self.plan,
+            "plan_captured_at": self.plan_at,
+        }
+
+
+class QueryStats:
+    """
+    Per-process statement statistics fed by engine cursor events.
+    """
+
+    def __init__(self, slow_ms: float, samples: int):
+        self.slow_ms = slow_ms
+        self.samples = samples
+        self.started_at = datetime.utcnow()
+        self._stats: Dict[str, StatementStats] = {}
+        self._fingerprints: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def install(self, *engines):
+        for engine in engines:
+            if not event.contains(engine, "before_cursor_execute", self._before):
+                event.listen(engine, "before_cursor_execute", self._before)
+                event.listen(engine, "after_cursor_execute", self._after)
+
+    def _fingerprint(self, statement: str) -> tuple:
+        # A lock-free read is safe: entries are never changed once stored,
+        # so a racing reader at worst normalises the statement again
+        known = self._fingerprints.get(statement)
+        if known is None:
+            normalised = normalise(statement)
+            known = (hashlib.sha1(normalised.encode()).hexdigest()[:12], normalised)
+            with self._lock:
+                if len(self._fingerprints) >= MAX_STATEMENTS:
+                    self._fingerprints.clear()
+                self._fingerprints[statement] = known
+        return known
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_stats_start")
+        if not starts or getattr(self._local, "explaining", False):
+            if starts:
+                starts.pop()
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        fingerprint, normalised = self._fingerprint(statement)
+        scope = current_scope.get()
+        route = route_name(scope) if scope is not None else None
+
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = StatementStats(fingerprint, normalised[:STATEMENT_PREVIEW], self.samples)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.samples.append(elapsed_ms)
+            if route:
+                stats.routes[route] += 1
+            if elapsed_ms >= self.slow_ms:
+                stats.slow += 1
+                if stats.slow_run is None and stats.plan is None and not executemany:
+                    stats.slow_run = (conn.engine, statement, parameters)
+
+    def capture_plans(self):
+        """
+        EXPLAIN the kept slow run of each fingerprint that has no plan yet.
+        Called when statistics are read rather than from the cursor hooks,
+        so the request that ran the statement does not pay for its plan.
+        """
+        with self._lock:
+            pending = [stats for stats in self._stats.values() if stats.slow_run is not None]
+            runs = [stats.slow_run for stats in pending]
+            for stats in pending:
+                stats.slow_run = None
+        for stats, (engine, statement, parameters) in zip(pending, runs):
+            stats.plan = self.explain(engine, statement, parameters)
+            stats.plan_at = datetime.utcnow().isoformat()
+
+    def explain(self, engine, statement: str, parameters) -> List[list]:
+        """
+        Query plan of a statement, run on its own connection.
+        """
+        if not statement.lstrip().lower().startswith(EXPLAINABLE):
+            return [["not explainable"]]
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        self._local.explaining = True
+        try:
+            with engine.connect() as conn:
+                result = conn.exec_driver_sql(prefix + statement, parameters)
+                return [[str(value) for value in row] for row in result]
+        except Exception as e:
+            logger.warning(f"EXPLAIN failed: {e}")
+            return [[f"EXPLAIN failed: {e}"]]
+        finally:
+            self._local.explaining = False
+
+    def snapshot(self, limit: int = None, sort: str = "total_ms") -> dict:
+        self.capture_plans()
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._stats.values()]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return {
+            "pid": os.getpid(),
+            "since": self.started_at.isoformat(),
+            "slow_ms": self.slow_ms,
+            "statements": rows[:limit] if limit else rows,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = datetime.utcnow()
+
+    def dump(self, path: str = None) -> str:
+        """
+        Write the snapshot as JSON. `{pid}` in the path is replaced by the
+        process id so each worker writes its own file.
+        """
+        path = (path or config.QUERY_STATS_DUMP_PATH).replace("{pid}", str(os.getpid()))
+        with open(path, "w") as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+        return path
+
+
+query_stats = QueryStats(slow_ms=config.QUERY_SLOW_MS, samples=config.QUERY_STATS_SAMPLES)
+
+
+class QueryStatsMiddleware:
+    """
+    Expose the ASGI scope of the current request to the cursor listeners.
+    The router adds the path parameters to the same scope, so statements
+    are attributed to route templates such as "GET /trades/{trade_id}".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
@@ -0,0 +1,182 @@
+"""
+Realised-gains report built from the trade event log.
+
+Every trades_matched event carries both lots as they stood before the match
+and the quantity matched, so each event is one disposal: the earlier-dated
+lot is the acquisition and the later one closes it. Events are streamed in
+batches and rows are written as they are produced, so memory stays flat
+however large the book is.
+
+    python -m app.reports USER_ID YEAR [--format csv|json] [--output FILE]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.events import REPLAY_BATCH, decode_payload
+from app.models import TradeEvent
+
+# Disposals held longer than this many days are long-term
+LONG_TERM_DAYS = 365
+
+COLUMNS = [
+    "ticker",
+    "strategy_id",
+    "time_horizon",
+    "currency",
+    "direction",
+    "acquired_trade_id",
+    "disposed_trade_id",
+    "acquired",
+    "disposed",
+    "qty",
+    "proceeds",
+    "cost",
+    "gain",
+    "holding_days",
+    "term",
+]
+
+# Rows written per chunk of a streamed response
+ROWS_PER_CHUNK = 500
+
+
+def disposal(payload: dict) -> Optional[dict]:
+    """
+    Turn one trades_matched payload into a disposal row, or None for events
+    recorded without lot details.
+    """
+    lots = payload.get("lots")
+    if not lots or len(lots) != 2:
+        return None
+    opening, closing = sorted(lots, key=lambda lot: (lot["date_of_trade"], lot["id"]))
+    qty = abs(payload["matched_qty"] or 0)
+    details = payload["changes"].get(str(opening["id"]), {})
+
+    long_position = (opening["open_qty"] or 0) >= 0
+    if long_position:
+        proceeds, cost = qty * closing["price"], qty * opening["price"]
+    else:
+        # A short is sold first and bought back by the closing trade
+        proceeds, cost = qty * opening["price"], qty * closing["price"]
+
+    acquired = date.fromisoformat(opening["date_of_trade"][:10])
+    disposed = date.fromisoformat(closing["date_of_trade"][:10])
+    holding_days = (disposed - acquired).days
+    return {
+        "ticker": details.get("ticker"),
+        "strategy_id": details.get("strategy_id"),
+        "time_horizon": details.get("time_horizon"),
+        "currency": details.get("currency"),
+        "direction": "long" if long_position else "short",
+        "acquired_trade_id": opening["id"],
+        "disposed_trade_id": closing["id"],
+        "acquired": acquired.isoformat(),
+        "disposed": disposed.isoformat(),
+        "qty": qty,
+        "proceeds": proceeds,
+        "cost": cost,
+        "gain": proceeds - cost,
+        "holding_days": holding_days,
+        "term": "long" if holding_days > LONG_TERM_DAYS else "short",
+    }
+
+
+def realised_gains(db: Session, user_id: int, year: int) -> Iterator[dict]:
+    """
+    Disposals of the user dated in `year`, in the order they were matched.
+    """
+    prefix = f"{year:04d}"
+    # created_at is when the match was recorded, not when the lots were
+    # traded; the disposal date is the closing lot's date in the payload
+    query = (
+        select(TradeEvent.payload)
+        .where(TradeEvent.user_id == user_id, TradeEvent.event_type == "trades_matched")
+        .order_by(TradeEvent.id)
+        .execution_options(yield_per=REPLAY_BATCH)
+    )
+    for payload, in db.connection().execute(query):
+        row = disposal(decode_payload(payload))
+        if row is not None and row["disposed"].startswith(prefix):
+            yield row
+
+
+def to_csv(rows: Iterator[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def to_json(rows: Iterator[dict], user_id: int, year: int) -> Iterator[str]:
+    """
+    Stream {"user_id", "year", "disposals": [...], "totals": {...}}; totals
+    are accumulated while the rows go out.
+    """
+    totals = {"disposals": 0, "proceeds": 0.0, "cost": 0.0, "gain": 0.0, "short_term_gain": 0.0, "long_term_gain": 0.0}
+    yield f'{{"user_id":{json.dumps(user_id)},"year":{year},"disposals":['
+    chunk = []
+    for row in rows:
+        totals["disposals"] += 1
+        totals["proceeds"] += row["proceeds"]
+        totals["cost"] += row["cost"]
+        totals["gain"] += row["gain"]
+        totals[f"{row['term']}_term_gain"] += row["gain"]
+        chunk.append(json.dumps(row, separators=(",", ":")))
+        if len(chunk) == ROWS_PER_CHUNK:
+            yield ("," if totals["disposals"] > ROWS_PER_CHUNK else "") + ",".join(chunk)
+            chunk = []
+    if chunk:
+        yield ("," if totals["disposals"] > len(chunk) else "") + ",".join(chunk)
+    yield f'],"totals":{json.dumps(totals, separators=(",", ":"))}}}'
+
+
+def stream_report(session_factory, user_id: int, year: int, fmt: str = "csv") -> Iterator[str]:
+    """
+    Report chunks read through a session of its own, which stays open while
+    the chunks are consumed.
+    """
+    db = session_factory()
+    try:
+        rows = realised_gains(db, user_id, year)
+        if fmt == "json":
+            yield from to_json(rows, user_id, year)
+        else:
+            yield from to_csv(rows)
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Realised-gains report")
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("year", type=int)
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", help="file to write (default stdout)")
+    args = parser.parse_args(argv)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        for chunk in stream_report(SessionLocal, args.user_id, args.year, args.format):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Trading days used to annualise volatility
+TRADING_DAYS = 252
+
+
+def group_exposure(labels: Sequence, market_values: np.ndarray) -> List[dict]:
+    """
+    Gross and net exposure per label, largest gross first.
+    """
+    keys, index = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    gross = np.bincount(index, weights=np.abs(market_values), minlength=len(keys))
+    net = np.bincount(index, weights=market_values, minlength=len(keys))
+    order = np.argsort(-gross)
+    return [
+        {"key": str(keys[i]), "gross": float(gross[i]), "net": float(net[i])}
+        for i in order
+    ]
+
+
+def concentration(gross_by_ticker: np.ndarray) -> dict:
+    """
+    Share of gross exposure in the largest and five largest tickers, and the
+    Herfindahl-Hirschman index of ticker weights.
+    """
+    total = gross_by_ticker.sum()
+    if total <= 0:
+        return {"largest": 0.0, "top5": 0.0, "hhi": 0.0}
+    weights = np.sort(gross_by_ticker / total)[::-1]
+    return {
+        "largest": float(weights[0]),
+        "top5": float(weights[:5].sum()),
+        "hhi": float(np.square(weights).sum()),
+    }
+
+
+def price_matrix(tickers: Sequence[str], histories: Dict[str, List[float]]) -> np.ndarray:
+    """
+    Align closing histories into a (tickers x days) matrix. Shorter histories
+    are back-filled with their first close; tickers without history are flat zero.
+    """
+    length = max((len(histories.get(ticker) or []) for ticker in tickers), default=0)
+    matrix = np.zeros((len(tickers), max(length, 1)))
+    for row, ticker in enumerate(tickers):
+        closes = histories.get(ticker) or []
+        if closes:
+            matrix[row, length - len(closes):] = closes
+            matrix[row, :length - len(closes)] = closes[0]
+    return matrix
+
+
+def max_drawdown(equity: np.ndarray) -> dict:
+    """
+    Largest peak-to-trough fall of an equity curve, absolute and relative to the peak.
+    """
+    if equity.size == 0:
+        return {"amount": 0.0, "pct": 0.0}
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = peaks - equity
+    trough = int(np.argmax(drawdowns))
+    peak_value = peaks[trough]
+    return {
+        "amount": float(drawdowns[trough]),
+        "pct": float(drawdowns[trough] / peak_value) if peak_value > 0 else 0.0,
+    }
+
+
+def rolling_volatility(pnl: np.ndarray, window: int) -> np.ndarray:
+    """
+    Standard deviation of daily PnL over a trailing window, one value per full window.
+    """
+    if pnl.size < window or window < 2:
+        return np.array([])
+    windows = np.lib.stride_tricks.sliding_window_view(pnl, window)
+    return windows.std(axis=1, ddof=1)
+
+
+def compute_risk(
+    lots: List[dict],
+    histories: Dict[str, List[float]],
+    window: int = 20,
+    confidence: float = 0.95,
+    rates: Dict[str, float] = None,
+) -> dict:
+    """
+    Exposure, concentration and historical risk of a book of open lots.
+
+    `lots` carry ticker, strategy_id, time_horizon, open_qty, current_price
+    and currency; `rates` converts each currency into the base currency
+    (missing currencies count at 1). The equity curve revalues today's open
+    positions over the closing histories, so VaR, volatility and drawdown
+    describe the risk of the book as currently held.
+    """
+    if not lots:
+        return {
+            "gross_exposure": 0.0,
+            "net_exposure": 0.0,
+            "exposure": {"ticker": [], "strategy": [], "time_horizon": []},
+            "concentration": concentration(np.array([])),
+            "volatility": {"daily": 0.0, "annualised": 0.0, "window": window},
+            "var": {"confidence": confidence, "amount": 0.0},
+            "max_drawdown": max_drawdown(np.array([])),
+            "history_days": 0,
+        }
+
+    tickers = [lot["ticker"] for lot in lots]
+    qty = np.array([lot["open_qty"] or 0.0 for lot in lots], dtype=float)
+    prices = np.array([lot["current_price"] or 0.0 for lot in lots], dtype=float)
+    rates = rates or {}
+    lot_rates = np.array([rates.get(lot.get("currency"), 1.0) for lot in lots], dtype=float)
+    market_values = qty * prices * lot_rates
+
+    by_ticker = group_exposure(tickers, market_values)
+    exposure = {
+        "ticker": by_ticker,
+        "strategy": group_exposure([lot["strategy_id"] for lot in lots], market_values),
+        "time_horizon": group_exposure([lot["time_horizon"] for lot in lots], market_values),
+    }
+
+    # Net position per ticker, revalued over history
+    unique_tickers, index = np.unique(np.asarray(tickers, dtype=str), return_inverse=True)
+    # Positions carry their FX rate so the curve is in the base currency
+    positions = np.bincount(index, weights=qty * lot_rates, minlength=len(unique_tickers))
+    closes = price_matrix(list(unique_tickers), histories)
+    equity = positions @ closes
+    pnl = np.diff(equity)
+
+    volatility = rolling_volatility(pnl, window)
+    if volatility.size:
+        daily_vol = float(volatility[-1])
+    elif pnl.size > 1:
+        daily_vol = float(pnl.std(ddof=1))
+    else:
+        daily_vol = 0.0
+    value_at_risk = float(-np.percentile(pnl, (1 - confidence) * 100)) if pnl.size else 0.0
+
+    return {
+        "gross_exposure": float(np.abs(market_values).sum()),
+        "net_exposure": float(market_values.sum()),
+        "exposure": exposure,
+        "concentration": concentration(np.array([row["gross"] for row in by_ticker])),
+        "volatility": {
+            "daily": daily_vol,
+            "annualised": daily_vol * float(np.sqrt(TRADING_DAYS)),
+            "window": window,
+        },
+        "var": {"confidence": confidence, "amount": max(value_at_risk, 0.0)},
+        "max_drawdown": max_drawdown(equity),
+        "history_days": int(closes.shape[1]) if histories else 0,
+    }
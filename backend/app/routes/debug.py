@@ -0,0 +1,39 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app import config
+from app.auth import get_admin_user
+from app.query_stats import query_stats
+
+router = APIRouter()
+
+SortKey = Literal["total_ms", "count", "mean_ms", "p95_ms", "p99_ms", "max_ms", "slow"]
+
+@router.get("/queries")
+def get_query_stats(
+    limit: int = Query(50, ge=1, le=1000),
+    sort: SortKey = Query("total_ms"),
+    current_user: dict = Depends(get_admin_user)
+):
+    """
+    Statement fingerprints seen by this worker with counts, latency
+    percentiles, issuing routes and captured plans, slowest in total first.
+    """
+    return query_stats.snapshot(limit, sort)
+
+@router.post("/queries/dump")
+def dump_query_stats(current_user: dict = Depends(get_admin_user)):
+    """
+    Write this worker's statistics to QUERY_STATS_DUMP_PATH.
+    """
+    if not config.QUERY_STATS_DUMP_PATH:
+        raise HTTPException(status_code=400, detail="QUERY_STATS_DUMP_PATH is not set")
+    return {"path": query_stats.dump()}
+
+@router.delete("/queries")
+def reset_query_stats(current_user: dict = Depends(get_admin_user)):
+    """
+    Clear this worker's statistics to start a new measurement window.
+    """
+    query_stats.reset()
+    return {"detail": "Query statistics cleared"}
@@ -0,0 +1,202 @@
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, get_read_db
+from app.models import DailySnapshot, Strategy, Trade
+from app.auth import get_current_user
+from app.cache import cache, user_key, user_namespace
+from app.fx import FxError, get_rates, to_base
+from app.market_data import get_provider
+from app.order_book import order_books
+from app import config
+from app.schemas import ScenarioRequest
+
+router = APIRouter()
+
+RISK_NAMESPACE = user_namespace("portfolio_risk")
+VALUATION_NAMESPACE = user_namespace("portfolio_valuation")
+
+OPEN_LOT_FIELDS = ("ticker", "strategy_id", "time_horizon", "open_qty", "price", "current_price", "currency")
+
+# Dependency to get database session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def load_open_lots(db: Session, user_id: int):
+    """
+    Open lots of a user as plain dicts, selecting only the columns valuation
+    needs. Served from the user's order book when the hot tier is enabled.
+    """
+    if order_books.enabled:
+        book = order_books.get(user_id)
+        with book.lock:
+            return [
+                {field: getattr(lot, field) for field in OPEN_LOT_FIELDS}
+                for lot in book.open_lots()
+            ]
+    rows = (
+        db.query(
+            Trade.ticker, Trade.strategy_id, Trade.time_horizon,
+            Trade.open_qty, Trade.price, Trade.current_price, Trade.currency,
+        )
+        .filter(Trade.user_id == user_id, Trade.open_qty != 0)
+        .all()
+    )
+    return [row._asdict() for row in rows]
+
+@router.get("/risk")
+def get_portfolio_risk(
+    days: int = Query(252, ge=2, le=2520),
+    window: int = Query(20, ge=2),
+    confidence: float = Query(0.95, gt=0, lt=1),
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exposure, concentration, rolling volatility, historical VaR and max
+    drawdown of the logged-in user's open lots over `days` of closing prices.
+    """
+    # numpy is only loaded when risk is first requested
+    from app.risk import compute_risk
+
+    user_id = current_user["user_id"]
+    key = user_key(RISK_NAMESPACE, user_id)
+    params = f"{days}:{window}:{confidence}"
+    cached = cache.get(key) or {}
+    if params in cached:
+        return cached[params]
+
+    lots = load_open_lots(db, user_id)
+    histories = get_provider().get_histories({lot["ticker"] for lot in lots}, days)
+    try:
+        rates = get_rates(lot["currency"] for lot in lots)
+    except FxError as e:
+        raise HTTPException(status_code=503, detail=f"FX rates unavailable: {str(e)}")
+    result = compute_risk(lots, histories, window=window, confidence=confidence, rates=rates)
+    result["base_currency"] = config.BASE_CURRENCY
+
+    cached[params] = result
+    cache.set(key, cached)
+    return result
+
+@router.post("/scenarios")
+def run_portfolio_scenarios(
+    request: ScenarioRequest,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Revalue the logged-in user's open lots under each what-if scenario of
+    global, per-strategy or per-ticker price shocks, and return the PnL of
+    each in the base currency. Stored trades and prices are not changed.
+    """
+    # numpy is only loaded when scenarios are first requested
+    from app.scenarios import evaluate_scenarios
+
+    user_id = current_user["user_id"]
+    lots = load_open_lots(db, user_id)
+    strategy_names = dict(db.query(Strategy.name, Strategy.id).filter(Strategy.user_id == user_id).all())
+    try:
+        rates = get_rates(lot["currency"] for lot in lots)
+    except FxError as e:
+        raise HTTPException(status_code=503, detail=f"FX rates unavailable: {str(e)}")
+    scenarios = [scenario.model_dump() for scenario in request.scenarios]
+    return {
+        "base_currency": config.BASE_CURRENCY,
+        "lots": len(lots),
+        "scenarios": evaluate_scenarios(lots, scenarios, rates, strategy_names),
+    }
+
+@router.get("/valuation")
+def get_portfolio_valuation(
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Market value and PnL of the logged-in user's book in the base currency,
+    with a per-currency breakdown. All lots are revalued in one batch with a
+    single FX lookup per currency.
+    """
+    import numpy as np
+
+    user_id = current_user["user_id"]
+    key = user_key(VALUATION_NAMESPACE, user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = (
+        db.query(Trade.currency, Trade.open_qty, Trade.current_price, Trade.realised_pnl, Trade.unrealised_pnl)
+        .filter(Trade.user_id == user_id)
+        .all()
+    )
+    currencies = [row[0] or config.BASE_CURRENCY for row in rows]
+    values = np.array([[row[1] or 0, row[2] or 0, row[3] or 0, row[4] or 0] for row in rows], dtype=float).reshape(-1, 4)
+    # Columns: market value, realised PnL, unrealised PnL in each lot's own currency
+    local = np.column_stack([values[:, 0] * values[:, 1], values[:, 2], values[:, 3]])
+    try:
+        lot_rates = to_base(np.ones(len(rows)), currencies)
+    except FxError as e:
+        raise HTTPException(status_code=503, detail=f"FX rates unavailable: {str(e)}")
+    base = local * lot_rates[:, None] if rows else local
+
+    keys, index = np.unique(np.asarray(currencies, dtype=str), return_inverse=True)
+    by_currency = []
+    for position, currency in enumerate(keys):
+        mask = index == position
+        local_totals, base_totals = local[mask].sum(axis=0), base[mask].sum(axis=0)
+        by_currency.append({
+            "currency": str(currency),
+            "market_value": float(local_totals[0]),
+            "realised_pnl": float(local_totals[1]),
+            "unrealised_pnl": float(local_totals[2]),
+            "market_value_base": float(base_totals[0]),
+            "realised_pnl_base": float(base_totals[1]),
+            "unrealised_pnl_base": float(base_totals[2]),
+        })
+
+    totals = base.sum(axis=0)
+    result = {
+        "base_currency": config.BASE_CURRENCY,
+        "market_value": float(totals[0]),
+        "realised_pnl": float(totals[1]),
+        "unrealised_pnl": float(totals[2]),
+        "by_currency": by_currency,
+    }
+    cache.set(key, result)
+    return result
+
+@router.get("/history")
+def get_portfolio_history(
+    start: date = None,
+    end: date = None,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    End-of-day positions of the logged-in user between `start` and `end`
+    (default the last 30 days), from the daily snapshots.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    rows = (
+        db.query(
+            DailySnapshot.snapshot_date, DailySnapshot.ticker, DailySnapshot.strategy_id,
+            DailySnapshot.time_horizon, DailySnapshot.currency, DailySnapshot.qty,
+            DailySnapshot.close_price, DailySnapshot.market_value,
+            DailySnapshot.realised_pnl, DailySnapshot.unrealised_pnl,
+        )
+        .filter(
+            DailySnapshot.user_id == current_user["user_id"],
+            DailySnapshot.snapshot_date >= start,
+            DailySnapshot.snapshot_date <= end,
+        )
+        .order_by(DailySnapshot.snapshot_date, DailySnapshot.ticker)
+        .all()
+    )
+    return [row._asdict() for row in rows]
@@ -0,0 +1,32 @@
+from datetime import date
+from functools import partial
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from app.auth import get_current_user
+from app.database import read_session
+from app.reports import stream_report
+
+router = APIRouter()
+
+MEDIA_TYPES = {"csv": "text/csv", "json": "application/json"}
+
+@router.get("/realised-gains")
+def get_realised_gains(
+    year: int = Query(None, ge=1900, le=9999),
+    format: str = Query("csv", pattern="^(csv|json)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream the logged-in user's disposals for a tax year (default this year)
+    as CSV or JSON: acquired and disposed dates, quantity, proceeds, cost,
+    gain and short/long-term holding period. Read from a replica when configured.
+    """
+    user_id = current_user["user_id"]
+    year = year or date.today().year
+    chunks = stream_report(partial(read_session, user_id), user_id, year, format)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="realised-gains-{year}.{format}"'},
+    )
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import Strategy
+from datetime import date
+from typing import List
+from app.database import SessionLocal, get_read_db
+from app.models import Strategy, Trade
 from app.auth import get_current_user
-from app.schemas import StrategyBase, StrategyCreate, StrategyResponse
+from app.cache import cache, invalidate_user, user_key, user_namespace
+from app.fx import FxError, get_rates
+from app.schemas import StrategyBase, StrategyCreate, StrategyResponse, StrategyStats
 
 
 router = APIRouter()
@@ -17,19 +22,129 @@ def get_db():
 
 @router.get("/")
 def get_strategies(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)  # Use dependency
 ):
     user_id = current_user["user_id"]
     strategies = db.query(Strategy).filter(Strategy.user_id == user_id).all()
     return strategies
 
+STATS_NAMESPACE = user_namespace("strategy_stats")
+
+
+def _day_number(column, dialect: str):
+    """
+    Express a DATE column as a day count so it can be averaged in SQL.
+    """
+    if dialect == "sqlite":
+        return func.julianday(column)
+    return func.to_days(column)
+
+
+def _today_number(dialect: str) -> float:
+    today = date.today()
+    if dialect == "sqlite":
+        # Julian day number of today's midnight
+        return today.toordinal() + 1721424.5
+    # MySQL TO_DAYS counts from year 0, one day more than Python's ordinal
+    return today.toordinal() + 365
+
+
+@router.get("/stats", response_model=List[StrategyStats])
+def get_strategy_stats(
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Per-strategy rollups for the logged-in user, computed in a single
+    aggregated join between strategies and trades. Trades are grouped by
+    currency in SQL and monetary totals converted to the base currency.
+    """
+    user_id = current_user["user_id"]
+    key = user_key(STATS_NAMESPACE, user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    dialect = db.bind.dialect.name
+    is_open = Trade.open_qty != 0
+    rows = (
+        db.query(
+            Strategy.id,
+            Strategy.name,
+            Trade.currency,
+            func.count(Trade.id),
+            func.sum(case((is_open, func.abs(Trade.open_qty) * Trade.current_price), else_=0)),
+            func.sum(Trade.realised_pnl),
+            func.sum(Trade.unrealised_pnl),
+            func.sum(case((Trade.realised_pnl > 0, 1), else_=0)),
+            func.sum(case((Trade.realised_pnl != 0, 1), else_=0)),
+            func.sum(case((is_open, 1), else_=0)),
+            func.avg(case((is_open, _day_number(Trade.date_of_trade, dialect)), else_=None)),
+            func.sum(func.abs(Trade.units) * Trade.price),
+        )
+        .outerjoin(Trade, and_(Trade.strategy_id == Strategy.id, Trade.user_id == user_id))
+        .filter(Strategy.user_id == user_id)
+        .group_by(Strategy.id, Strategy.name, Trade.currency)
+        .all()
+    )
+
+    try:
+        rates = get_rates(row[2] for row in rows if row[2] is not None)
+    except FxError as e:
+        raise HTTPException(status_code=503, detail=f"FX rates unavailable: {str(e)}")
+    today = _today_number(dialect)
+    totals = {}
+    for (strategy_id, name, currency, count, exposure, realised, unrealised,
+         wins, decided, open_count, avg_open_day, turnover) in rows:
+        # MySQL returns SUM and AVG as Decimal, so coerce before mixing with floats
+        count, wins, decided, open_count = int(count), int(wins or 0), int(decided or 0), int(open_count or 0)
+        exposure, realised, unrealised, turnover = (
+            float(value or 0) for value in (exposure, realised, unrealised, turnover)
+        )
+        rate = rates.get(currency, 1.0)
+        total = totals.setdefault(strategy_id, {
+            "strategy_id": strategy_id,
+            "name": name,
+            "trade_count": 0,
+            "open_exposure": 0.0,
+            "realised_pnl": 0.0,
+            "unrealised_pnl": 0.0,
+            "turnover": 0.0,
+            "wins": 0,
+            "decided": 0,
+            "open_count": 0,
+            "open_days": 0.0,
+        })
+        total["trade_count"] += count
+        total["open_exposure"] += exposure * rate
+        total["realised_pnl"] += realised * rate
+        total["unrealised_pnl"] += unrealised * rate
+        total["turnover"] += turnover * rate
+        total["wins"] += wins
+        total["decided"] += decided
+        if avg_open_day is not None:
+            total["open_count"] += open_count
+            total["open_days"] += (today - float(avg_open_day)) * open_count
+
+    stats = []
+    for total in totals.values():
+        wins, decided = total.pop("wins"), total.pop("decided")
+        open_count, open_days = total.pop("open_count"), total.pop("open_days")
+        total["win_rate"] = wins / decided if decided else None
+        total["avg_holding_days"] = open_days / open_count if open_count else None
+        stats.append(total)
+
+    cache.set(key, stats)
+    return stats
+
 @router.post("/")
 def add_strategy(strategy: StrategyBase, db: Session = Depends(get_db)):
     new_strategy = Strategy(name=strategy.name, user_id=strategy.user_id)
     db.add(new_strategy)
     db.commit()
     db.refresh(new_strategy)
+    invalidate_user(new_strategy.user_id)
     return new_strategy
 
 @router.delete("/{strategy_id}")
@@ -41,6 +156,8 @@ def delete_strategy(strategy_id: int, db: Session = Depends(get_db)):
     if not existing_trade:
         raise HTTPException(status_code=404, detail="Trade not found")
 
+    user_id = existing_trade.user_id
     db.delete(existing_trade)
     db.commit()
+    invalidate_user(user_id)
     return {"detail": f"Strategy with ID {strategy_id} deleted successfully"}
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, Query
+from app.auth import get_current_user
+from app.tickers import index
+
+router = APIRouter()
+
+@router.get("/search")
+def search_tickers(
+    q: str = Query(..., min_length=1, max_length=32),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Autocomplete tickers by symbol or company-name prefix, served from memory.
+    """
+    return index.search(q, limit)
@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, get_read_db
 from app.models import Trade
-from typing import List
-import yfinance as yf
+from typing import List, Optional
+from datetime import date, datetime, timezone
 from app.schemas import TradeCreate, TradeUpdate, TradeResponse
 from pydantic import BaseModel, validator
 from fastapi.encoders import jsonable_encoder
 from app.auth import get_current_user
+from app.cache import invalidate_user
+from app.fx import FxError, get_rate
+from app.market_data import MarketDataError, get_provider
+from app.pricing import apply_latest_prices
+from app.throttle import SingleFlight, enforce, rate_limit
+from app import events
+from app.idempotency import run_idempotent
+from app.order_book import Lot, order_books, write_lots
+from app.tickers import resolve_ticker
 
 router = APIRouter()
 
+# Concurrent price refreshes for the same user share one run
+price_refreshes = SingleFlight("update_prices")
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -19,29 +32,112 @@ def get_db():
     finally:
         db.close()
 
+# Columns a client may select with `fields=`
+PROJECTABLE_FIELDS = list(TradeResponse.model_fields)
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Validate a comma-separated `fields=` projection. The id is always included.
+    Returns None when every column is wanted.
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+def project(row: dict, fields: List[str]) -> dict:
+    projected = {field: row[field] for field in fields}
+    if "date_of_trade" in projected and projected["date_of_trade"] is not None:
+        projected["date_of_trade"] = projected["date_of_trade"].strftime('%Y-%m-%d')
+    return projected
+
+def parse_trade_date(value: str) -> date:
+    """
+    Parse a YYYY-MM-DD trade date so every database backend receives a `date`.
+    """
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid trade date: {value}")
+
 @router.get("/")
 def get_trades(
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,ticker,open_qty"),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Fetch all trades for the logged-in user.
+    With `fields`, only those columns are selected and returned.
     """
+    selected = parse_fields(fields)
+    if selected is not None:
+        if order_books.enabled:
+            book = order_books.get(current_user["user_id"])
+            with book.lock:
+                return [project(lot.as_dict(), selected) for lot in book.lots.values()]
+        rows = (
+            db.query(*[getattr(Trade, field) for field in selected])
+            .filter(Trade.user_id == current_user["user_id"])
+            .all()
+        )
+        return [project(row._asdict(), selected) for row in rows]
+
+    if order_books.enabled:
+        book = order_books.get(current_user["user_id"])
+        with book.lock:
+            trades = [lot.as_dict() for lot in book.lots.values()]
+        for trade in trades:
+            trade["date_of_trade"] = trade["date_of_trade"].strftime('%Y-%m-%d')
+        return trades
+
     trades = db.query(Trade).filter(Trade.user_id == current_user["user_id"]).all()
     # Convert the `date_of_trade` field to string for each trade
     for trade in trades:
         trade.date_of_trade = trade.date_of_trade.strftime('%Y-%m-%d')
     return trades
 
+@router.get("/history")
+def get_trades_history(
+    at: datetime = None,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Rebuild the logged-in user's trades as they stood at `at` (UTC, default now)
+    by replaying the event log from the nearest snapshot.
+    """
+    if at is not None and at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    book = events.rebuild_book(db, current_user["user_id"], at)
+    return [{"id": trade_id, **row} for trade_id, row in sorted(book.items())]
+
 @router.get("/{trade_id}", response_model=TradeResponse)
 def get_trade(
     trade_id: int,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,ticker,open_qty"),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Fetch a specific trade by ID for the logged-in user.
+    With `fields`, only those columns are selected and returned.
     """
+    selected = parse_fields(fields)
+    if selected is not None:
+        row = (
+            db.query(*[getattr(Trade, field) for field in selected])
+            .filter(Trade.id == trade_id, Trade.user_id == current_user["user_id"])
+            .first()
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Trade not found")
+        # A partial row does not satisfy TradeResponse, so it bypasses the response model
+        return JSONResponse(jsonable_encoder(project(row._asdict(), selected)))
+
     trade = db.query(Trade).filter(Trade.id == trade_id, Trade.user_id == current_user["user_id"]).first()
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
@@ -56,21 +152,46 @@ def get_trade(
 def create_trade(
     trade: TradeCreate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Create a new trade for the logged-in user.
+    A retry with the same Idempotency-Key header returns the original trade
+    without inserting again or fetching a new price. The rate limit is
+    only charged when the trade is actually inserted, so replays are not
+    rejected with 429.
+    """
+    user_id = current_user["user_id"]
+
+    def create():
+        enforce("create_trade", user_id)
+        return insert_trade(db, trade, user_id)
+
+    return run_idempotent(idempotency_key, user_id, "create_trade", trade.model_dump(), create)
+
+def check_currency(currency: str):
     """
+    Reject a currency that cannot be converted into the base currency, so
+    it cannot break valuations of the user's book later.
+    """
+    try:
+        get_rate(currency)
+    except FxError as e:
+        raise HTTPException(status_code=400, detail=f"Unsupported currency {currency}: {str(e)}")
+
+def insert_trade(db: Session, trade: TradeCreate, user_id: int):
     try:
-        ticker = yf.Ticker(trade.ticker)
-        history = ticker.history(period="1d")
-        current_price = history['Close'].iloc[-1]
-    except Exception as e:
+        current_price = get_provider().get_price(trade.ticker)
+        ticker_info = resolve_ticker(db, trade.ticker, last_price=current_price)
+    except MarketDataError as e:
         raise HTTPException(status_code=400, detail=f"Error fetching price for ticker {trade.ticker}: {str(e)}")
+    currency = trade.currency or ticker_info["currency"]
+    check_currency(currency)
 
     new_trade = Trade(
-        user_id=current_user["user_id"],
-        date_of_trade=trade.date_of_trade,
+        user_id=user_id,
+        date_of_trade=parse_trade_date(trade.date_of_trade),
         ticker=trade.ticker,
         strategy_id=trade.strategy_id,
         time_horizon=trade.time_horizon,
@@ -80,12 +201,18 @@ def create_trade(
         current_price=current_price,
         open_qty=trade.units,
         pnl=0,
-        unrealised_pnl=0
+        unrealised_pnl=0,
+        currency=currency
     )
     db.add(new_trade)
+    db.flush()
+    events.record_created(db, new_trade)
     db.commit()
     db.refresh(new_trade)
-    return new_trade
+    version = invalidate_user(user_id)
+    if order_books.enabled:
+        order_books.add_lot(user_id, version, Lot.from_trade(new_trade))
+    return TradeResponse.model_validate(new_trade, from_attributes=True)
 
 
 @router.delete("/{trade_id}")
@@ -101,8 +228,10 @@ def delete_trade(
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
 
+    events.record_deleted(db, trade)
     db.delete(trade)
     db.commit()
+    invalidate_user(current_user["user_id"])
     return {"detail": f"Trade with ID {trade_id} deleted successfully"}
 
 
@@ -117,15 +246,64 @@ class CompareTradesRequest(BaseModel):
 
 
 @router.post("/compare")
-def compare_trades(payload: CompareTradesRequest, db: Session = Depends(get_db)):
+def compare_trades(
+    payload: CompareTradesRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
     """
-    Compare two trades and update matched trades and PnL.
+    Compare two trades of the logged-in user and update matched trades and PnL.
     Trades must have the same ticker, time horizon, and strategy.
+    A retry with the same Idempotency-Key header returns the original result
+    without matching again.
     """
+    return run_idempotent(
+        idempotency_key,
+        current_user["user_id"],
+        "compare_trades",
+        payload.model_dump(),
+        lambda: match_trades(db, payload, current_user["user_id"]),
+    )
+
+# Columns changed by matching, written through from the order book
+MATCH_FIELDS = ("matched_trade_ids", "pnl", "realised_pnl", "unrealised_pnl", "open_qty")
+
+def match_trades(db: Session, payload: CompareTradesRequest, user_id: int):
     trade_ids = sorted(payload.trade_ids)
-    trade1 = db.query(Trade).filter(Trade.id == trade_ids[0]).first()
-    trade2 = db.query(Trade).filter(Trade.id == trade_ids[1]).first()
+    in_book = order_books.enabled and order_books.owner(trade_ids[0]) == user_id
+    if in_book and order_books.owner(trade_ids[1]) == user_id:
+        # Both lots are in a loaded book: match in memory and write the changes through
+        with order_books.write(user_id) as book:
+            trade1, trade2 = book.lots.get(trade_ids[0]), book.lots.get(trade_ids[1])
+            match_lots(db, trade1, trade2)
+            write_lots(db, [trade1, trade2], MATCH_FIELDS)
+            db.commit()
+            book.reindex(trade1)
+            book.reindex(trade2)
+        return {
+            "message": "Trades matched and updated.",
+            "updated_trades": [jsonable_encoder(trade1.as_dict()), jsonable_encoder(trade2.as_dict())],
+        }
+
+    trade1 = db.query(Trade).filter(Trade.id == trade_ids[0], Trade.user_id == user_id).first()
+    trade2 = db.query(Trade).filter(Trade.id == trade_ids[1], Trade.user_id == user_id).first()
+    match_lots(db, trade1, trade2)
+    db.commit()
+    db.refresh(trade1)
+    db.refresh(trade2)
+    invalidate_user(user_id)
+
+    return {
+        "message": "Trades matched and updated.",
+        "updated_trades": [jsonable_encoder(trade1), jsonable_encoder(trade2)],
+    }
 
+def match_lots(db: Session, trade1, trade2):
+    """
+    Match two trades (ORM rows or order book lots) and record the match
+    event. The caller persists the changes and commits.
+    """
     if not trade1 or not trade2:
         raise HTTPException(status_code=404, detail="One or both trades not found.")
 
@@ -138,6 +316,8 @@ def compare_trades(payload: CompareTradesRequest, db: Session = Depends(get_db))
     if trade1.strategy_id != trade2.strategy_id:
         raise HTTPException(status_code=400, detail="Trades must belong to the same strategy for comparison.")
 
+    lots_before = [events.lot_before(trade1), events.lot_before(trade2)]
+
     # Initialize PnL and matching logic
     matched_qty = min(abs(trade1.open_qty), abs(trade2.open_qty))
     realised_pnl = (trade2.price - trade1.price) * matched_qty
@@ -186,44 +366,46 @@ def compare_trades(payload: CompareTradesRequest, db: Session = Depends(get_db))
             trade1.open_qty += trade2.open_qty  # Remaining open quantity
             trade2.open_qty = 0
 
-    # Commit updates
-    db.commit()
-    db.refresh(trade1)
-    db.refresh(trade2)
-
-    return {
-        "message": "Trades matched and updated.",
-        "updated_trades": [jsonable_encoder(trade1), jsonable_encoder(trade2)],
-    }
+    # Recorded in the same transaction as the updates
+    events.record_matched(db, lots_before, [trade1, trade2], matched_qty)
 
 
 # Ensure this route is defined before any conflicting dynamic routes like "/{trade_id}"
 @router.put("/update_prices")
 def update_trades_prices(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(rate_limit("update_prices"))
 ):
     """
-    Update trades for the logged-in user with the latest current price from Yahoo Finance.
+    Update trades for the logged-in user with the latest price from the market data provider.
+    Each distinct ticker is quoted once. If a refresh for the user is already running,
+    the call waits for it and returns its result instead of starting another.
     """
-    trades = db.query(Trade).filter(Trade.user_id == current_user["user_id"]).all()
+    user_id = current_user["user_id"]
+    return price_refreshes.do(user_id, lambda: refresh_user_prices(db, user_id))
+
+def refresh_user_prices(db: Session, user_id: int):
+    if order_books.enabled:
+        with order_books.write(user_id) as book:
+            lots = list(book.lots.values())
+            if not lots:
+                raise HTTPException(status_code=404, detail="No trades found to update.")
+            updated_trades = apply_latest_prices(db, lots)
+            write_lots(db, updated_trades, ("current_price", "unrealised_pnl"))
+            db.commit()
+        return {
+            "message": f"{len(updated_trades)} trades updated successfully.",
+            "updated_trades": len(updated_trades),
+        }
+
+    trades = db.query(Trade).filter(Trade.user_id == user_id).all()
     if not trades:
         raise HTTPException(status_code=404, detail="No trades found to update.")
 
-    updated_trades = []
-    for trade in trades:
-        try:
-            ticker = yf.Ticker(trade.ticker)
-            history = ticker.history(period="1d")
-            current_price = history['Close'].iloc[-1]
-
-            trade.current_price = current_price
-            trade.unrealised_pnl = (current_price - trade.price) * trade.open_qty
-            updated_trades.append(trade)
-        except Exception as e:
-            print(f"Failed to update trade for ticker {trade.ticker}: {str(e)}")
+    updated_trades = apply_latest_prices(db, trades)
 
     db.commit()
+    invalidate_user(user_id)
     return {
         "message": f"{len(updated_trades)} trades updated successfully.",
         "updated_trades": len(updated_trades),
@@ -243,6 +425,14 @@ def update_trade(
     if not existing_trade:
         raise HTTPException(status_code=404, detail="Trade not found")
 
+    if trade.ticker is not None and trade.ticker != existing_trade.ticker:
+        try:
+            resolve_ticker(db, trade.ticker)
+        except MarketDataError as e:
+            raise HTTPException(status_code=400, detail=f"Unknown ticker {trade.ticker}: {str(e)}")
+    if trade.currency is not None:
+        check_currency(trade.currency)
+
     update_fields = [
         "date_of_trade",
         "ticker",
@@ -257,14 +447,22 @@ def update_trade(
         "pnl",
         "realised_pnl",
         "unrealised_pnl",
+        "currency",
     ]
 
+    changed_fields = []
     for field in update_fields:
         if getattr(trade, field, None) is not None:
             setattr(existing_trade, field, getattr(trade, field))
+            changed_fields.append(field)
+    if trade.date_of_trade is not None:
+        existing_trade.date_of_trade = parse_trade_date(trade.date_of_trade)
+
+    events.record_updated(db, existing_trade, changed_fields)
 
     db.commit()
     db.refresh(existing_trade)
+    invalidate_user(current_user["user_id"])
     return existing_trade
 
 
@@ -0,0 +1,91 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+def shock_tables(keys: Sequence, shocks: List[tuple], scenarios: int):
+    """
+    Combine (key index, scenario index, kind, value) shocks into a
+    multiplier table and an additive table of shape (keys x scenarios).
+    Percent shocks on the same key compound; absolute shocks add up.
+    """
+    multipliers = np.ones((len(keys), scenarios))
+    additions = np.zeros((len(keys), scenarios))
+    if shocks:
+        rows, columns, kinds, values = (np.array(part) for part in zip(*shocks))
+        pct = kinds == "pct"
+        np.multiply.at(multipliers, (rows[pct], columns[pct]), 1 + values[pct].astype(float) / 100)
+        np.add.at(additions, (rows[~pct], columns[~pct]), values[~pct].astype(float))
+    return multipliers, additions
+
+
+def evaluate_scenarios(
+    lots: List[dict],
+    scenarios: List[dict],
+    rates: Dict[str, float] = None,
+    strategy_names: Dict[str, int] = None,
+) -> List[dict]:
+    """
+    Revalue open lots under each scenario in one (lots x scenarios) matrix.
+
+    Every scenario has a name and shocks with a scope ("global", "ticker" or
+    "strategy"), a target, a kind ("pct" or "abs") and a value. A lot's
+    shocked price is its current price times the compounded percent moves
+    of its global, strategy and ticker shocks, plus the absolute moves.
+    Amounts are converted to the base currency with `rates`; shocks whose
+    target matches no lot have no effect.
+    """
+    tickers = [lot["ticker"] for lot in lots]
+    strategies = [str(lot["strategy_id"]) for lot in lots]
+    ticker_keys, ticker_index = np.unique(np.asarray(tickers, dtype=str), return_inverse=True)
+    strategy_keys, strategy_index = np.unique(np.asarray(strategies, dtype=str), return_inverse=True)
+    ticker_position = {key: i for i, key in enumerate(ticker_keys.tolist())}
+    strategy_position = {key: i for i, key in enumerate(strategy_keys.tolist())}
+    strategy_names = strategy_names or {}
+
+    global_shocks, ticker_shocks, strategy_shocks = [], [], []
+    for column, scenario in enumerate(scenarios):
+        for shock in scenario["shocks"]:
+            scope, target = shock["scope"], shock.get("target")
+            if scope == "global":
+                global_shocks.append((0, column, shock["kind"], shock["value"]))
+            elif scope == "ticker" and target in ticker_position:
+                ticker_shocks.append((ticker_position[target], column, shock["kind"], shock["value"]))
+            elif scope == "strategy":
+                # Strategies may be named by id or by name
+                key = str(strategy_names.get(target, target))
+                if key in strategy_position:
+                    strategy_shocks.append((strategy_position[key], column, shock["kind"], shock["value"]))
+
+    count = len(scenarios)
+    global_mult, global_add = shock_tables([None], global_shocks, count)
+    ticker_mult, ticker_add = shock_tables(ticker_keys, ticker_shocks, count)
+    strategy_mult, strategy_add = shock_tables(strategy_keys, strategy_shocks, count)
+
+    qty = np.array([lot["open_qty"] or 0.0 for lot in lots], dtype=float)
+    current = np.array([lot["current_price"] or 0.0 for lot in lots], dtype=float)
+    cost = np.array([lot["price"] or 0.0 for lot in lots], dtype=float)
+    rates = rates or {}
+    lot_rates = np.array([rates.get(lot.get("currency"), 1.0) for lot in lots], dtype=float)
+
+    # (lots x scenarios) shocked prices
+    multipliers = global_mult * ticker_mult[ticker_index] * strategy_mult[strategy_index]
+    additions = global_add + ticker_add[ticker_index] + strategy_add[strategy_index]
+    shocked = current[:, None] * multipliers + additions
+
+    weights = (qty * lot_rates)[:, None]
+    market_value = (shocked * weights).sum(axis=0)
+    pnl = ((shocked - current[:, None]) * weights).sum(axis=0)
+    unrealised = ((shocked - cost[:, None]) * weights).sum(axis=0)
+    base_value = float((current * qty * lot_rates).sum())
+
+    return [
+        {
+            "name": scenario["name"],
+            "pnl": float(pnl[column]),
+            "pnl_pct": float(pnl[column] / abs(base_value)) if base_value else 0.0,
+            "market_value": float(market_value[column]),
+            "unrealised_pnl": float(unrealised[column]),
+        }
+        for column, scenario in enumerate(scenarios)
+    ]
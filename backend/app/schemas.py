@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import date
 
+# ISO 4217 code, or a minor-unit quote currency from app.fx.SUBUNITS (GBp, ZAc)
+CURRENCY_PATTERN = r"^(?:[A-Z]{3}|GBp|ZAc)$"
 
 # Trade Schemas
 class TradeBase(BaseModel):
@@ -18,6 +20,7 @@ class TradeBase(BaseModel):
     pnl: Optional[float] = 0.0
     realised_pnl: Optional[float] = 0.0
     unrealised_pnl: Optional[float] = 0.0    
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)  # Defaults to the ticker's listing currency
 
 
 class TradeCreate(TradeBase):
@@ -38,6 +41,7 @@ class TradeUpdate(BaseModel):
     pnl: Optional[float] = None
     realised_pnl: Optional[float] = None
     unrealised_pnl: Optional[float] = None
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
 
 
 class TradeResponse(BaseModel):
@@ -55,6 +59,7 @@ class TradeResponse(BaseModel):
     pnl: Optional[float] = 0.0
     realised_pnl: Optional[float] = 0.0
     unrealised_pnl: Optional[float] = 0.0
+    currency: Optional[str] = "USD"
 
     class Config:
         orm_mode = True
@@ -79,6 +84,32 @@ class StrategyResponse(StrategyBase):
     class Config:
         from_attributes = True
 
+class StrategyStats(BaseModel):
+    # Monetary fields are in the base currency
+    strategy_id: int
+    name: str
+    trade_count: int
+    open_exposure: float
+    realised_pnl: float
+    unrealised_pnl: float
+    win_rate: Optional[float] = None  # Share of trades with a positive realised PnL
+    avg_holding_days: Optional[float] = None  # Average age of the open lots
+    turnover: float  # Traded notional: sum(|units| * price)
+
+# Scenario Schemas
+class Shock(BaseModel):
+    scope: Literal["global", "ticker", "strategy"] = "global"
+    target: Optional[str] = None  # Ticker symbol, or strategy id or name
+    kind: Literal["pct", "abs"] = "pct"
+    value: float  # Percent move (-10 is a 10% drop) or absolute price move in the quote currency
+
+class Scenario(BaseModel):
+    name: str
+    shocks: List[Shock]
+
+class ScenarioRequest(BaseModel):
+    scenarios: List[Scenario] = Field(..., min_length=1, max_length=1000)
+
 class UserCreate(BaseModel):
     email: str
     name: str
@@ -0,0 +1,83 @@
+"""
+Production entry point.
+
+    python -m app.serve --workers 4 --port 8000
+
+Runs gunicorn with uvicorn workers and the application preloaded in the
+master process, so workers fork with the code already imported. Falls
+back to uvicorn's own process manager where gunicorn is unavailable
+(e.g. Windows). Set CACHE_BACKEND to "sqlite" or "redis" when running more
+than one worker so cached results are shared between them.
+"""
+import argparse
+import logging
+import os
+
+from app import config
+
+logger = logging.getLogger("serve")
+
+
+def prepare_master():
+    """
+    Create the schema and seed data once in the master, then drop its
+    pooled connections so forked workers never share a database socket.
+    Workers skip the migration, so they never race on seed inserts.
+    """
+    from app.database import dispose_engines
+    from app.migrate import migrate
+
+    if config.AUTO_MIGRATE:
+        migrate()
+        # Forked workers share this module; spawned ones read the environment
+        config.AUTO_MIGRATE = False
+        os.environ["AUTO_MIGRATE"] = "0"
+    dispose_engines()
+
+
+def run_gunicorn(host: str, port: int, workers: int):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            from app.main import app
+
+            prepare_master()
+            return app
+
+    Server().run()
+
+
+def run_uvicorn(host: str, port: int, workers: int):
+    import uvicorn
+
+    prepare_master()
+    uvicorn.run("app.main:app", host=host, port=port, workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Trade Tracker API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and config.CACHE_BACKEND == "memory":
+        logger.warning("CACHE_BACKEND=memory keeps a separate cache in every worker")
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        run_uvicorn(args.host, args.port, args.workers)
+    else:
+        run_gunicorn(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
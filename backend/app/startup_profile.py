@@ -0,0 +1,114 @@
+"""
+Cold-start profile of the ASGI app.
+
+    python -m app.startup_profile [--top 20] [--budget-ms 1500] [--json]
+
+Imports `app.main` in a fresh interpreter with `-X importtime`, runs the
+lifespan startup hook and reports import time per module plus the total
+cold-start time. Exits with status 1 when the total exceeds the budget
+(STARTUP_BUDGET_MS) or when a heavy market-data dependency is imported
+eagerly.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from app import config
+
+# Modules that must only load on first use, never at startup
+LAZY_MODULES = ["yfinance", "pandas", "numpy", "requests"]
+
+_CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def start():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "loaded": sorted(sys.modules),
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parse `-X importtime` output into per-module self/cumulative times (ms).
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def profile() -> Dict:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD],
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"App failed to start:\n{result.stderr}")
+
+    child = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": child["import_ms"],
+        "lifespan_ms": child["lifespan_ms"],
+        "cold_start_ms": child["import_ms"] + child["lifespan_ms"],
+        "eager_heavy_modules": [name for name in LAZY_MODULES if name in child["loaded"]],
+        "modules": modules,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Profile Trade Tracker API cold start")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=config.STARTUP_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile()
+    within_budget = report["cold_start_ms"] <= args.budget_ms
+    report["budget_ms"] = args.budget_ms
+    report["within_budget"] = within_budget
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'cumulative ms':>14s} {'self ms':>9s}  module")
+        top = sorted(report["modules"], key=lambda m: m["cumulative_ms"], reverse=True)
+        for module in top[:args.top]:
+            print(f"{module['cumulative_ms']:14.1f} {module['self_ms']:9.1f}  {module['module']}")
+        print()
+        print(f"import app.main:  {report['import_ms']:.1f} ms")
+        print(f"lifespan startup: {report['lifespan_ms']:.1f} ms")
+        print(f"cold start:       {report['cold_start_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        print(f"process wall:     {report['wall_ms']:.1f} ms")
+        if report["eager_heavy_modules"]:
+            print(f"eagerly imported: {', '.join(report['eager_heavy_modules'])}")
+
+    return 0 if within_budget and not report["eager_heavy_modules"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
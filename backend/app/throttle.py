@@ -0,0 +1,178 @@
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from fastapi import Depends, HTTPException
+
+from app import config
+from app.auth import get_current_user
+
+# Buckets are pruned once this many are tracked; full buckets carry no state
+MAX_BUCKETS = 10000
+
+# Event counters per route: allowed, rejected and coalesced calls
+counters: Counter = Counter()
+_counters_lock = threading.Lock()
+
+
+def record(route: str, event: str, count: int = 1):
+    with _counters_lock:
+        counters[f"{route}.{event}"] += count
+
+
+def snapshot() -> Dict[str, int]:
+    with _counters_lock:
+        return dict(counters)
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse "route=requests/seconds,..." into {route: (capacity, refill per second)}.
+    Raises ValueError unless both numbers are positive.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, rate = item.split("=")
+        requests, seconds = (float(value) for value in rate.split("/"))
+        if requests <= 0 or seconds <= 0:
+            raise ValueError(f"Rate limit for {route.strip()} needs positive requests and seconds: {rate}")
+        limits[route.strip()] = (requests, requests / seconds)
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """
+        Take one token. Returns 0 on success, otherwise the seconds until one is available.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.refill_rate >= self.capacity
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by (route, user_id). Limits apply per worker process.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]]):
+        self.limits = limits
+        self._buckets: Dict[Tuple[str, Any], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def check(self, route: str, user_id) -> float:
+        """
+        Returns 0 when the call may proceed, otherwise the suggested retry delay.
+        """
+        limit = self.limits.get(route)
+        if limit is None:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get((route, user_id))
+            if bucket is None:
+                if len(self._buckets) >= MAX_BUCKETS:
+                    self._prune()
+                bucket = self._buckets[(route, user_id)] = TokenBucket(*limit)
+            return bucket.take()
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[key]
+
+
+limiter = RateLimiter(parse_limits(config.RATE_LIMITS))
+
+
+def enforce(route: str, user_id):
+    """
+    Take a token for `route` on behalf of the user, raising 429 with a
+    Retry-After header when the limit is exhausted.
+    """
+    retry_after = limiter.check(route, user_id)
+    if retry_after:
+        record(route, "rejected")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please retry later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    record(route, "allowed")
+
+
+def rate_limit(route: str) -> Callable:
+    """
+    Dependency that enforces the configured limit for `route`, keyed by the
+    authenticated user.
+    """
+    def dependency(current_user: dict = Depends(get_current_user)):
+        enforce(route, current_user["user_id"])
+        return current_user
+
+    return dependency
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, later callers block until it finishes and share its result.
+    """
+
+    def __init__(self, route: str):
+        self.route = route
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            record(self.route, "coalesced")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
@@ -0,0 +1,236 @@
+import csv
+import logging
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import config
+from app.market_data import MarketDataError, get_provider
+from app.models import Ticker
+
+logger = logging.getLogger("tickers")
+
+# Exchange by Yahoo ticker suffix, for symbols registered on first use
+SUFFIX_EXCHANGES = {
+    "L": "LSE",
+    "TO": "TSX",
+    "V": "TSXV",
+    "DE": "XETRA",
+    "F": "Frankfurt",
+    "PA": "Euronext Paris",
+    "AS": "Euronext Amsterdam",
+    "MI": "Borsa Italiana",
+    "MC": "BME",
+    "BR": "Euronext Brussels",
+    "SW": "SIX",
+    "T": "TSE",
+    "HK": "HKEX",
+    "AX": "ASX",
+    "SI": "SGX",
+    "NS": "NSE",
+    "BO": "BSE",
+}
+
+FIELDS = ["symbol", "exchange", "currency", "name", "last_price"]
+
+# Session.info key of symbols registered in the session's open transaction
+PENDING_KEY = "pending_tickers"
+
+
+def exchange_from_suffix(symbol: str) -> str:
+    _, dot, suffix = symbol.rpartition(".")
+    return SUFFIX_EXCHANGES.get(suffix.upper(), "US") if dot else "US"
+
+
+def ticker_info(ticker: Ticker) -> dict:
+    return {field: getattr(ticker, field) for field in FIELDS}
+
+
+class TickerIndex:
+    """
+    In-memory symbol index. Symbols are kept sorted for prefix lookups by
+    bisection, and name words are indexed the same way so autocomplete also
+    matches company names.
+    """
+
+    def __init__(self):
+        self._info: Dict[str, dict] = {}
+        self._symbols: List[str] = []
+        self._words: List[tuple] = []  # (lowercase name word, symbol)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._info)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._info
+
+    def get(self, symbol: str) -> Optional[dict]:
+        return self._info.get(symbol)
+
+    def load(self, tickers: List[dict]):
+        """
+        Replace the index contents.
+        """
+        info = {ticker["symbol"]: ticker for ticker in tickers}
+        words = sorted(
+            (word, symbol)
+            for symbol, ticker in info.items()
+            for word in (ticker.get("name") or "").lower().split()
+        )
+        with self._lock:
+            self._info = info
+            self._symbols = sorted(info)
+            self._words = words
+
+    def add(self, ticker: dict):
+        symbol = ticker["symbol"]
+        with self._lock:
+            if symbol not in self._info:
+                insort(self._symbols, symbol)
+                for word in (ticker.get("name") or "").lower().split():
+                    insort(self._words, (word, symbol))
+            self._info[symbol] = ticker
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Symbols starting with `query`, then symbols whose name has a word
+        starting with it.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        with self._lock:
+            symbols, words, info = self._symbols, self._words, self._info
+            matches = []
+            prefix = query.upper()
+            position = bisect_left(symbols, prefix)
+            while position < len(symbols) and len(matches) < limit and symbols[position].startswith(prefix):
+                matches.append(symbols[position])
+                position += 1
+
+            prefix = query.lower()
+            position = bisect_left(words, (prefix,))
+            while position < len(words) and len(matches) < limit and words[position][0].startswith(prefix):
+                if words[position][1] not in matches:
+                    matches.append(words[position][1])
+                position += 1
+            return [info[symbol] for symbol in matches]
+
+
+index = TickerIndex()
+
+
+def load_seed(path: str) -> List[dict]:
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, newline="") as handle:
+        return [
+            {
+                "symbol": row["symbol"].strip(),
+                "exchange": row.get("exchange") or exchange_from_suffix(row["symbol"]),
+                "currency": row.get("currency") or "USD",
+                "name": row.get("name") or None,
+            }
+            for row in csv.DictReader(handle)
+        ]
+
+
+def seed_tickers(db: Session, seed_path: str = None) -> int:
+    """
+    Insert seed-file symbols missing from the tickers table. Run by
+    app.migrate, once per deployment rather than in every worker. Returns
+    the number of symbols inserted.
+    """
+    seed_path = config.TICKER_SEED_PATH if seed_path is None else seed_path
+    known = {symbol for symbol, in db.query(Ticker.symbol)}
+    missing = [ticker for ticker in load_seed(seed_path) if ticker["symbol"] not in known]
+    if missing:
+        db.add_all(Ticker(**ticker) for ticker in missing)
+        db.commit()
+    return len(missing)
+
+
+def refresh_index(db: Session) -> int:
+    """
+    Reload the in-memory index from the tickers table. Returns the number
+    of symbols indexed.
+    """
+    index.load([ticker_info(ticker) for ticker in db.query(Ticker).all()])
+    logger.info(f"Ticker index loaded with {len(index)} symbols")
+    return len(index)
+
+
+def register_ticker(
+    db: Session,
+    symbol: str,
+    currency: str = None,
+    last_price: float = None,
+    exchange: str = None,
+    name: str = None,
+) -> dict:
+    """
+    Store a new symbol in the tickers table. The caller commits; the symbol
+    joins the index only once that commit succeeds. If another request
+    registered the symbol concurrently, its row is returned instead.
+    """
+    ticker = Ticker(
+        symbol=symbol,
+        exchange=exchange or exchange_from_suffix(symbol),
+        currency=currency or get_provider().get_currency(symbol),
+        name=name,
+        last_price=last_price,
+        last_quoted_at=datetime.utcnow() if last_price is not None else None,
+    )
+    try:
+        with db.begin_nested():
+            db.add(ticker)
+    except IntegrityError:
+        # A locking read sees the other transaction's committed row
+        ticker = db.query(Ticker).filter(Ticker.symbol == symbol).with_for_update(read=True).one()
+        info = ticker_info(ticker)
+        index.add(info)
+        return info
+    info = ticker_info(ticker)
+    db.info.setdefault(PENDING_KEY, []).append(info)
+    return info
+
+
+@event.listens_for(Session, "after_commit")
+def _index_committed(session: Session):
+    for info in session.info.pop(PENDING_KEY, ()):
+        index.add(info)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction):
+    # Runs after after_commit, so only symbols of a rolled back or closed transaction remain
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def resolve_ticker(db: Session, symbol: str, last_price: float = None) -> dict:
+    """
+    Validate a symbol: served from the index when known, otherwise looked
+    up in the table (another worker may have added it) and finally quoted
+    by the market data provider and registered. Pass `last_price` when the
+    symbol has just been quoted, so a new symbol is not quoted twice.
+    Raises MarketDataError for symbols the provider cannot quote.
+    """
+    info = index.get(symbol)
+    if info is not None:
+        return info
+    ticker = db.query(Ticker).filter(Ticker.symbol == symbol).first()
+    if ticker is not None:
+        info = ticker_info(ticker)
+        index.add(info)
+        return info
+    if last_price is None:
+        last_price = get_provider().get_price(symbol)
+    return register_ticker(db, symbol, last_price=last_price)
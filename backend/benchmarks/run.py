@@ -0,0 +1,276 @@
+"""
+End-to-end API benchmark.
+
+Seeds a database with a synthetic book, stubs market data with the seeded
+synthetic provider and drives the real FastAPI app in-process over ASGI.
+Each scenario reports throughput and p50/p95/p99 latency; results are
+written as JSON so runs can be diffed.
+
+    python -m benchmarks.run --users 50 --trades 100000 --output results/run.json
+    python -m benchmarks.run --compare results/base.json results/run.json
+
+Run from the backend directory. The default database is a fresh SQLite file;
+pass --database-url to benchmark against MySQL (the schema must be empty, or
+use --reset to drop and recreate it).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List
+
+SCENARIOS = [
+    "auth_login",
+    "list_trades",
+    "strategy_stats",
+    "create_trade",
+    "update_prices",
+    "compare_trades",
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarise(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def build_requests(context: Dict, rng: random.Random) -> Dict[str, Callable[[], tuple]]:
+    """
+    Request factories per scenario. Each call returns (method, url, kwargs).
+    """
+    from benchmarks.seed import BENCH_PASSWORD
+
+    headers = context["headers"]
+    user_ids = context["user_ids"]
+    strategies = list(context["strategies"].items())
+    pairs = iter(context["pairs"])
+
+    def auth_login():
+        user_id = rng.choice(user_ids)
+        body = {"email": f"bench{user_id}@example.com", "password": BENCH_PASSWORD}
+        return "POST", "/auth/login", {"json": body}
+
+    def list_trades():
+        return "GET", "/trades/", {"headers": headers[rng.choice(user_ids)]}
+
+    def strategy_stats():
+        return "GET", "/strategies/stats", {"headers": headers[rng.choice(user_ids)]}
+
+    def create_trade():
+        strategy_id, user_id = rng.choice(strategies)
+        body = {
+            "date_of_trade": date.today().isoformat(),
+            "ticker": rng.choice(context["tickers"]),
+            "strategy_id": strategy_id,
+            "time_horizon": rng.choice(["Short", "Mid", "Long"]),
+            "price": round(rng.uniform(10, 500), 2),
+            "units": float(rng.randint(1, 100)),
+        }
+        return "POST", "/trades/", {"json": body, "headers": headers[user_id]}
+
+    def update_prices():
+        return "PUT", "/trades/update_prices", {"headers": headers[rng.choice(user_ids)]}
+
+    def compare_trades():
+        pair = next(pairs)
+        return "POST", "/trades/compare", {"json": {"trade_ids": pair["trade_ids"]}, "headers": headers[pair["user_id"]]}
+
+    return {
+        "auth_login": auth_login,
+        "list_trades": list_trades,
+        "strategy_stats": strategy_stats,
+        "create_trade": create_trade,
+        "update_prices": update_prices,
+        "compare_trades": compare_trades,
+    }
+
+
+async def run_scenario(client, factory: Callable[[], tuple], requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    calls = [factory() for _ in range(requests)]
+    queue = iter(calls)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in queue:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarise(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(app, context: Dict, args) -> Dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    factories = build_requests(context, rng)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.scenarios:
+            requests, warmup = args.requests, args.warmup
+            if name == "compare_trades":
+                # Each compare, warmup included, uses up one seeded pair
+                warmup = min(warmup, len(context["pairs"]))
+                requests = min(requests, len(context["pairs"]) - warmup)
+            if name == "auth_login":
+                requests = min(requests, args.login_requests)
+            # Warm up caches and connection pools outside the measured window
+            for _ in range(min(warmup, requests)):
+                method, url, kwargs = factories[name]()
+                await client.request(method, url, **kwargs)
+            results[name] = await run_scenario(client, factories[name], requests, args.concurrency)
+            print(f"{name:16s} {json.dumps(results[name])}")
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def benchmark(args) -> Dict:
+    database_url = args.database_url
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="trade-bench-"), "bench.db")
+    # Configure the app before it is imported
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["MARKET_DATA_PROVIDER"] = "synthetic"
+    os.environ["MARKET_DATA_SEED"] = str(args.seed)
+    os.environ["RATE_LIMITS"] = args.rate_limits
+    os.environ["FX_PROVIDER"] = "fixture"
+
+    from app.database import Base, engine
+    from app import models  # noqa: F401  (register tables)
+    from app.routes.auth import create_access_token
+    from benchmarks.seed import seed
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    context = seed(engine, args.users, args.strategies, args.trades, seed=args.seed)
+    seed_seconds = time.perf_counter() - started
+    print(f"Seeded {args.users} users / {args.trades} trades in {seed_seconds:.2f}s")
+    context["headers"] = {
+        user_id: {"Authorization": "Bearer " + create_access_token({"user_id": user_id})}
+        for user_id in context["user_ids"]
+    }
+
+    from app.main import app
+
+    results = asyncio.run(run_all(app, context, args))
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "users": args.users,
+            "strategies_per_user": args.strategies,
+            "trades": args.trades,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    """
+    Print per-scenario deltas between two result files. Returns 1 when any
+    scenario's p95 latency regressed by more than `threshold` percent.
+    """
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)["scenarios"]
+    with open(current_path) as handle:
+        current = json.load(handle)["scenarios"]
+
+    regressed = False
+    print(f"{'scenario':16s} {'metric':15s} {'baseline':>12s} {'current':>12s} {'change':>9s}")
+    for name in sorted(set(baseline) & set(current)):
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            before, after = baseline[name][metric], current[name][metric]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{name:16s} {metric:15s} {before:12.3f} {after:12.3f} {change:+8.1f}%")
+            if metric == "p95_ms" and change > threshold:
+                regressed = True
+    return 1 if regressed else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Trade Tracker API benchmark")
+    parser.add_argument("--database-url", default="", help="defaults to a fresh SQLite file")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate tables before seeding")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--strategies", type=int, default=3, help="strategies per user")
+    parser.add_argument("--trades", type=int, default=1000, help="1k to 1M rows")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=20, help="cap for the bcrypt-bound login scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--rate-limits", default="", help="RATE_LIMITS for the run; empty disables limiting")
+    parser.add_argument("--output", default="", help="write results JSON here")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 regression in percent")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+
+    results = benchmark(args)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Seed a database with synthetic users, strategies and trades for benchmarks.
+
+Trades are written in pairs that share ticker, strategy and time horizon
+with opposite signs, so `/trades/compare` always has valid candidates:
+trade ids 2k+1 and 2k+2 form a pair.
+"""
+import random
+from datetime import date, timedelta
+from typing import Dict
+
+from passlib.context import CryptContext
+from sqlalchemy import insert
+
+from app.market_data.base import currency_from_suffix
+from app.models import Strategy, Ticker, Trade, User
+
+BENCH_PASSWORD = "bench-password"
+TICKERS = [
+    "AAPL", "MSFT", "GOOG", "AMZN", "META", "NVDA", "TSLA", "JPM", "V", "XOM",
+    "KO", "PEP", "DIS", "NFLX", "INTC", "AMD", "ORCL", "IBM", "BA", "GE",
+]
+HORIZONS = ["Short", "Mid", "Long"]
+CHUNK_SIZE = 10000
+
+
+def seed(engine, users: int, strategies_per_user: int, trades: int, seed: int = 0) -> Dict:
+    """
+    Bulk insert the synthetic book and return the ids the benchmark needs.
+    """
+    rng = random.Random(seed)
+    password = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+    user_rows = [
+        {"id": i, "email": f"bench{i}@example.com", "name": f"Bench {i}", "password": password}
+        for i in range(1, users + 1)
+    ]
+    strategy_rows = []
+    for user_id in range(1, users + 1):
+        for n in range(strategies_per_user):
+            strategy_rows.append({
+                "id": len(strategy_rows) + 1,
+                "name": f"bench-{user_id}-{n}",
+                "user_id": user_id,
+            })
+
+    today = date.today()
+    pairs = []
+    with engine.begin() as conn:
+        conn.execute(insert(Ticker), [
+            {"symbol": ticker, "exchange": "US", "currency": currency_from_suffix(ticker)}
+            for ticker in TICKERS
+        ])
+        conn.execute(insert(User), user_rows)
+        conn.execute(insert(Strategy), strategy_rows)
+
+        trade_id = 0
+        batch = []
+        for _ in range(max(trades // 2, 1)):
+            strategy = rng.choice(strategy_rows)
+            ticker = rng.choice(TICKERS)
+            horizon = rng.choice(HORIZONS)
+            units = float(rng.randint(1, 500))
+            opened = today - timedelta(days=rng.randint(0, 730))
+            pair = []
+            for sign in (1, -1):
+                trade_id += 1
+                price = round(rng.uniform(10, 500), 2)
+                qty = sign * units if sign > 0 else -float(rng.randint(1, int(units)))
+                batch.append({
+                    "id": trade_id,
+                    "date_of_trade": opened,
+                    "ticker": ticker,
+                    "strategy_id": strategy["id"],
+                    "time_horizon": horizon,
+                    "price": price,
+                    "units": qty,
+                    "qty": qty,
+                    "current_price": price,
+                    "open_qty": qty,
+                    "pnl": 0.0,
+                    "realised_pnl": 0.0,
+                    "unrealised_pnl": 0.0,
+                    "user_id": strategy["user_id"],
+                })
+                pair.append(trade_id)
+            pairs.append({"trade_ids": pair, "user_id": strategy["user_id"]})
+            if len(batch) >= CHUNK_SIZE:
+                conn.execute(insert(Trade), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Trade), batch)
+
+    return {
+        "user_ids": [row["id"] for row in user_rows],
+        "strategies": {row["id"]: row["user_id"] for row in strategy_rows},
+        "tickers": TICKERS,
+        "pairs": pairs,
+    }
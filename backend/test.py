@@ -1,12 +1,10 @@
-import yfinance as yf
+from app.market_data import get_provider
 
-# Create a Ticker object for the desired stock (e.g., Apple Inc.)
-ticker = yf.Ticker("AAPL")
+# Quote a ticker through the configured provider (MARKET_DATA_PROVIDER),
+# e.g. MARKET_DATA_PROVIDER=synthetic python test.py for an offline check
+provider = get_provider()
 
-# Fetch the historical data
-history = ticker.history(period="1d")  # Fetch data for the latest day
+# Get the latest price
+latest_price = provider.get_price("AAPL")
 
-# Get the latest closing price
-latest_price = history['Close'].iloc[-1]  # 'Close' gives the closing price of the latest date
-
-print(f"The latest price for AAPL is: ${latest_price:.2f}")
+print(f"The latest price for AAPL from {provider.name} is: ${latest_price:.2f}")
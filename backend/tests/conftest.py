@@ -0,0 +1,104 @@
+import itertools
+import os
+import tempfile
+from datetime import date
+
+# Settings are read at import time, so point them at a throwaway SQLite
+# database and offline providers before anything imports the app
+_data_dir = tempfile.mkdtemp(prefix="trade-tracker-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_data_dir, 'primary.db')}",
+    DATABASE_REPLICA_URLS="",
+    CACHE_BACKEND="memory",
+    MARKET_DATA_PROVIDER="synthetic",
+    FX_PROVIDER="fixture",
+    RATE_LIMITS="",
+    LEADER_LOCK="none",
+    AUTO_MIGRATE="0",
+    QUERY_STATS="0",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import cache
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import Strategy, Trade, User
+from app.routes.auth import create_access_token
+
+Base.metadata.create_all(bind=engine)
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    # Used without a `with` block, so the lifespan jobs never start
+    return TestClient(app)
+
+
+@pytest.fixture
+def user(db):
+    user = User(email=f"user{next(_emails)}@example.com", name="Test", password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def strategy(db, user):
+    strategy = Strategy(name=f"strategy-{user.id}", user_id=user.id)
+    db.add(strategy)
+    db.commit()
+    return strategy
+
+
+@pytest.fixture
+def headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'user_id': user.id})}"}
+
+
+@pytest.fixture
+def make_trade(db, user, strategy):
+    """
+    Insert an open lot for `user` straight into the trades table.
+    """
+    def make(ticker="AAPL", units=10.0, price=100.0, **values):
+        trade = Trade(
+            user_id=user.id,
+            strategy_id=values.pop("strategy_id", strategy.id),
+            date_of_trade=values.pop("date_of_trade", date.today()),
+            ticker=ticker,
+            time_horizon=values.pop("time_horizon", "Short"),
+            price=price,
+            units=units,
+            qty=units,
+            open_qty=values.pop("open_qty", units),
+            current_price=values.pop("current_price", price),
+            realised_pnl=values.pop("realised_pnl", 0.0),
+            unrealised_pnl=values.pop("unrealised_pnl", 0.0),
+            currency=values.pop("currency", "USD"),
+            **values,
+        )
+        db.add(trade)
+        db.commit()
+        return trade
+
+    return make
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from app.cache import FakeRedis, MemoryCache, RedisCache, SQLiteCache, create_cache
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryCache()
+    elif request.param == "sqlite":
+        backend = SQLiteCache(str(tmp_path / "cache.db"))
+    else:
+        backend = RedisCache(FakeRedis())
+    yield backend
+    backend.close()
+
+
+def test_get_set_delete(backend):
+    assert backend.get("missing") is None
+    backend.set("key", {"value": [1, 2]})
+    assert backend.get("key") == {"value": [1, 2]}
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_expired_entries_are_not_returned(backend, monkeypatch):
+    backend.set("key", 1, ttl=1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 5)
+    assert backend.get("key") is None
+
+
+def test_incr_counts_from_one(backend):
+    assert backend.incr("counter") == 1
+    assert backend.incr("counter") == 2
+    assert backend.get("counter") == 2
+
+
+def test_clear(backend):
+    backend.set("a", 1)
+    backend.incr("b")
+    backend.clear()
+    assert backend.get("a") is None and backend.get("b") is None
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path), SQLiteCache(path)
+    first.set("key", "value")
+    assert second.get("key") == "value"
+    assert first.incr("counter") == 1 and second.incr("counter") == 2
+
+
+def test_redis_clear_keeps_other_prefixes():
+    client = FakeRedis()
+    ours = RedisCache(client, prefix="trade-tracker:")
+    theirs = RedisCache(client, prefix="other-app:")
+    client.set("unprefixed", "kept")
+    ours.set("key", 1)
+    theirs.set("key", 2)
+
+    ours.clear()
+    assert ours.get("key") is None
+    assert theirs.get("key") == 2
+    assert client.get("unprefixed") == b"kept"
+
+
+def test_redis_clear_deletes_in_batches(monkeypatch):
+    client = FakeRedis()
+    redis_cache = RedisCache(client)
+    for n in range(2500):
+        redis_cache.set(f"key{n}", n)
+    deletes = []
+    delete = client.delete
+
+    def counting(*keys):
+        deletes.append(len(keys))
+        delete(*keys)
+
+    monkeypatch.setattr(client, "delete", counting)
+    redis_cache.clear()
+    assert deletes == [1000, 1000, 500]
+    assert list(client.scan_iter()) == []
+
+
+def test_create_cache():
+    assert isinstance(create_cache("memory"), MemoryCache)
+    assert isinstance(create_cache("redis", "fake://").client, FakeRedis)
+    with pytest.raises(ValueError):
+        create_cache("memcached")
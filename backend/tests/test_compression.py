@@ -0,0 +1,114 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, choose_encoding
+
+BODY = "x" * 4096
+
+
+@pytest.fixture
+def compressed_client():
+    """
+    A bare app behind CompressionMiddleware, so the raw encoded bytes can be inspected.
+    """
+    app = FastAPI()
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("small")
+
+    @app.get("/binary")
+    def binary():
+        return PlainTextResponse(BODY, media_type="application/octet-stream")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"{n}\n" for n in range(3)), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def raw_get(client, path, accept_encoding):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_choose_encoding_prefers_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0") is None
+
+
+def test_choose_encoding_without_brotli_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("br") is None
+
+
+def test_gzip_response(compressed_client):
+    response, raw = raw_get(compressed_client, "/large", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw).decode() == BODY
+
+
+def test_brotli_response(compressed_client):
+    brotli = pytest.importorskip("brotli")
+    response, raw = raw_get(compressed_client, "/large", "gzip, br")
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(raw).decode() == BODY
+
+
+@pytest.mark.parametrize("path, accept_encoding", [
+    ("/small", "gzip"),
+    ("/binary", "gzip"),
+    ("/large", "identity"),
+])
+def test_passthrough(compressed_client, path, accept_encoding):
+    response, raw = raw_get(compressed_client, path, accept_encoding)
+    assert "content-encoding" not in response.headers
+    assert raw.decode() == ("small" if path == "/small" else BODY)
+
+
+def test_streaming_response_is_compressed_per_chunk(compressed_client):
+    response, raw = raw_get(compressed_client, "/stream", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode() == "0\n1\n2\n"
+
+
+def test_trades_fields_projection(client, headers, make_trade):
+    trade = make_trade("MSFT", 5.0, 300.0)
+    response = client.get("/trades/", params={"fields": "ticker,open_qty,date_of_trade"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": trade.id, "ticker": "MSFT", "open_qty": 5.0, "date_of_trade": trade.date_of_trade.strftime("%Y-%m-%d")},
+    ]
+
+    response = client.get(f"/trades/{trade.id}", params={"fields": "ticker,ticker"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"id": trade.id, "ticker": "MSFT"}
+
+
+def test_trades_fields_rejects_unknown_field(client, headers, make_trade):
+    trade = make_trade()
+    response = client.get("/trades/", params={"fields": "ticker,password"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
+
+    response = client.get(f"/trades/{trade.id}", params={"fields": "user_id"}, headers=headers)
+    assert response.status_code == 400
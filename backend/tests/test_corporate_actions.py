@@ -0,0 +1,130 @@
+import json
+from datetime import date
+
+import pytest
+
+from app.corporate_actions import apply_action, apply_pending, load_actions, register_actions
+from app.models import CorporateAction, CorporateActionAudit, Ticker, Trade, TradeEvent
+from app.tickers import index
+
+
+def action(ticker, action_type="split", ex_date=date(2024, 6, 10), ratio=2.0, new_ticker=None):
+    return {"ticker": ticker, "action_type": action_type, "ex_date": ex_date, "ratio": ratio, "new_ticker": new_ticker}
+
+
+def stored(db, ticker, action_type="split"):
+    return (
+        db.query(CorporateAction)
+        .filter(CorporateAction.ticker == ticker, CorporateAction.action_type == action_type)
+        .one()
+    )
+
+
+def test_load_actions_from_csv_and_json(tmp_path):
+    csv_path = tmp_path / "actions.csv"
+    csv_path.write_text(
+        "ticker,action_type,ex_date,ratio,new_ticker\n"
+        "NVDA,split,2024-06-10,10,\n"
+        "FB,ticker_change,2022-06-09,,META\n"
+    )
+    json_path = tmp_path / "actions.json"
+    json_path.write_text(json.dumps([
+        {"ticker": "GE", "action_type": "reverse_split", "ex_date": "2021-08-02T00:00:00", "ratio": 8},
+    ]))
+
+    assert load_actions(str(csv_path)) == [
+        action("NVDA", ratio=10.0),
+        action("FB", "ticker_change", date(2022, 6, 9), None, "META"),
+    ]
+    assert load_actions(str(json_path)) == [action("GE", "reverse_split", date(2021, 8, 2), 8.0)]
+
+
+@pytest.mark.parametrize("row", [
+    "NVDA,dividend,2024-06-10,1,",
+    "NVDA,split,2024-06-10,0,",
+    "FB,ticker_change,2022-06-09,,",
+])
+def test_load_actions_rejects_invalid_rows(tmp_path, row):
+    path = tmp_path / "actions.csv"
+    path.write_text("ticker,action_type,ex_date,ratio,new_ticker\n" + row + "\n")
+    with pytest.raises(ValueError):
+        load_actions(str(path))
+
+
+def test_register_actions_skips_stored_ones(db):
+    actions = [action("REGA"), action("REGB", "reverse_split", ratio=4.0)]
+    assert register_actions(db, actions) == 2
+    assert register_actions(db, actions) == 0
+
+
+def test_split_adjusts_lots_opened_before_ex_date(db, user, make_trade):
+    before = make_trade("SPLIT1", units=10.0, price=100.0, current_price=60.0, date_of_trade=date(2024, 6, 7))
+    after = make_trade("SPLIT1", units=5.0, price=55.0, current_price=60.0, date_of_trade=date(2024, 6, 10))
+    register_actions(db, [action("SPLIT1")])
+
+    assert apply_action(db, stored(db, "SPLIT1")) == 1
+    db.expire_all()
+    adjusted = db.get(Trade, before.id)
+    assert (adjusted.units, adjusted.qty, adjusted.open_qty, adjusted.price) == (20.0, 20.0, 20.0, 50.0)
+    assert adjusted.unrealised_pnl == pytest.approx((60.0 - 50.0) * 20.0)
+    untouched = db.get(Trade, after.id)
+    assert (untouched.units, untouched.price) == (5.0, 55.0)
+
+    event = db.query(TradeEvent).filter(TradeEvent.user_id == user.id, TradeEvent.event_type == "corporate_action").one()
+    assert event.trade_id is None
+
+
+def test_reverse_split_divides_quantities(db, make_trade):
+    trade = make_trade("RSPLIT1", units=80.0, price=2.0, date_of_trade=date(2024, 1, 2))
+    register_actions(db, [action("RSPLIT1", "reverse_split", ratio=8.0)])
+
+    apply_action(db, stored(db, "RSPLIT1", "reverse_split"))
+    db.expire_all()
+    adjusted = db.get(Trade, trade.id)
+    assert (adjusted.units, adjusted.price) == (10.0, 16.0)
+
+
+def test_action_is_applied_once_with_one_audit_row(db, make_trade):
+    make_trade("ONCE1", date_of_trade=date(2024, 1, 2))
+    make_trade("ONCE1", date_of_trade=date(2024, 1, 3))
+    register_actions(db, [action("ONCE1", ratio=3.0)])
+    first = stored(db, "ONCE1")
+
+    # A second worker holding the same unapplied action loses the claim
+    other = type(db)(bind=db.get_bind())
+    stale = other.get(CorporateAction, first.id)
+    assert apply_action(db, first) == 2
+    assert apply_action(other, stale) == 0
+    other.close()
+    assert apply_action(db, first) == 0
+
+    audit = db.query(CorporateActionAudit).filter(CorporateActionAudit.action_id == first.id).one()
+    assert (audit.trades_affected, audit.users_affected, audit.detail) == (2, 1, "split factor 3")
+    db.expire_all()
+    assert all(trade.units == 30.0 for trade in db.query(Trade).filter(Trade.ticker == "ONCE1"))
+
+
+def test_ticker_change_renames_lots_and_indexes_new_symbol(db, make_trade):
+    db.add(Ticker(symbol="OLDCO", exchange="LSE", currency="GBp", name="Old Company"))
+    db.commit()
+    trade = make_trade("OLDCO")
+    register_actions(db, [action("OLDCO", "ticker_change", ratio=None, new_ticker="NEWCO")])
+
+    assert apply_action(db, stored(db, "OLDCO", "ticker_change")) == 1
+    db.expire_all()
+    assert db.get(Trade, trade.id).ticker == "NEWCO"
+    new = db.get(Ticker, "NEWCO")
+    assert (new.exchange, new.currency, new.name) == ("LSE", "GBp", "Old Company")
+    assert index.get("NEWCO")["name"] == "Old Company"
+
+
+def test_apply_pending_respects_ex_dates(db, make_trade):
+    make_trade("PEND1", date_of_trade=date(2023, 1, 2))
+    register_actions(db, [
+        action("PEND1", ex_date=date(2023, 6, 1)),
+        action("PEND1", "reverse_split", date(2030, 1, 1), 2.0),
+    ])
+
+    assert apply_pending(db, as_of=date(2024, 1, 1)) == 1
+    assert stored(db, "PEND1").applied_at is not None
+    assert stored(db, "PEND1", "reverse_split").applied_at is None
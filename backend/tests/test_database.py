@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+from sqlalchemy import insert
+
+from app import config, database
+from app.cache import invalidate_user, pinned_to_primary
+from app.database import Base, build_engine, read_session
+from app.models import Strategy, User
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """
+    A second SQLite file standing in for a read replica.
+    """
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = build_engine(url)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URLS", [url])
+    monkeypatch.setattr(database, "replica_engines", [engine])
+    monkeypatch.setattr(database, "_replica_order", itertools.cycle([0]))
+    yield engine
+    engine.dispose()
+
+
+def copy_user(replica, user):
+    with replica.begin() as conn:
+        conn.execute(insert(User), [{"id": user.id, "email": user.email, "name": user.name, "password": user.password}])
+
+
+def test_read_session_uses_primary_without_replicas(user):
+    db = read_session(user.id)
+    try:
+        assert db.get_bind() is database.engine
+    finally:
+        db.close()
+
+
+def test_read_session_uses_replica_until_user_writes(replica, user):
+    db = read_session(user.id)
+    try:
+        assert db.get_bind() is replica
+    finally:
+        db.close()
+
+    invalidate_user(user.id)
+    assert pinned_to_primary(user.id)
+    db = read_session(user.id)
+    try:
+        assert db.get_bind() is database.engine
+    finally:
+        db.close()
+
+
+def test_read_routes_follow_replica_and_primary_pin(client, db, replica, user, headers):
+    db.add(Strategy(name="on primary", user_id=user.id))
+    db.commit()
+    copy_user(replica, user)
+    with replica.begin() as conn:
+        conn.execute(insert(Strategy), [{"name": "on replica", "user_id": user.id}])
+
+    response = client.get("/strategies/", headers=headers)
+    assert [row["name"] for row in response.json()] == ["on replica"]
+
+    response = client.post("/strategies/", json={"name": "written", "user_id": user.id})
+    assert response.status_code == 200
+
+    # The write pins the user's reads to the primary, which already has it
+    response = client.get("/strategies/", headers=headers)
+    assert sorted(row["name"] for row in response.json()) == ["on primary", "written"]
+
+
+def test_primary_pin_can_be_disabled(replica, user, monkeypatch):
+    monkeypatch.setattr(config, "PRIMARY_PIN_SECONDS", 0)
+    invalidate_user(user.id)
+    assert not pinned_to_primary(user.id)
@@ -0,0 +1,145 @@
+from datetime import date
+
+from app import daily_snapshots, events
+from app.corporate_actions import apply_pending, register_actions
+from app.models import Trade, TradeEvent, TradeSnapshot
+
+
+def live_book(db, user_id):
+    db.expire_all()
+    return {trade.id: events.trade_state(trade) for trade in db.query(Trade).filter(Trade.user_id == user_id)}
+
+
+def created_at(db, trade_id):
+    return (
+        db.query(TradeEvent.created_at)
+        .filter(TradeEvent.trade_id == trade_id, TradeEvent.event_type == "trade_created")
+        .order_by(TradeEvent.id.desc())
+        .first()[0]
+    )
+
+
+def create_trade(client, headers, strategy, ticker, units, price, day="2024-01-02"):
+    response = client.post("/trades/", headers=headers, json={
+        "date_of_trade": day,
+        "ticker": ticker,
+        "strategy_id": strategy.id,
+        "time_horizon": "Short",
+        "price": price,
+        "units": units,
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_take_snapshot_stores_book_with_its_last_event(client, db, user, strategy, headers):
+    assert events.take_snapshot(db, user.id) is None  # No events yet
+
+    create_trade(client, headers, strategy, "SNAP1", 10.0, 100.0)
+    create_trade(client, headers, strategy, "SNAP1", -4.0, 110.0)
+    snapshot = events.take_snapshot(db, user.id)
+
+    last_event_id = max(event.id for event in db.query(TradeEvent).filter(TradeEvent.user_id == user.id))
+    assert snapshot.last_event_id == last_event_id
+    assert events.decode_state(snapshot.state) == live_book(db, user.id)
+
+
+def test_snapshot_of_a_user_without_trades_is_empty(client, db, user, strategy, headers):
+    trade_id = create_trade(client, headers, strategy, "SNAP2", 10.0, 100.0)
+    assert client.delete(f"/trades/{trade_id}", headers=headers).status_code == 200
+
+    snapshot = events.take_snapshot(db, user.id)
+    assert snapshot is not None
+    assert events.decode_state(snapshot.state) == {}
+
+
+def test_write_baselines_covers_trades_older_than_the_log(db, user, make_trade):
+    legacy = make_trade("LEGACY1")
+
+    assert events.write_baselines(db) >= 1
+    assert events.write_baselines(db) == 0
+    baseline = db.query(TradeSnapshot).filter(TradeSnapshot.user_id == user.id).one()
+    assert (baseline.last_event_id, baseline.created_at) == (0, events.BASELINE_AT)
+    assert events.rebuild_book(db, user.id) == {legacy.id: events.trade_state(legacy)}
+
+
+def test_snapshot_range_leaves_baselines_to_migrate(db, user, make_trade):
+    make_trade("LEGACY2")
+    daily_snapshots.snapshot_range(date.today(), date.today(), workers=1)
+    assert db.query(TradeSnapshot).filter(TradeSnapshot.user_id == user.id).count() == 0
+
+
+def record_history(client, db, user, strategy, headers, ticker):
+    """
+    Create, match, edit, mark and split a pair of lots through the API and
+    the corporate action pipeline. Returns the ids of the lots.
+    """
+    buy = create_trade(client, headers, strategy, ticker, 10.0, 100.0)
+    sell = create_trade(client, headers, strategy, ticker, -4.0, 110.0)
+    assert client.post("/trades/compare", json={"trade_ids": [buy, sell]}, headers=headers).status_code == 200
+    assert client.put(f"/trades/{buy}", json={"time_horizon": "Short", "pnl": 1.5}, headers=headers).status_code == 200
+    assert client.put("/trades/update_prices", headers=headers).status_code == 200
+    register_actions(db, [{
+        "ticker": ticker, "action_type": "split", "ex_date": date(2024, 6, 10), "ratio": 2.0, "new_ticker": None,
+    }])
+    apply_pending(db, as_of=date(2024, 6, 10))
+    return buy, sell
+
+
+def test_replay_matches_live_trades(client, db, user, strategy, headers):
+    buy, sell = record_history(client, db, user, strategy, headers, "REPLAY1")
+    extra = create_trade(client, headers, strategy, "REPLAY2", 3.0, 20.0)
+    assert client.delete(f"/trades/{extra}", headers=headers).status_code == 200
+
+    book = events.rebuild_book(db, user.id)
+    assert book == live_book(db, user.id)
+    assert set(book) == {buy, sell}
+    assert book[buy]["open_qty"] == 12.0  # 6 left after the match, doubled by the split
+    event_types = [event.event_type for event in db.query(TradeEvent).filter(TradeEvent.user_id == user.id)]
+    assert {"trades_matched", "trade_updated", "price_marked", "corporate_action", "trade_deleted"} <= set(event_types)
+
+
+def test_replay_to_a_past_point(client, db, user, strategy, headers):
+    buy = create_trade(client, headers, strategy, "REPLAY3", 10.0, 100.0)
+    created = created_at(db, buy)
+    sell = create_trade(client, headers, strategy, "REPLAY3", -10.0, 90.0)
+    client.post("/trades/compare", json={"trade_ids": [buy, sell]}, headers=headers)
+
+    past = events.rebuild_book(db, user.id, at=created)
+    assert set(past) == {buy}
+    assert past[buy]["open_qty"] == 10.0
+    assert events.rebuild_book(db, user.id)[buy]["open_qty"] == 0.0
+
+
+def test_replay_from_snapshot(client, db, user, strategy, headers):
+    buy = create_trade(client, headers, strategy, "REPLAY4", 10.0, 100.0)
+    snapshot = events.take_snapshot(db, user.id)
+    # Replay must start after the snapshot: events it covers would now delete the lot
+    db.query(TradeEvent).filter(
+        TradeEvent.user_id == user.id, TradeEvent.id <= snapshot.last_event_id
+    ).update({"event_type": "trade_deleted"})
+    db.commit()
+
+    sell = create_trade(client, headers, strategy, "REPLAY4", -4.0, 110.0)
+    client.post("/trades/compare", json={"trade_ids": [buy, sell]}, headers=headers)
+    client.put("/trades/update_prices", headers=headers)
+
+    assert events.rebuild_book(db, user.id) == live_book(db, user.id)
+
+
+def test_iter_books_yields_each_cutoff(client, db, user, strategy, headers):
+    first = create_trade(client, headers, strategy, "REPLAY5", 10.0, 100.0)
+    between = created_at(db, first)
+    second = create_trade(client, headers, strategy, "REPLAY5", 5.0, 100.0)
+    later = created_at(db, second)
+
+    books = [(cutoff, set(state)) for cutoff, state in events.iter_books(db, user.id, [between, later])]
+    assert books == [(between, {first}), (later, {first, second})]
+
+
+def test_apply_event_ignores_unknown_trades():
+    state = {1: {"ticker": "OLD", "current_price": 1.0, "unrealised_pnl": 0.0}}
+    events.apply_event(state, "trade_updated", 2, {"price": 5.0})
+    events.apply_event(state, "price_marked", None, {"marks": [[1, 2.0, 3.0], [2, 9.0, 9.0]]})
+    events.apply_event(state, "corporate_action", None, {"ticker": "OLD", "action_type": "ticker_change", "new_ticker": "NEW"})
+    assert state == {1: {"ticker": "NEW", "current_price": 2.0, "unrealised_pnl": 3.0}}
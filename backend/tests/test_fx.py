@@ -0,0 +1,68 @@
+import pytest
+
+from app import fx
+
+
+def test_normalise_splits_minor_units():
+    assert fx.normalise("GBp") == ("GBP", 0.01)
+    assert fx.normalise("ZAc") == ("ZAR", 0.01)
+    assert fx.normalise("eur") == ("EUR", 1.0)
+    assert fx.normalise(None) == ("USD", 1.0)
+
+
+def test_get_rate_from_fixture():
+    assert fx.get_rate("USD") == 1.0
+    assert fx.get_rate("EUR") == pytest.approx(1.08)
+    assert fx.get_rate("GBp") == pytest.approx(0.0127)
+    assert fx.get_rate("ILA") == pytest.approx(0.0027)
+    assert fx.get_rate("ZAc") == pytest.approx(0.00055)
+    # Cross rates go through the fixture's quote currency
+    assert fx.get_rate("EUR", "GBP") == pytest.approx(1.08 / 1.27)
+    assert fx.get_rate("GBP", "GBp") == pytest.approx(100.0)
+
+
+def test_unknown_currency_raises():
+    with pytest.raises(fx.FxError):
+        fx.get_rate("SEK")
+
+
+def test_rates_are_cached(monkeypatch):
+    provider = fx.get_fx_provider()
+    calls = []
+    fetch_rate = provider.fetch_rate
+
+    def counting(base, quote):
+        calls.append((base, quote))
+        return fetch_rate(base, quote)
+
+    monkeypatch.setattr(provider, "fetch_rate", counting)
+    fx.get_rates(["EUR", "EUR", "CHF"])
+    fx.get_rate("EUR")
+    assert sorted(calls) == [("CHF", "USD"), ("EUR", "USD")]
+
+
+def test_to_base_converts_each_amount_in_its_currency():
+    converted = fx.to_base([100.0, 100.0, 100.0], ["USD", "EUR", "GBp"])
+    assert converted.tolist() == pytest.approx([100.0, 108.0, 1.27])
+    assert fx.to_base([], []).size == 0
+
+
+def test_valuation_without_rates_is_unavailable(client, headers, make_trade):
+    make_trade(currency="SEK")
+    response = client.get("/portfolio/valuation", headers=headers)
+    assert response.status_code == 503
+    assert "SEK" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("currency, status", [("usd", 422), ("EURO", 422), ("SEK", 400), ("GBp", 200)])
+def test_trade_currency_is_validated(client, headers, strategy, currency, status):
+    body = {
+        "date_of_trade": "2024-06-28",
+        "ticker": "VOD.L",
+        "strategy_id": strategy.id,
+        "time_horizon": "Short",
+        "price": 70.0,
+        "units": 100.0,
+        "currency": currency,
+    }
+    assert client.post("/trades/", json=body, headers=headers).status_code == status
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.idempotency import purge_expired, run_idempotent
+from app.models import IdempotencyKey, User
+from app.routes.auth import create_access_token
+
+
+def counter():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    return fn, calls
+
+
+def test_without_key_runs_every_time():
+    fn, calls = counter()
+    run_idempotent(None, 1, "test", {}, fn)
+    run_idempotent(None, 1, "test", {}, fn)
+    assert len(calls) == 2
+
+
+def test_retry_replays_stored_response(user):
+    fn, calls = counter()
+    first = run_idempotent("replay", user.id, "test", {"a": 1}, fn)
+    second = run_idempotent("replay", user.id, "test", {"a": 1}, fn)
+
+    assert first == {"call": 1}
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.body == b'{"call":1}'
+    assert len(calls) == 1
+
+
+def test_key_reused_with_other_payload_is_rejected(user):
+    fn, _ = counter()
+    run_idempotent("mismatch", user.id, "test", {"a": 1}, fn)
+    with pytest.raises(HTTPException) as raised:
+        run_idempotent("mismatch", user.id, "test", {"a": 2}, fn)
+    assert raised.value.status_code == 422
+
+
+def test_keys_are_scoped_per_user_and_route(user):
+    fn, calls = counter()
+    run_idempotent("shared", user.id, "test", {}, fn)
+    run_idempotent("shared", user.id + 1000, "test", {}, fn)
+    run_idempotent("shared", user.id, "other", {}, fn)
+    assert len(calls) == 3
+
+
+def test_failure_releases_key(user):
+    def fail():
+        raise HTTPException(status_code=400, detail="bad")
+
+    with pytest.raises(HTTPException):
+        run_idempotent("retry", user.id, "test", {}, fail)
+    fn, calls = counter()
+    assert run_idempotent("retry", user.id, "test", {}, fn) == {"call": 1}
+
+
+def test_purge_expired(db, user):
+    now = datetime.utcnow()
+    db.add(IdempotencyKey(
+        user_id=user.id, scope="test", key="old", request_hash="x", status="done",
+        created_at=now - timedelta(days=2), expires_at=now - timedelta(days=1),
+    ))
+    db.commit()
+    assert purge_expired() >= 1
+    assert db.query(IdempotencyKey).filter(IdempotencyKey.key == "old").count() == 0
+
+
+def test_create_trade_retry_returns_same_trade(client, headers, strategy):
+    body = {
+        "date_of_trade": "2024-06-28",
+        "ticker": "AAPL",
+        "strategy_id": strategy.id,
+        "time_horizon": "Short",
+        "price": 100.0,
+        "units": 10.0,
+    }
+    first = client.post("/trades/", json=body, headers={**headers, "Idempotency-Key": "create-1"})
+    second = client.post("/trades/", json=body, headers={**headers, "Idempotency-Key": "create-1"})
+    assert first.status_code == second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert first.json()["id"] == second.json()["id"]
+
+
+def test_compare_keys_do_not_leak_between_users(client, db, headers, make_trade):
+    buy, sell = make_trade(units=10.0), make_trade(units=-4.0, price=110.0)
+    stranger = User(email="stranger@example.com", name="Other", password="x")
+    db.add(stranger)
+    db.commit()
+    other = {"Authorization": f"Bearer {create_access_token({'user_id': stranger.id})}"}
+
+    body = {"trade_ids": [buy.id, sell.id]}
+    assert client.post("/trades/compare", json=body, headers={**other, "Idempotency-Key": "k"}).status_code == 404
+    response = client.post("/trades/compare", json=body, headers={**headers, "Idempotency-Key": "k"})
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
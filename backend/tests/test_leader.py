@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import config, serve
+from app.leader import DatabaseLeaderLock, FileLeaderLock, NoLeaderLock, create_leader_lock
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fcntl locks")
+def test_only_one_file_lock_holder(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    first, second = FileLeaderLock(path), FileLeaderLock(path)
+    assert first.acquire()
+    assert first.acquire()  # Re-acquiring while held keeps the lock
+    assert not second.acquire()
+
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fcntl locks")
+def test_standby_takes_over_when_leader_exits(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    code = (
+        "import sys; from app.leader import FileLeaderLock; "
+        "lock = FileLeaderLock(sys.argv[1]); print(lock.acquire(), flush=True); sys.stdin.read()"
+    )
+    holder = subprocess.Popen(
+        [sys.executable, "-c", code, path],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "True"
+        standby = FileLeaderLock(path)
+        assert not standby.acquire()
+    finally:
+        holder.stdin.close()
+        holder.wait(timeout=10)
+    assert standby.acquire()
+    standby.release()
+
+
+def test_create_leader_lock(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "LEADER_LOCK", "none")
+    assert isinstance(create_leader_lock(None), NoLeaderLock)
+    monkeypatch.setattr(config, "LEADER_LOCK", "file")
+    monkeypatch.setattr(config, "LEADER_LOCK_PATH", str(tmp_path / "leader.lock"))
+    lock = create_leader_lock(None)
+    assert isinstance(lock, FileLeaderLock) and lock.path == config.LEADER_LOCK_PATH
+    monkeypatch.setattr(config, "LEADER_LOCK", "database")
+    assert isinstance(create_leader_lock(None), DatabaseLeaderLock)
+
+
+def test_prepare_master_migrates_once(monkeypatch):
+    from app import migrate
+
+    runs = []
+    monkeypatch.setattr(migrate, "migrate", lambda: runs.append(1))
+    monkeypatch.setattr(config, "AUTO_MIGRATE", True)
+    monkeypatch.setenv("AUTO_MIGRATE", "1")
+
+    serve.prepare_master()
+    serve.prepare_master()
+    assert runs == [1]
+    # Workers, forked or spawned, skip the migration
+    assert config.AUTO_MIGRATE is False
+    assert os.environ["AUTO_MIGRATE"] == "0"
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app import market_data
+from app.market_data import (
+    MarketDataError,
+    ReplayProvider,
+    SyntheticProvider,
+    YFinanceProvider,
+    get_provider,
+    register_provider,
+)
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # Providers registered by a test must not leak into the others
+    monkeypatch.setattr(market_data, "_factories", dict(market_data._factories))
+    monkeypatch.setattr(market_data, "_instances", {})
+
+
+def test_configured_provider_is_shared():
+    provider = get_provider()
+    assert isinstance(provider, SyntheticProvider)
+    assert get_provider("synthetic") is provider
+
+
+def test_register_provider_replaces_instance():
+    first = SyntheticProvider(seed=1)
+    register_provider("fixed", lambda: first)
+    assert get_provider("fixed") is first
+
+    second = SyntheticProvider(seed=2)
+    register_provider("fixed", lambda: second)
+    assert get_provider("fixed") is second
+
+
+def test_unknown_provider_raises():
+    with pytest.raises(MarketDataError):
+        get_provider("bloomberg")
+
+
+def test_yfinance_is_imported_on_first_use(monkeypatch):
+    code = "import sys, app.market_data; print('yfinance' in sys.modules)"
+    backend = Path(__file__).resolve().parents[1]
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+    # The provider can be created without the package; quoting needs it
+    monkeypatch.setitem(sys.modules, "yfinance", None)
+    provider = get_provider("yfinance")
+    assert isinstance(provider, YFinanceProvider)
+    with pytest.raises(ImportError):
+        provider.get_price("AAPL")
+
+
+def test_synthetic_walk_is_reproducible():
+    first, second = SyntheticProvider(seed=7), SyntheticProvider(seed=7)
+    assert [first.get_price("AAPL") for _ in range(3)] == [second.get_price("AAPL") for _ in range(3)]
+    assert len(first.get_history("AAPL", 5)) == 5
+
+
+def test_replay_quotes_final_tick_without_speed(tmp_path):
+    ticks = tmp_path / "ticks.csv"
+    ticks.write_text(
+        "timestamp,ticker,price,currency\n"
+        "2024-01-02T16:00:00,AAPL,185.0,\n"
+        "2024-01-03T16:00:00,AAPL,184.0,\n"
+        "2024-01-02T16:00:00,SAP,140.0,EUR\n"
+    )
+    provider = ReplayProvider(str(ticks))
+    assert provider.get_price("AAPL") == 184.0
+    assert provider.get_history("AAPL", 5) == [185.0, 184.0]
+    assert provider.get_currency("SAP") == "EUR"
+    assert provider.get_currency("VOD.L") == "GBp"
+    with pytest.raises(MarketDataError):
+        provider.get_price("MSFT")
@@ -0,0 +1,100 @@
+import pytest
+
+from app.cache import data_version, invalidate_user
+from app.models import Trade
+from app.order_book import Book, Lot, OrderBookCache, write_lots
+
+
+def make_lot(lot_id, ticker="AAPL", open_qty=10.0, strategy_id=1, time_horizon="Short"):
+    return Lot(id=lot_id, ticker=ticker, strategy_id=strategy_id, time_horizon=time_horizon, open_qty=open_qty)
+
+
+@pytest.fixture
+def books():
+    return OrderBookCache(enabled=True, max_users=10, idle_seconds=900)
+
+
+def test_book_indexes_open_lots_by_position():
+    book = Book(1, 0, [make_lot(1), make_lot(2, open_qty=-4.0), make_lot(3, ticker="MSFT"), make_lot(4, open_qty=0)])
+    assert {lot.id for lot in book.position("AAPL", 1, "Short")} == {1, 2}
+    assert {lot.id for lot in book.open_lots()} == {1, 2, 3}
+
+    book.lots[1].open_qty = 0
+    book.reindex(book.lots[1])
+    assert [lot.id for lot in book.position("AAPL", 1, "Short")] == [2]
+
+    book.lots[2].ticker = "AAPL.L"
+    book.reindex(book.lots[2])
+    assert book.position("AAPL", 1, "Short") == []
+    assert ("AAPL", 1, "Short") not in book.positions
+    assert [lot.id for lot in book.position("AAPL.L", 1, "Short")] == [2]
+
+
+def test_get_loads_book_and_tracks_owners(books, user, make_trade):
+    trade = make_trade()
+    book = books.get(user.id)
+    assert set(book.lots) == {trade.id}
+    assert books.owner(trade.id) == user.id
+    assert books.get(user.id) is book
+
+
+def test_get_reloads_after_another_write(books, user, make_trade):
+    make_trade()
+    book = books.get(user.id)
+    added = make_trade(ticker="MSFT")
+    invalidate_user(user.id)
+    reloaded = books.get(user.id)
+    assert reloaded is not book
+    assert added.id in reloaded.lots
+
+
+def test_write_keeps_book_current(books, db, user, make_trade):
+    trade = make_trade()
+    book = books.get(user.id)
+    with books.write(user.id) as locked:
+        lot = locked.lots[trade.id]
+        lot.open_qty = 4.0
+        write_lots(db, [lot], ["open_qty"])
+        db.commit()
+    assert books.get(user.id) is book
+    assert book.version == data_version(user.id)
+    db.expire_all()
+    assert db.get(Trade, trade.id).open_qty == 4.0
+
+
+def test_failed_write_evicts_book(books, user, make_trade):
+    make_trade()
+    book = books.get(user.id)
+    with pytest.raises(RuntimeError):
+        with books.write(user.id):
+            raise RuntimeError("boom")
+    assert books.get(user.id) is not book
+
+
+def test_add_lot_needs_the_next_version(books, user, make_trade):
+    make_trade()
+    book = books.get(user.id)
+    books.add_lot(user.id, invalidate_user(user.id), make_lot(10_001))
+    assert 10_001 in book.lots and books.owner(10_001) == user.id
+
+    # A version gap means another write was missed: drop the book
+    invalidate_user(user.id)
+    books.add_lot(user.id, invalidate_user(user.id), make_lot(10_002))
+    assert books.owner(10_001) is None
+    assert len(books) == 0
+
+
+def test_least_recently_used_books_are_evicted(db):
+    from app.models import User
+
+    users = [User(email=f"lru{n}@example.com", name="LRU", password="x") for n in range(3)]
+    db.add_all(users)
+    db.commit()
+    books = OrderBookCache(enabled=True, max_users=2, idle_seconds=900)
+    first, second, third = (user.id for user in users)
+    books.get(first)
+    books.get(second)
+    books.get(first)
+    books.get(third)
+    assert len(books) == 2
+    assert set(books._books) == {first, third}
@@ -0,0 +1,120 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import config
+from app.database import engine
+from app.main import app
+from app.query_stats import QueryStats, QueryStatsMiddleware, normalise, route_name
+from app.routes import debug
+
+# Fingerprint of the by-id lookup in GET /trades/{trade_id}
+LOOKUP = "WHERE trades.id = ? AND trades.user_id = ?"
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """
+    Fresh statistics listening on the test engine, as with QUERY_STATS=1.
+    Every statement counts as slow so each fingerprint keeps a run to EXPLAIN.
+    """
+    stats = QueryStats(slow_ms=0, samples=100)
+    stats.install(engine)
+    monkeypatch.setattr(debug, "query_stats", stats)
+    yield stats
+    event.remove(engine, "before_cursor_execute", stats._before)
+    event.remove(engine, "after_cursor_execute", stats._after)
+
+
+@pytest.fixture
+def stats_client():
+    return TestClient(QueryStatsMiddleware(app))
+
+
+@pytest.fixture
+def admin(monkeypatch, user):
+    monkeypatch.setattr(config, "ADMIN_USER_IDS", {user.id})
+
+
+def by_statement(snapshot, text):
+    return [row for row in snapshot["statements"] if text in row["statement"]]
+
+
+def test_normalise_collapses_literals_and_lists():
+    assert normalise("SELECT * FROM trades WHERE id IN (1, 2, 3) AND ticker = 'AAPL'") == \
+        "SELECT * FROM trades WHERE id IN (?+) AND ticker = ?"
+    assert normalise("select  *\n from trades where id = :id_1") == "select * from trades where id = ?"
+    assert normalise("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    assert normalise("SELECT 1 WHERE x IN (?, ?)") == normalise("SELECT 2 WHERE x IN (?)")
+
+
+def test_route_name_uses_path_parameter_names():
+    scope = {"method": "GET", "path": "/trades/42", "path_params": {"trade_id": 42}}
+    assert route_name(scope) == "GET /trades/{trade_id}"
+    assert route_name({"method": "GET", "path": "/trades/"}) == "GET /trades/"
+
+
+def test_statements_are_aggregated_per_route(stats, stats_client, admin, headers, make_trade):
+    first, second = make_trade(), make_trade("MSFT")
+    stats.reset()
+
+    for trade in (first, second, first):
+        assert stats_client.get(f"/trades/{trade.id}", headers=headers).status_code == 200
+    assert stats_client.get("/trades/", headers=headers).status_code == 200
+
+    # Plans are only captured when the statistics are read
+    pending = [entry for entry in stats._stats.values() if "FROM trades" in entry.statement]
+    assert pending and all(entry.slow_run is not None and entry.plan is None for entry in pending)
+
+    response = stats_client.get("/debug/queries", headers=headers)
+    assert response.status_code == 200
+    snapshot = response.json()
+    assert snapshot["slow_ms"] == 0
+
+    # The three lookups by id share one fingerprint whatever the id
+    [lookup] = by_statement(snapshot, LOOKUP)
+    assert lookup["count"] == 3
+    assert lookup["routes"] == {"GET /trades/{trade_id}": 3}
+    assert lookup["slow"] == 3
+    assert lookup["p50_ms"] <= lookup["p99_ms"] <= lookup["max_ms"]
+    assert lookup["plan"] and lookup["plan_captured_at"]
+
+    listing = [row for row in by_statement(snapshot, "FROM trades") if "GET /trades/" in row["routes"]]
+    assert listing and listing[0]["routes"]["GET /trades/"] == 1
+    assert all(entry.slow_run is None for entry in pending)
+
+
+def test_plan_is_captured_once(stats, stats_client, admin, headers, make_trade):
+    trade = make_trade()
+    stats_client.get(f"/trades/{trade.id}", headers=headers)
+    [first] = by_statement(stats_client.get("/debug/queries", headers=headers).json(), LOOKUP)
+
+    stats_client.get(f"/trades/{trade.id}", headers=headers)
+    [second] = by_statement(stats_client.get("/debug/queries", headers=headers).json(), LOOKUP)
+    assert second["count"] == first["count"] + 1
+    assert second["plan_captured_at"] == first["plan_captured_at"]
+
+
+def test_sort_and_limit(stats, stats_client, admin, headers, make_trade):
+    trade = make_trade()
+    for _ in range(3):
+        stats_client.get(f"/trades/{trade.id}", headers=headers)
+
+    response = stats_client.get("/debug/queries", params={"sort": "count", "limit": 2}, headers=headers)
+    assert response.status_code == 200
+    rows = response.json()["statements"]
+    assert len(rows) == 2
+    assert rows[0]["count"] >= rows[1]["count"]
+
+    assert stats_client.get("/debug/queries", params={"sort": "statement"}, headers=headers).status_code == 422
+    assert stats_client.get("/debug/queries", params={"limit": 0}, headers=headers).status_code == 422
+
+
+def test_reset_and_admin_only(stats, stats_client, headers, make_trade, monkeypatch):
+    trade = make_trade()
+    stats_client.get(f"/trades/{trade.id}", headers=headers)
+    assert stats_client.get("/debug/queries", headers=headers).status_code == 403
+
+    monkeypatch.setattr(config, "ADMIN_USER_IDS", {trade.user_id})
+    assert stats_client.delete("/debug/queries", headers=headers).status_code == 200
+    assert not by_statement(stats.snapshot(), LOOKUP)
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app import reports
+from app.models import TradeEvent
+from app.reports import disposal, to_csv, to_json
+
+
+def lot(lot_id, day, price, open_qty):
+    return {"id": lot_id, "date_of_trade": day, "price": price, "open_qty": open_qty}
+
+
+def matched(opening, closing, qty, ticker="AAPL"):
+    return {
+        "matched_qty": qty,
+        "lots": [closing, opening],
+        "changes": {str(opening["id"]): {"ticker": ticker, "strategy_id": 1, "time_horizon": "Short", "currency": "USD"}},
+    }
+
+
+def test_long_disposal():
+    row = disposal(matched(lot(1, "2023-01-10", 100.0, 10.0), lot(2, "2024-03-01", 150.0, -4.0), 4.0))
+    assert (row["direction"], row["acquired"], row["disposed"]) == ("long", "2023-01-10", "2024-03-01")
+    assert (row["proceeds"], row["cost"], row["gain"]) == (600.0, 400.0, 200.0)
+    assert (row["holding_days"], row["term"]) == (416, "long")
+    assert row["ticker"] == "AAPL"
+
+
+def test_short_disposal():
+    row = disposal(matched(lot(1, "2024-05-01", 50.0, -10.0), lot(2, "2024-05-20", 40.0, 10.0), 10.0))
+    assert row["direction"] == "short"
+    assert (row["proceeds"], row["cost"], row["gain"]) == (500.0, 400.0, 100.0)
+    assert row["term"] == "short"
+
+
+def test_events_without_lots_are_skipped():
+    assert disposal({"matched_qty": 1.0, "changes": {}}) is None
+
+
+def test_chunked_output_is_valid(monkeypatch):
+    monkeypatch.setattr(reports, "ROWS_PER_CHUNK", 2)
+    rows = [disposal(matched(lot(n, "2024-01-02", 10.0, 5.0), lot(n + 100, "2024-02-01", 12.0, -5.0), 5.0)) for n in range(5)]
+
+    chunks = list(to_json(iter(rows), 7, 2024))
+    assert len(chunks) > 3
+    report = json.loads("".join(chunks))
+    assert report["totals"]["disposals"] == 5
+    assert report["totals"]["gain"] == pytest.approx(50.0)
+    assert report["disposals"] == rows
+
+    parsed = list(csv.DictReader(io.StringIO("".join(to_csv(iter(rows))))))
+    assert [int(row["acquired_trade_id"]) for row in parsed] == list(range(5))
+
+
+def trade(client, headers, strategy, day, units, price):
+    response = client.post("/trades/", headers=headers, json={
+        "date_of_trade": day, "ticker": "GAIN1", "strategy_id": strategy.id,
+        "time_horizon": "Short", "price": price, "units": units,
+    })
+    return response.json()["id"]
+
+
+def test_report_by_disposal_year(client, db, user, strategy, headers):
+    buy = trade(client, headers, strategy, "2023-01-10", 10.0, 100.0)
+    sell = trade(client, headers, strategy, "2024-03-01", -4.0, 150.0)
+    assert client.post("/trades/compare", json={"trade_ids": [buy, sell]}, headers=headers).status_code == 200
+    # A match recorded before the disposal year still belongs to it
+    db.query(TradeEvent).filter(
+        TradeEvent.user_id == user.id, TradeEvent.event_type == "trades_matched"
+    ).update({"created_at": datetime(2023, 12, 31)})
+    db.commit()
+
+    response = client.get("/reports/realised-gains?year=2024", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="realised-gains-2024.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert (rows[0]["acquired_trade_id"], rows[0]["disposed_trade_id"]) == (str(buy), str(sell))
+    assert float(rows[0]["gain"]) == 200.0 and rows[0]["term"] == "long"
+
+    report = client.get("/reports/realised-gains?year=2024&format=json", headers=headers).json()
+    assert report["user_id"] == user.id
+    assert report["totals"]["long_term_gain"] == 200.0
+
+    earlier = client.get("/reports/realised-gains?year=2023&format=json", headers=headers).json()
+    assert earlier["disposals"] == []
+    assert client.get("/reports/realised-gains?format=xml", headers=headers).status_code == 422
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.risk import compute_risk, concentration, group_exposure, max_drawdown, price_matrix, rolling_volatility
+
+
+def lot(ticker, qty, price, strategy_id=1, time_horizon="Short", currency="USD"):
+    return {
+        "ticker": ticker,
+        "strategy_id": strategy_id,
+        "time_horizon": time_horizon,
+        "open_qty": qty,
+        "current_price": price,
+        "currency": currency,
+    }
+
+
+def test_group_exposure_sorts_by_gross():
+    rows = group_exposure(["A", "B", "A"], np.array([100.0, -300.0, -50.0]))
+    assert rows == [
+        {"key": "B", "gross": 300.0, "net": -300.0},
+        {"key": "A", "gross": 150.0, "net": 50.0},
+    ]
+
+
+def test_concentration():
+    result = concentration(np.array([50.0, 30.0, 20.0]))
+    assert result["largest"] == pytest.approx(0.5)
+    assert result["top5"] == pytest.approx(1.0)
+    assert result["hhi"] == pytest.approx(0.25 + 0.09 + 0.04)
+    assert concentration(np.array([])) == {"largest": 0.0, "top5": 0.0, "hhi": 0.0}
+
+
+def test_price_matrix_back_fills_short_histories():
+    matrix = price_matrix(["A", "B", "C"], {"A": [1.0, 2.0, 3.0], "B": [5.0]})
+    assert matrix.tolist() == [[1.0, 2.0, 3.0], [5.0, 5.0, 5.0], [0.0, 0.0, 0.0]]
+
+
+def test_max_drawdown():
+    result = max_drawdown(np.array([100.0, 120.0, 90.0, 110.0, 80.0]))
+    assert result["amount"] == pytest.approx(40.0)
+    assert result["pct"] == pytest.approx(40.0 / 120.0)
+    assert max_drawdown(np.array([])) == {"amount": 0.0, "pct": 0.0}
+
+
+def test_rolling_volatility():
+    pnl = np.array([1.0, -1.0, 1.0, -1.0])
+    assert rolling_volatility(pnl, 2).tolist() == pytest.approx([np.sqrt(2)] * 3)
+    assert rolling_volatility(pnl, 5).size == 0
+
+
+def test_compute_risk_empty_book():
+    result = compute_risk([], {})
+    assert result["gross_exposure"] == 0.0
+    assert result["var"]["amount"] == 0.0
+    assert result["history_days"] == 0
+
+
+def test_compute_risk_book():
+    lots = [lot("AAPL", 10, 100.0), lot("MSFT", -6, 200.0, strategy_id=2)]
+    histories = {"AAPL": [90.0, 95.0, 100.0], "MSFT": [210.0, 205.0, 200.0]}
+    result = compute_risk(lots, histories, window=2)
+
+    assert result["gross_exposure"] == pytest.approx(1000.0 + 1200.0)
+    assert result["net_exposure"] == pytest.approx(1000.0 - 1200.0)
+    assert [row["key"] for row in result["exposure"]["ticker"]] == ["MSFT", "AAPL"]
+    assert result["history_days"] == 3
+    equity = np.array([10 * 90 - 6 * 210, 10 * 95 - 6 * 205, 10 * 100 - 6 * 200])
+    assert result["max_drawdown"]["amount"] == pytest.approx(max_drawdown(equity)["amount"])
+    assert result["var"]["amount"] == 0.0  # The book only gained
+
+
+def test_compute_risk_converts_currencies():
+    lots = [lot("AAPL", 10, 100.0), lot("SAP", -5, 200.0, strategy_id=2, currency="EUR")]
+    histories = {"AAPL": [90.0, 95.0, 100.0], "SAP": [210.0, 205.0, 200.0]}
+    result = compute_risk(lots, histories, window=2, rates={"EUR": 1.1})
+
+    assert result["gross_exposure"] == pytest.approx(1000.0 + 1100.0)
+    assert result["net_exposure"] == pytest.approx(1000.0 - 1100.0)
+    assert [row["key"] for row in result["exposure"]["ticker"]] == ["SAP", "AAPL"]
+    assert result["history_days"] == 3
+    # Equity of 10 AAPL and -5.5 SAP (in USD) over the history
+    equity = np.array([10 * 90 - 5.5 * 210, 10 * 95 - 5.5 * 205, 10 * 100 - 5.5 * 200])
+    assert result["max_drawdown"]["amount"] == pytest.approx(max_drawdown(equity)["amount"])
+    assert result["var"]["amount"] == 0.0  # The book only gained
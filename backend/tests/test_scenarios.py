@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.scenarios import evaluate_scenarios, shock_tables
+
+
+def lot(ticker, qty, price, cost=None, strategy_id=1, currency="USD"):
+    return {
+        "ticker": ticker,
+        "strategy_id": strategy_id,
+        "open_qty": qty,
+        "current_price": price,
+        "price": price if cost is None else cost,
+        "currency": currency,
+    }
+
+
+def scenario(name, *shocks):
+    return {
+        "name": name,
+        "shocks": [dict(zip(("scope", "target", "kind", "value"), shock)) for shock in shocks],
+    }
+
+
+def test_shock_tables_compound_percent_and_add_absolute():
+    multipliers, additions = shock_tables(["A", "B"], [(0, 0, "pct", 10), (0, 0, "pct", 10), (1, 1, "abs", -2)], 2)
+    assert multipliers == pytest.approx(np.array([[1.21, 1.0], [1.0, 1.0]]))
+    assert additions.tolist() == [[0.0, 0.0], [0.0, -2.0]]
+
+
+def test_global_ticker_and_strategy_shocks():
+    lots = [lot("AAPL", 10, 100.0, cost=90.0), lot("MSFT", 5, 200.0, strategy_id=2)]
+    results = evaluate_scenarios(
+        lots,
+        [
+            scenario("crash", ("global", None, "pct", -10)),
+            scenario("apple", ("ticker", "AAPL", "abs", 5)),
+            scenario("growth", ("strategy", "growth", "pct", 50)),
+        ],
+        strategy_names={"growth": 2},
+    )
+    crash, apple, growth = results
+
+    assert crash["pnl"] == pytest.approx(-100.0 - 100.0)
+    assert crash["pnl_pct"] == pytest.approx(-200.0 / 2000.0)
+    assert crash["market_value"] == pytest.approx(1800.0)
+    assert crash["unrealised_pnl"] == pytest.approx(10 * (90 - 90) + 5 * (180 - 200))
+    assert apple["pnl"] == pytest.approx(50.0)
+    assert growth["pnl"] == pytest.approx(500.0)
+
+
+def test_unmatched_targets_have_no_effect():
+    results = evaluate_scenarios(
+        [lot("AAPL", 10, 100.0)],
+        [scenario("none", ("ticker", "TSLA", "pct", -50), ("strategy", "missing", "abs", 10))],
+    )
+    assert results[0]["pnl"] == 0.0
+    assert results[0]["market_value"] == pytest.approx(1000.0)
+
+
+def test_amounts_are_converted_to_base_currency():
+    results = evaluate_scenarios(
+        [lot("SAP", 10, 100.0, currency="EUR")],
+        [scenario("up", ("global", None, "pct", 10))],
+        rates={"EUR": 1.1},
+    )
+    assert results[0]["pnl"] == pytest.approx(110.0)
+    assert results[0]["market_value"] == pytest.approx(1210.0)
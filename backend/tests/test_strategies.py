@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.models import Strategy
+
+
+def test_stats_roll_up_each_strategy_in_base_currency(client, db, user, strategy, headers, make_trade):
+    short = Strategy(name="short book", user_id=user.id)
+    empty = Strategy(name="no trades", user_id=user.id)
+    db.add_all([short, empty])
+    db.commit()
+    make_trade(units=10.0, price=100.0, current_price=110.0, unrealised_pnl=100.0,
+               date_of_trade=date.today() - timedelta(days=10))
+    make_trade(ticker="SAP", units=5.0, price=200.0, open_qty=0.0, realised_pnl=50.0, currency="EUR")
+    make_trade(ticker="TSLA", units=-4.0, price=50.0, realised_pnl=-10.0, strategy_id=short.id)
+
+    response = client.get("/strategies/stats", headers=headers)
+    assert response.status_code == 200
+    stats = {row["strategy_id"]: row for row in response.json()}
+
+    mixed = stats[strategy.id]
+    assert mixed["trade_count"] == 2
+    assert mixed["open_exposure"] == pytest.approx(1100.0)
+    assert mixed["realised_pnl"] == pytest.approx(50.0 * 1.08)
+    assert mixed["unrealised_pnl"] == pytest.approx(100.0)
+    assert mixed["turnover"] == pytest.approx(1000.0 + 1000.0 * 1.08)
+    assert mixed["win_rate"] == 1.0
+    assert mixed["avg_holding_days"] == pytest.approx(10.0)
+
+    assert stats[short.id]["trade_count"] == 1
+    assert stats[short.id]["open_exposure"] == pytest.approx(200.0)
+    assert stats[short.id]["win_rate"] == 0.0
+    assert stats[short.id]["avg_holding_days"] == pytest.approx(0.0)
+
+    assert stats[empty.id] == {
+        "strategy_id": empty.id,
+        "name": "no trades",
+        "trade_count": 0,
+        "open_exposure": 0.0,
+        "realised_pnl": 0.0,
+        "unrealised_pnl": 0.0,
+        "win_rate": None,
+        "avg_holding_days": None,
+        "turnover": 0.0,
+    }
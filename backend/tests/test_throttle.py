@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from app import config, throttle
+from app.throttle import RateLimiter, SingleFlight, TokenBucket, parse_limits
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """
+    Replace the configured limits for one test.
+    """
+    def apply(spec):
+        monkeypatch.setattr(throttle, "limiter", RateLimiter(parse_limits(spec)))
+
+    return apply
+
+
+def trade_body(strategy):
+    return {
+        "date_of_trade": "2024-06-28",
+        "ticker": "AAPL",
+        "strategy_id": strategy.id,
+        "time_horizon": "Short",
+        "price": 100.0,
+        "units": 10.0,
+    }
+
+
+def test_parse_limits():
+    assert parse_limits(" update_prices=6/60 , create_trade=10/1,") == {
+        "update_prices": (6.0, 0.1),
+        "create_trade": (10.0, 10.0),
+    }
+    assert parse_limits("") == {}
+
+
+@pytest.mark.parametrize("spec", ["create_trade=10/0", "create_trade=0/60", "create_trade=10/-1"])
+def test_parse_limits_rejects_non_positive_values(spec):
+    with pytest.raises(ValueError):
+        parse_limits(spec)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=2, refill_rate=0.5)
+    assert bucket.take() == 0.0
+    assert bucket.take() == 0.0
+    assert bucket.take() == pytest.approx(2.0, abs=0.01)
+
+    # Pretend a second passed: half a token is not enough yet
+    bucket.updated -= 1.0
+    assert bucket.take() == pytest.approx(1.0, abs=0.01)
+    bucket.updated -= 1.0
+    assert bucket.take() == 0.0
+
+    # Refill never exceeds the capacity
+    bucket.updated -= 100.0
+    assert [bucket.take() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.take() > 0
+
+
+def test_limits_are_per_user_and_route():
+    limiter = RateLimiter(parse_limits("create_trade=1/60"))
+    assert limiter.check("create_trade", 1) == 0.0
+    assert limiter.check("create_trade", 1) > 0
+    assert limiter.check("create_trade", 2) == 0.0
+    assert limiter.check("update_prices", 1) == 0.0
+
+
+def test_exhausted_limit_returns_429(client, headers, limits, make_trade):
+    limits("update_prices=1/60")
+    make_trade()
+    assert client.put("/trades/update_prices", headers=headers).status_code == 200
+    response = client.put("/trades/update_prices", headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
+
+
+def test_idempotent_retry_is_not_rate_limited(client, headers, strategy, limits):
+    limits("create_trade=1/60")
+    body = trade_body(strategy)
+    first = client.post("/trades/", json=body, headers={**headers, "Idempotency-Key": "limited"})
+    assert first.status_code == 200
+
+    retry = client.post("/trades/", json=body, headers={**headers, "Idempotency-Key": "limited"})
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+
+    fresh = client.post("/trades/", json=body, headers={**headers, "Idempotency-Key": "another"})
+    assert fresh.status_code == 429
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight("test_flight")
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"calls": len(calls)}
+
+    before = throttle.snapshot().get("test_flight.coalesced", 0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while throttle.snapshot().get("test_flight.coalesced", 0) - before < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"calls": 1}] * 4
+    # Once finished, the next call runs the function again
+    assert flight.do("key", fn) == {"calls": 2}
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight("test_flight")
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_throttle_metrics_need_admin(client, headers, user, monkeypatch):
+    assert client.get("/metrics/throttle").status_code == 401
+    assert client.get("/metrics/throttle", headers=headers).status_code == 403
+    monkeypatch.setattr(config, "ADMIN_USER_IDS", {user.id})
+    response = client.get("/metrics/throttle", headers=headers)
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
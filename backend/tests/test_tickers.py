@@ -0,0 +1,86 @@
+from app.models import Ticker
+from app.tickers import TickerIndex, exchange_from_suffix, index, refresh_index, register_ticker, resolve_ticker, seed_tickers
+
+
+def ticker(symbol, name=None):
+    return {"symbol": symbol, "exchange": "US", "currency": "USD", "name": name, "last_price": None}
+
+
+def test_search_matches_symbols_then_name_words():
+    tickers = TickerIndex()
+    tickers.load([ticker("AAPL", "Apple Inc"), ticker("AMZN", "Amazon.com Inc"), ticker("APLE", "Apple Hospitality REIT")])
+
+    assert [row["symbol"] for row in tickers.search("a")] == ["AAPL", "AMZN", "APLE"]
+    assert [row["symbol"] for row in tickers.search("AP")] == ["APLE", "AAPL"]
+    assert [row["symbol"] for row in tickers.search("hosp")] == ["APLE"]
+    assert [row["symbol"] for row in tickers.search("a", limit=1)] == ["AAPL"]
+    assert tickers.search("  ") == []
+
+
+def test_add_and_reload():
+    tickers = TickerIndex()
+    tickers.load([ticker("MSFT", "Microsoft")])
+    tickers.add(ticker("NVDA", "Nvidia"))
+    assert "NVDA" in tickers and len(tickers) == 2
+    assert tickers.search("nvi")[0]["symbol"] == "NVDA"
+
+    tickers.load([ticker("IBM")])
+    assert "MSFT" not in tickers and len(tickers) == 1
+
+
+def test_exchange_from_suffix():
+    assert exchange_from_suffix("VOD.L") == "LSE"
+    assert exchange_from_suffix("AAPL") == "US"
+    assert exchange_from_suffix("X.UNKNOWN") == "US"
+
+
+def test_seed_tickers_inserts_missing_symbols_once(db, tmp_path):
+    seed = tmp_path / "tickers.csv"
+    seed.write_text("symbol,exchange,currency,name\nSEEDA,US,USD,Seed A\nSEEDB.L,,GBp,\n")
+    assert seed_tickers(db, str(seed)) == 2
+    assert seed_tickers(db, str(seed)) == 0
+    assert db.get(Ticker, "SEEDB.L").exchange == "LSE"
+    assert "SEEDA" not in index
+
+    refresh_index(db)
+    assert index.get("SEEDA")["name"] == "Seed A"
+
+
+def test_registered_ticker_is_indexed_only_after_commit(db):
+    register_ticker(db, "PENDING1", currency="USD", last_price=1.0)
+    assert "PENDING1" not in index
+    db.commit()
+    assert "PENDING1" in index
+
+
+def test_rolled_back_ticker_is_not_indexed(db):
+    register_ticker(db, "PHANTOM1", currency="USD", last_price=1.0)
+    db.rollback()
+    db.commit()
+    # pysqlite commits a savepoint released outside an explicit transaction,
+    # so only the index is checked here
+    assert "PHANTOM1" not in index
+
+
+def test_concurrently_registered_ticker_is_reused(db):
+    other = type(db)(bind=db.get_bind())
+    other.add(Ticker(symbol="RACE1", exchange="US", currency="EUR"))
+    other.commit()
+    other.close()
+
+    info = register_ticker(db, "RACE1", currency="USD", last_price=1.0)
+    assert info["currency"] == "EUR"
+    assert "RACE1" in index
+
+
+def test_resolve_ticker_uses_given_price(db, monkeypatch):
+    from app.market_data import get_provider
+
+    def no_quotes(symbol):
+        raise AssertionError("quoted again")
+
+    monkeypatch.setattr(get_provider(), "get_price", no_quotes)
+    info = resolve_ticker(db, "QUOTED1", last_price=12.5)
+    db.commit()
+    assert info["last_price"] == 12.5
+    assert index.get("QUOTED1")["last_price"] == 12.5
@@ -55,8 +55,13 @@ const TradeTable: React.FC<TradeTableProps> = ({ trades, fetchTrades, strategies
         throw new Error("NEXT_PUBLIC_BACKEND_URL is not set in the environment variables.");
       }
 
+      const token = localStorage.getItem("token");
+      if (!token) throw new Error("No token found");
+
       const payload = { trade_ids: selectedTrades };
-      await axios.post(`${backendUrl}/trades/compare`, payload);
+      await axios.post(`${backendUrl}/trades/compare`, payload, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
 
       alert("Comparison Successful!");
       setSelectedTrades([]); // Unselect all checkboxes after comparison
@@ -18,3 +18,120 @@ ADD CONSTRAINT fk_strategies_users FOREIGN KEY (user_id) REFERENCES users(id) ON
 ALTER TABLE trades
 ADD COLUMN user_id INT,
 ADD CONSTRAINT fk_trades_users FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+
+-- Corporate actions and their audit trail
+CREATE TABLE IF NOT EXISTS corporate_actions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    ticker VARCHAR(255) NOT NULL,
+    action_type ENUM('split', 'reverse_split', 'ticker_change') NOT NULL,
+    ex_date DATE NOT NULL,
+    ratio FLOAT NULL,
+    new_ticker VARCHAR(255) NULL,
+    applied_at DATETIME NULL,
+    UNIQUE KEY uq_corporate_action (ticker, action_type, ex_date),
+    INDEX ix_corporate_actions_ticker (ticker)
+);
+
+CREATE TABLE IF NOT EXISTS corporate_action_audit (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    action_id INT NOT NULL,
+    applied_at DATETIME NOT NULL,
+    trades_affected INT NOT NULL,
+    users_affected INT NOT NULL,
+    detail VARCHAR(255),
+    FOREIGN KEY (action_id) REFERENCES corporate_actions(id)
+);
+
+-- Append-only trade event log and replay snapshots
+CREATE TABLE IF NOT EXISTS trade_events (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    trade_id INT NULL,
+    event_type ENUM('trade_created', 'trade_updated', 'trade_deleted', 'trades_matched', 'price_marked', 'corporate_action') NOT NULL,
+    payload LONGTEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    INDEX ix_trade_events_user_id_id (user_id, id),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS trade_snapshots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    last_event_id INT NOT NULL,
+    created_at DATETIME NOT NULL,
+    state LONGBLOB NOT NULL,
+    INDEX ix_trade_snapshots_user_id_created_at (user_id, created_at),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- Quote currency of each trade's price and current_price
+ALTER TABLE trades ADD COLUMN currency VARCHAR(3) NOT NULL DEFAULT 'USD' AFTER unrealised_pnl;
+
+-- Ticker reference data; existing trade tickers are backfilled before the foreign key is added
+CREATE TABLE IF NOT EXISTS tickers (
+    symbol VARCHAR(255) PRIMARY KEY,
+    exchange VARCHAR(64),
+    currency VARCHAR(3) NOT NULL DEFAULT 'USD',
+    name VARCHAR(255),
+    last_price FLOAT NULL,
+    last_quoted_at DATETIME NULL
+);
+
+INSERT IGNORE INTO tickers (symbol, currency)
+SELECT ticker, MIN(currency) FROM trades GROUP BY ticker;
+
+ALTER TABLE trades
+ADD CONSTRAINT fk_trades_tickers FOREIGN KEY (ticker) REFERENCES tickers(symbol);
+
+-- Responses of requests sent with an Idempotency-Key header, replayed until expires_at
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    scope VARCHAR(64) NOT NULL,
+    `key` VARCHAR(255) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    status ENUM('pending', 'done') NOT NULL DEFAULT 'pending',
+    status_code INT NULL,
+    response LONGTEXT NULL,
+    created_at DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL,
+    UNIQUE KEY uq_idempotency_keys_user_scope_key (user_id, scope, `key`),
+    INDEX ix_idempotency_keys_expires_at (expires_at)
+);
+
+-- Local store of daily closes for the daily snapshot job and backfills
+CREATE TABLE IF NOT EXISTS daily_prices (
+    ticker VARCHAR(255) NOT NULL,
+    price_date DATE NOT NULL,
+    close FLOAT NOT NULL,
+    PRIMARY KEY (ticker, price_date)
+);
+
+-- End-of-day positions, one row per user, position and day. Partitioned by
+-- year of snapshot_date so date-range reads and purges touch few partitions;
+-- MySQL requires the partition column in every unique key, hence the
+-- composite primary key. Add a partition for each new year ahead of time.
+CREATE TABLE IF NOT EXISTS daily_snapshots (
+    id INT AUTO_INCREMENT,
+    snapshot_date DATE NOT NULL,
+    user_id INT NOT NULL,
+    ticker VARCHAR(255) NOT NULL,
+    strategy_id INT NULL,
+    time_horizon ENUM('Short', 'Mid', 'Long') NULL,
+    currency VARCHAR(3) NOT NULL DEFAULT 'USD',
+    qty FLOAT NOT NULL DEFAULT 0,
+    close_price FLOAT NULL,
+    market_value FLOAT NULL,
+    realised_pnl FLOAT NULL DEFAULT 0,
+    unrealised_pnl FLOAT NULL DEFAULT 0,
+    PRIMARY KEY (id, snapshot_date),
+    INDEX ix_daily_snapshots_snapshot_date (snapshot_date),
+    INDEX ix_daily_snapshots_user_id_snapshot_date (user_id, snapshot_date)
+)
+PARTITION BY RANGE (YEAR(snapshot_date)) (
+    PARTITION p2023 VALUES LESS THAN (2024),
+    PARTITION p2024 VALUES LESS THAN (2025),
+    PARTITION p2025 VALUES LESS THAN (2026),
+    PARTITION p2026 VALUES LESS THAN (2027),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);